@@ -0,0 +1,55 @@
+import json
+import logging
+import sys
+
+from app.config.settings import LOG_FORMAT, LOG_LEVEL
+
+# Attributes of every log record, the other ones come from the ``extra`` argument
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format the log records as JSON objects, one per line.
+
+    The fields passed with ``extra`` (e.g. ``extra={"player_id": 2544}``) are
+    added to the object, so the logs can be filtered on them.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(
+            (key, value)
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES
+        )
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level=LOG_LEVEL, log_format=LOG_FORMAT):
+    """
+    Configure the loggers of the application ("app" and its children).
+
+    Args:
+        level (str): The minimum level of the logged records, e.g. "INFO".
+        log_format (str): "json" for structured logs, "text" for human readable ones.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    if log_format == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+
+    logger = logging.getLogger("app")
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
@@ -1,8 +1,62 @@
+import time
+
 from nba_api.stats.library.http import NBAStatsHTTP
-from nba_api.stats import endpoints
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+
+from app.config.settings import NBA_STATS_BASE_URL
+from app.services.nba_api.upstream import raise_for_client_error, stats_governor
+from app.utils.metrics import observe_retry, observe_upstream
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class GovernedHTTPAdapter(HTTPAdapter):
+    """
+    HTTP adapter sending every attempt of a request through a ``RateGovernor``.
+
+    Failed attempts are retried here rather than by urllib3, so each retry waits
+    for its own admission, reports its outcome to the governor, and the backoff
+    between attempts does not hold a concurrency slot.
+
+    Args:
+        governor (RateGovernor): The governor admitting the attempts.
+        retries (int): Maximum number of retries of a request.
+        backoff_factor (float): Base of the exponential backoff between retries.
+    """
+
+    def __init__(self, governor, retries=5, backoff_factor=1, **kwargs):
+        super().__init__(**kwargs)
+        self.governor = governor
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+
+    def send(self, request, **kwargs):
+        attempt = 0
+        while True:
+            started_at = self.governor.acquire()
+            sent_at = time.perf_counter()
+            status_code = None
+            try:
+                response = super().send(request, **kwargs)
+                status_code = response.status_code
+                if status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                response.close()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.retries:
+                    raise
+            finally:
+                observe_upstream(request.url, time.perf_counter() - sent_at, status_code)
+                self.governor.release(started_at, status_code)
+
+            observe_retry(request.url)
+            time.sleep(self.backoff_factor * 2**attempt)
+            attempt += 1
+
+
+def _raise_for_client_error(response, **kwargs):
+    raise_for_client_error(response.status_code)
 
 
 def configure_nba_api():
@@ -13,12 +67,14 @@ def configure_nba_api():
     retry policy. This allows the library to retry failed requests up to 5 times,
     with an exponential backoff between retries.
 
-    The custom session is created using the requests library, with a retry policy
-    that retries on the following status codes: 408, 429, 500, 502, 503, 504.
+    The custom session retries on the following status codes: 408, 429, 500, 502,
+    503, 504, and on connection errors. Every attempt goes through the process-wide
+    rate governor of stats.nba.com, which also admits the asynchronous calls. The
+    other 4xx responses raise a 404 or 400 HTTPException, like the asynchronous calls.
 
     The custom session is then mounted on the NBA API library, and the timeout
-    for the session is set to 60 seconds. The timeout for the NBA API library
-    is set to 70 seconds.
+    for the NBA API library is set to 70 seconds. When NBA_STATS_BASE_URL is set,
+    the endpoints are requested from it instead of stats.nba.com.
 
     Finally, the custom session is returned.
 
@@ -41,20 +97,22 @@ def configure_nba_api():
 
     session = requests.Session()
 
-    retries = Retry(
-        total=5,
+    adapter = GovernedHTTPAdapter(
+        stats_governor,
+        retries=5,
         backoff_factor=1,
-        status_forcelist=[408, 429, 500, 502, 503, 504],
-        allowed_methods=["GET"],
-    )
-
-    adapter = HTTPAdapter(
-        max_retries=retries, pool_connections=20, pool_maxsize=20, pool_block=False
+        pool_connections=20,
+        pool_maxsize=20,
+        pool_block=False,
     )
 
     session.mount("https://", adapter)
     session.mount("http://", adapter)
+    session.hooks["response"].append(_raise_for_client_error)
 
     NBAStatsHTTP._session = session
 
+    if NBA_STATS_BASE_URL:
+        NBAStatsHTTP.base_url = NBA_STATS_BASE_URL.rstrip("/") + "/{endpoint}"
+
     return session
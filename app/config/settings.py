@@ -0,0 +1,163 @@
+import os
+
+
+def _env_str(name, default):
+    return os.environ.get(name, default)
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def _env_mapping(name):
+    """
+    Parse a "key=value,key=value" environment variable into a dict of ints.
+    """
+    mapping = {}
+    for item in os.environ.get(name, "").split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            mapping[key.strip()] = int(value)
+    return mapping
+
+
+# Upper bound on the number of upstream responses kept in memory and the
+# approximate size (in bytes of raw upstream payload) they may occupy.
+CACHE_MAX_ENTRIES = _env_int("CACHE_MAX_ENTRIES", 2048)
+CACHE_MAX_BYTES = _env_int("CACHE_MAX_BYTES", 256 * 1024 * 1024)
+
+# Time to live (in seconds) of the cached responses for each stats.nba.com endpoint
+CACHE_TTL = {
+    "playercareerstats": _env_int("CACHE_TTL_PLAYERCAREERSTATS", 60 * 60),
+    "commonplayerinfo": _env_int("CACHE_TTL_COMMONPLAYERINFO", 6 * 60 * 60),
+    "playerawards": _env_int("CACHE_TTL_PLAYERAWARDS", 12 * 60 * 60),
+    "playerdashboardbyyearoveryear": _env_int(
+        "CACHE_TTL_PLAYERDASHBOARDBYYEAROVERYEAR", 60 * 60
+    ),
+    "commonteamroster": _env_int("CACHE_TTL_COMMONTEAMROSTER", 12 * 60 * 60),
+}
+
+# Maximum number of concurrent upstream calls made by a single per-season fan-out,
+# and by all the per-season fan-outs of the process combined
+SEASONS_FANOUT_MAX_WORKERS = _env_int("SEASONS_FANOUT_MAX_WORKERS", 6)
+SEASONS_FANOUT_MAX_IN_FLIGHT = _env_int("SEASONS_FANOUT_MAX_IN_FLIGHT", 24)
+
+# Timeout (in seconds) of each news website download
+SCRAPER_TIMEOUT = _env_int("SCRAPER_TIMEOUT", 10)
+
+# Base URLs of stand-ins of the upstreams, such as the fake upstream of the
+# benchmarks: the stats.nba.com endpoints are requested at
+# <NBA_STATS_BASE_URL>/<endpoint> and the news websites at
+# <SCRAPER_BASE_URL>/<host>/<path>. Empty to call the real upstreams.
+NBA_STATS_BASE_URL = _env_str("NBA_STATS_BASE_URL", "")
+SCRAPER_BASE_URL = _env_str("SCRAPER_BASE_URL", "")
+
+# Interval (in seconds) between two background refreshes of the articles, the
+# random jitter added to it, and per source overrides (e.g. "espn=120,nba=600")
+ARTICLES_REFRESH_INTERVAL = _env_int("ARTICLES_REFRESH_INTERVAL", 5 * 60)
+ARTICLES_REFRESH_JITTER = _env_int("ARTICLES_REFRESH_JITTER", 30)
+ARTICLES_SOURCE_REFRESH_INTERVALS = _env_mapping("ARTICLES_SOURCE_REFRESH_INTERVALS")
+
+# Interval (in seconds) between two background refreshes of the 30 team rosters, 0 to disable,
+# and maximum number of rosters fetched concurrently by a refresh
+ROSTERS_REFRESH_INTERVAL = _env_int("ROSTERS_REFRESH_INTERVAL", 6 * 60 * 60)
+ROSTERS_REFRESH_MAX_WORKERS = _env_int("ROSTERS_REFRESH_MAX_WORKERS", 4)
+
+# Maximum number of concurrent upstream calls, and of players, of a player info batch
+PLAYER_INFO_BATCH_MAX_WORKERS = _env_int("PLAYER_INFO_BATCH_MAX_WORKERS", 8)
+PLAYER_INFO_BATCH_MAX_SIZE = _env_int("PLAYER_INFO_BATCH_MAX_SIZE", 100)
+
+# Maximum number of players of a player metrics batch
+PLAYER_METRICS_BATCH_MAX_SIZE = _env_int("PLAYER_METRICS_BATCH_MAX_SIZE", 500)
+
+# Maximum number of leaderboards kept in memory, one per set of query parameters
+LEADERBOARD_CACHE_MAX_ENTRIES = _env_int("LEADERBOARD_CACHE_MAX_ENTRIES", 1024)
+
+# Maximum number of concurrent requests of the async upstream client, overall and
+# per host, with per host overrides (e.g. "stats.nba.com=8,www.espn.com=2")
+UPSTREAM_MAX_CONCURRENCY = _env_int("UPSTREAM_MAX_CONCURRENCY", 256)
+UPSTREAM_HOST_MAX_CONCURRENCY = _env_int("UPSTREAM_HOST_MAX_CONCURRENCY", 32)
+UPSTREAM_HOST_LIMITS = _env_mapping("UPSTREAM_HOST_LIMITS")
+
+# Directory of the persistent cache of the upstream responses (empty to disable
+# it), and time to live (in seconds) of the data that can still change, such as
+# the current season stats. Data of completed seasons never expires.
+DISK_CACHE_DIR = _env_str("DISK_CACHE_DIR", "data/cache")
+DISK_CACHE_CURRENT_TTL = _env_int("DISK_CACHE_CURRENT_TTL", 30 * 60)
+
+# Directory of the saved stats warehouse (empty to keep it in memory only), interval
+# (in seconds) between two refreshes of the warehouse, age after which the stats of
+# an active player are refreshed, maximum number of concurrent upstream calls of a
+# refresh and number of ingested players between two checkpoints, which publish
+# and save them. The first refresh runs at startup and fills the warehouse the
+# leaderboards and the player metrics are computed from, they answer 404 until its
+# first checkpoint. Setting the interval to 0 disables the refreshes, so only a
+# saved warehouse is served.
+WAREHOUSE_DIR = _env_str("WAREHOUSE_DIR", "data/warehouse")
+WAREHOUSE_REFRESH_INTERVAL = _env_int("WAREHOUSE_REFRESH_INTERVAL", 6 * 60 * 60)
+WAREHOUSE_MAX_AGE = _env_int("WAREHOUSE_MAX_AGE", 6 * 60 * 60)
+WAREHOUSE_MAX_WORKERS = _env_int("WAREHOUSE_MAX_WORKERS", 4)
+WAREHOUSE_CHECKPOINT_EVERY = _env_int("WAREHOUSE_CHECKPOINT_EVERY", 100)
+
+# Startup warming: file the players popularity is saved to (empty to keep it in
+# memory only) and interval (in seconds) between two saves, number of the most
+# popular players whose stats are preloaded, and seconds after which the API is
+# reported ready even if the warming is not done
+POPULARITY_PATH = _env_str("POPULARITY_PATH", "data/popularity.json")
+POPULARITY_SAVE_INTERVAL = _env_int("POPULARITY_SAVE_INTERVAL", 5 * 60)
+WARMUP_HOT_PLAYERS = _env_int("WARMUP_HOT_PLAYERS", 50)
+WARMUP_TIMEOUT = _env_int("WARMUP_TIMEOUT", 120)
+
+# Admission control of the stats.nba.com calls: requests per second and burst of
+# the token bucket, bounds of the adaptive concurrency limit, and latency (in
+# seconds) above which a call counts as a sign of upstream congestion
+STATS_RATE_LIMIT = _env_int("STATS_RATE_LIMIT", 10)
+STATS_RATE_BURST = _env_int("STATS_RATE_BURST", 20)
+STATS_MIN_CONCURRENCY = _env_int("STATS_MIN_CONCURRENCY", 2)
+STATS_MAX_CONCURRENCY = _env_int("STATS_MAX_CONCURRENCY", 32)
+STATS_LATENCY_TARGET = _env_int("STATS_LATENCY_TARGET", 10)
+
+# Circuit breakers of the stats.nba.com endpoints: failure percentage of the calls
+# of the last CIRCUIT_WINDOW seconds tripping a breaker (once it saw at least
+# CIRCUIT_MIN_CALLS calls), duration (in seconds) above which a call counts as
+# failed, seconds a tripped breaker fails fast, and number of trial calls probing
+# upstream before closing it again
+CIRCUIT_FAILURE_THRESHOLD = _env_int("CIRCUIT_FAILURE_THRESHOLD", 50)
+CIRCUIT_MIN_CALLS = _env_int("CIRCUIT_MIN_CALLS", 10)
+CIRCUIT_WINDOW = _env_int("CIRCUIT_WINDOW", 60)
+CIRCUIT_SLOW_CALL_SECONDS = _env_int("CIRCUIT_SLOW_CALL_SECONDS", 20)
+CIRCUIT_OPEN_SECONDS = _env_int("CIRCUIT_OPEN_SECONDS", 30)
+CIRCUIT_HALF_OPEN_CALLS = _env_int("CIRCUIT_HALF_OPEN_CALLS", 3)
+
+# Minimum level of the logs, and their format: "json" (structured) or "text"
+LOG_LEVEL = _env_str("LOG_LEVEL", "INFO")
+LOG_FORMAT = _env_str("LOG_FORMAT", "json")
+
+# HTTP caching: max-age (in seconds) of the responses built from final data only
+# (static lists, completed seasons, retired players), of the articles and of the
+# warehouse stats, and number of URLs whose validators are kept to answer the
+# conditional requests without calling the route
+CACHE_CONTROL_FINAL_MAX_AGE = _env_int("CACHE_CONTROL_FINAL_MAX_AGE", 24 * 60 * 60)
+CACHE_CONTROL_ARTICLES_MAX_AGE = _env_int("CACHE_CONTROL_ARTICLES_MAX_AGE", 60)
+CACHE_CONTROL_WAREHOUSE_MAX_AGE = _env_int("CACHE_CONTROL_WAREHOUSE_MAX_AGE", 5 * 60)
+VALIDATORS_MAX_ENTRIES = _env_int("VALIDATORS_MAX_ENTRIES", 10000)
+
+# Response compression: minimum size (in bytes) of the compressed bodies, gzip level
+# and brotli quality, and size (in bytes) of the compressed bodies of the responses
+# with an ETag kept, to compress them once per version of their data
+COMPRESSION_MIN_SIZE = _env_int("COMPRESSION_MIN_SIZE", 1024)
+COMPRESSION_GZIP_LEVEL = _env_int("COMPRESSION_GZIP_LEVEL", 6)
+COMPRESSION_BROTLI_QUALITY = _env_int("COMPRESSION_BROTLI_QUALITY", 5)
+COMPRESSION_CACHE_MAX_BYTES = _env_int("COMPRESSION_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+# Sampling profiler: fraction of the requests profiled (0 to disable), secret of the
+# X-Profile header profiling a given request (empty to disable it), seconds between
+# two samples and directory of the collapsed stacks of the profiled requests
+PROFILE_SAMPLE_RATE = _env_float("PROFILE_SAMPLE_RATE", 0)
+PROFILE_TOKEN = _env_str("PROFILE_TOKEN", "")
+PROFILE_INTERVAL = _env_float("PROFILE_INTERVAL", 0.005)
+PROFILE_DIR = _env_str("PROFILE_DIR", "data/profiles")
@@ -1,30 +1,111 @@
+import asyncio
 import contextlib
+import logging
 import os
+import anyio
 from fastapi import FastAPI
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 import uvicorn
+from app.config.logging_config import configure_logging
 from app.config.nba_api_config import configure_nba_api
+from app.config.settings import (
+    POPULARITY_PATH,
+    POPULARITY_SAVE_INTERVAL,
+    ROSTERS_REFRESH_INTERVAL,
+    WAREHOUSE_REFRESH_INTERVAL,
+    WARMUP_TIMEOUT,
+)
+from app.middlewares.compression import CompressionMiddleware
+from app.middlewares.conditional import ConditionalRequestMiddleware
+from app.middlewares.metrics import MetricsMiddleware
+from app.middlewares.request_context import RequestContextMiddleware
+from app.middlewares.server_timing import ServerTimingMiddleware
 from app.routes import router
+from app.services.articles_ingestion import ArticlesIngestionScheduler
+from app.services.http_client import close_http_client
+from app.services.nba_api.nba_client_service import refresh_team_rosters
+from app.services.nba_api.upstream import get_upstream_stats
+from app.services.players_search import load_popularity, save_popularity
+from app.services.warehouse import get_warehouse, refresh_warehouse
+from app.services.warmup import is_ready, set_ready, warm_up_then_ready
+from app.utils.json_response import FastJSONResponse
+from app.utils.metrics import UpstreamStatsCollector, threadpool_busy, threadpool_size
+from app.utils.scheduling import run_periodically
 from starlette.middleware.cors import CORSMiddleware
 
+configure_logging()
+logger = logging.getLogger(__name__)
+REGISTRY.register(UpstreamStatsCollector(get_upstream_stats))
+
 
 # Link to the docs: https://fastapi.tiangolo.com/advanced/events/?h=contextlib#async-context-manager
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI):
     configure_nba_api()
-    print("✅ Backcourt API online")
+    if POPULARITY_PATH:
+        load_popularity()
+    articles_scheduler = ArticlesIngestionScheduler()
+    articles_scheduler.start()
+    background_tasks = [asyncio.create_task(warm_up_then_ready(WARMUP_TIMEOUT))]
+    if ROSTERS_REFRESH_INTERVAL:
+        background_tasks.append(
+            asyncio.create_task(
+                run_periodically(refresh_team_rosters, ROSTERS_REFRESH_INTERVAL)
+            )
+        )
+    if WAREHOUSE_REFRESH_INTERVAL:
+        background_tasks.append(
+            asyncio.create_task(
+                run_periodically(refresh_warehouse, WAREHOUSE_REFRESH_INTERVAL)
+            )
+        )
+    if POPULARITY_PATH and POPULARITY_SAVE_INTERVAL:
+        background_tasks.append(
+            asyncio.create_task(
+                run_periodically(
+                    save_popularity,
+                    POPULARITY_SAVE_INTERVAL,
+                    delay=POPULARITY_SAVE_INTERVAL,
+                )
+            )
+        )
+    logger.info("✅ Backcourt API online")
     yield
-    print("🛑 Backcourt API offline")
-
-
-app = FastAPI(lifespan=lifespan)
+    set_ready(False)
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await articles_scheduler.stop()
+    await close_http_client()
+    if POPULARITY_PATH:
+        try:
+            save_popularity()
+        except Exception as e:
+            logger.exception("Error saving the players popularity: %s", e)
+    logger.info("🛑 Backcourt API offline")
 
 
 app = FastAPI(
     title="Backcourt API",
     description="API for the Backcourt application",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+app.add_middleware(ConditionalRequestMiddleware, version=app.version)
+
+app.add_middleware(CompressionMiddleware)
+
+app.add_middleware(RequestContextMiddleware)
+
+app.add_middleware(ServerTimingMiddleware)
+
+app.add_middleware(MetricsMiddleware)
+
+# Added last so it is the outermost middleware, and its headers are also set on
+# the responses answered early by the inner ones, such as the 304 Not Modified
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -43,6 +124,33 @@ async def health_check():
         return {"status": "unhealthy", "message": f"🛑 Backcourt API is offline"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 503 until the caches are warmed after startup, and once the
+    shutdown has started, unlike ``/health`` which only tells the process is up.
+    """
+    if not is_ready():
+        return FastJSONResponse(
+            status_code=503,
+            content={"status": "not ready", "message": "⏳ Backcourt API is warming up"},
+        )
+    return {"status": "ready", "message": "✅ Backcourt API is ready"}
+
+
+@app.get("/health/upstream")
+async def upstream_stats():
+    return {**get_upstream_stats(), "warehouse": get_warehouse().stats()}
+
+
+@app.get("/metrics")
+async def metrics():
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    threadpool_busy.set(limiter.borrowed_tokens)
+    threadpool_size.set(limiter.total_tokens)
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 async def root():
     return {
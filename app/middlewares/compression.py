@@ -0,0 +1,148 @@
+import gzip
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config.settings import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_CACHE_MAX_BYTES,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIN_SIZE,
+    VALIDATORS_MAX_ENTRIES,
+)
+from app.utils.timing import span
+from app.utils.ttl_cache import MISSING, TTLCache
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is used alone without it
+    brotli = None
+
+# Compressed bodies are keyed by ETag, which changes with the data, the TTL only
+# bounds how long the ones of versions no longer served stay in memory
+COMPRESSED_TTL = 24 * 60 * 60
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript")
+
+
+def _compress_gzip(body):
+    return gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def _compress_brotli(body):
+    return brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY)
+
+
+COMPRESSORS = {"gzip": _compress_gzip}
+if brotli is not None:
+    COMPRESSORS = {"br": _compress_brotli, **COMPRESSORS}
+
+
+def negotiate_encoding(accept_encoding):
+    """
+    Return the content coding to compress a response with, or None to send it as is.
+
+    The codings of the Accept-Encoding header are ranked by their q-value, brotli
+    being preferred to gzip when both are equally accepted.
+
+    Args:
+        accept_encoding (str): The Accept-Encoding header of the request.
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip().lower()] = quality
+
+    ranked = [
+        (accepted.get(coding, accepted.get("*", 0.0)), -rank, coding)
+        for rank, coding in enumerate(COMPRESSORS)
+    ]
+    quality, _, coding = max(ranked)
+    return coding if quality > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing the response bodies with gzip or brotli.
+
+    Bodies of at least ``COMPRESSION_MIN_SIZE`` bytes of a textual type are
+    compressed with the coding negotiated from the Accept-Encoding header. The
+    compressed bodies of the successful responses with an ETag are kept, so a
+    response is compressed once per version of its data (see
+    ``ConditionalRequestMiddleware``) rather than once per request.
+
+    Streamed responses and responses already encoded are sent as is.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.compressed = TTLCache(
+            max_entries=VALIDATORS_MAX_ENTRIES,
+            max_bytes=COMPRESSION_CACHE_MAX_BYTES,
+            size_of=len,
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        coding = negotiate_encoding(accept_encoding) if accept_encoding else None
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or not headers.get(
+                    "content-type", ""
+                ).startswith(COMPRESSIBLE_TYPES):
+                    await send(message)
+                else:
+                    start = message
+                return
+
+            if start is None:
+                await send(message)
+                return
+
+            response_start, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < COMPRESSION_MIN_SIZE:
+                await send(response_start)
+                await send(message)
+                return
+
+            headers = MutableHeaders(scope=response_start)
+            headers.add_vary_header("Accept-Encoding")
+            if coding is not None:
+                body = await self._compress(response_start, headers, coding, body)
+                headers["content-encoding"] = coding
+                headers["content-length"] = str(len(body))
+            await send(response_start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _compress(self, message, headers, coding, body):
+        etag = headers.get("etag") if message["status"] == 200 else None
+        if etag is not None:
+            compressed = self.compressed.get((etag, coding))
+            if compressed is not MISSING:
+                return compressed
+
+        with span("compress"):
+            compressed = await run_in_threadpool(COMPRESSORS[coding], body)
+
+        if etag is not None:
+            self.compressed.set((etag, coding), compressed, COMPRESSED_TTL)
+        return compressed
@@ -0,0 +1,199 @@
+import hashlib
+import time
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config.settings import VALIDATORS_MAX_ENTRIES
+from app.utils.conditional import dependency_scope
+from app.utils.request_context import get_stale_values
+from app.utils.ttl_cache import MISSING, TTLCache
+
+# Validators are revalidated against their dependencies, the TTL only bounds how
+# long the ones of URLs no longer requested stay in memory
+VALIDATORS_TTL = 24 * 60 * 60
+
+
+def _opaque_tag(etag):
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+class Validators:
+    """
+    ETag, Last-Modified and expiration of a response, and the data it was built from.
+
+    The ETag is a hash of the URL and of the versions of the dependencies, so it
+    changes whenever the data behind the response does, without rendering it.
+    """
+
+    __slots__ = ("etag", "last_modified", "expires_at", "dependencies")
+
+    def __init__(self, etag, last_modified, expires_at, dependencies):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+        self.dependencies = dependencies
+
+    @classmethod
+    def of(cls, url, dependencies, max_age, salt=""):
+        """
+        Return the validators of a response, or None if its data can't be revalidated.
+
+        Args:
+            url (bytes): The path and query string of the request.
+            dependencies (list): The dependencies recorded while building the response.
+            max_age (float): Upper bound of the Cache-Control max-age of the route.
+            salt (str): Mixed into the ETags, to change them when the API changes.
+        """
+        if not dependencies or any(d.version is None for d in dependencies):
+            return None
+
+        digest = hashlib.blake2b(salt.encode(), digest_size=12)
+        digest.update(url)
+        for name, version in sorted({(d.name, str(d.version)) for d in dependencies}):
+            digest.update(f"\0{name}\0{version}".encode())
+
+        modified = [d.modified_at for d in dependencies if d.modified_at is not None]
+        ages = [max_age] + [d.max_age for d in dependencies if d.max_age is not None]
+        return cls(
+            f'W/"{digest.hexdigest()}"',
+            int(max(modified)) if modified else None,
+            time.time() + min(ages),
+            tuple(dependencies),
+        )
+
+    def is_current(self):
+        """
+        Tell whether the response can still be served as is: it has not expired and
+        every dependency is still at the same version.
+        """
+        return time.time() < self.expires_at and all(
+            dependency.is_current() for dependency in self.dependencies
+        )
+
+    def matches(self, request_headers):
+        """
+        Tell whether the conditional headers of a request match these validators.
+        """
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            tag = _opaque_tag(self.etag)
+            return any(_opaque_tag(t) == tag for t in if_none_match.split(","))
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since is not None and self.last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return self.last_modified <= since
+
+        return False
+
+    def headers(self):
+        max_age = max(0, int(self.expires_at - time.time()))
+        headers = [
+            ("etag", self.etag),
+            ("cache-control", f"public, max-age={max_age}"),
+        ]
+        if self.last_modified is not None:
+            headers.append(("last-modified", formatdate(self.last_modified, usegmt=True)))
+        return headers
+
+
+async def _send_not_modified(send, validators):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 304,
+            "headers": [
+                (name.encode(), value.encode()) for name, value in validators.headers()
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": b""})
+
+
+class ConditionalRequestMiddleware:
+    """
+    ASGI middleware adding validators to the responses and answering conditional requests.
+
+    Successful GET responses of the routes decorated with ``cache_policy`` get an
+    ETag, a Last-Modified and a Cache-Control header built from the dependencies
+    recorded while handling them (see ``app.utils.conditional``). The validators
+    of each URL are kept, so a request whose If-None-Match or If-Modified-Since
+    still matches them is answered 304 Not Modified before reaching the route, as
+    long as every dependency is still at the same version.
+
+    A conditional request without kept validators runs the route, and gets a 304
+    instead of the body when its validators match the new ones.
+
+    Responses built from stale upstream data are sent with ``no-cache``.
+
+    Args:
+        version (str): Version of the API, mixed into the ETags.
+    """
+
+    def __init__(self, app, version=""):
+        self.app = app
+        self.version = version
+        self.validators = TTLCache(max_entries=VALIDATORS_MAX_ENTRIES)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        url = scope["path"].encode() + b"?" + scope["query_string"]
+        request_headers = Headers(scope=scope)
+        conditional = (
+            "if-none-match" in request_headers or "if-modified-since" in request_headers
+        )
+
+        if conditional:
+            validators = self.validators.get(url)
+            if (
+                validators is not MISSING
+                and validators.matches(request_headers)
+                and validators.is_current()
+            ):
+                await _send_not_modified(send, validators)
+                return
+
+        with dependency_scope() as dependencies:
+            not_modified = False
+
+            async def send_with_validators(message):
+                nonlocal not_modified
+                if message["type"] == "http.response.start":
+                    validators = self._validators(scope, url, message, dependencies)
+                    if validators is not None:
+                        if conditional and validators.matches(request_headers):
+                            not_modified = True
+                            await _send_not_modified(send, validators)
+                            return
+                        headers = MutableHeaders(scope=message)
+                        for name, value in validators.headers():
+                            headers[name] = value
+                elif not_modified:
+                    return
+                await send(message)
+
+            await self.app(scope, receive, send_with_validators)
+
+    def _validators(self, scope, url, message, dependencies):
+        max_age = getattr(scope.get("endpoint"), "cache_max_age", None)
+        if max_age is None or message["status"] != 200:
+            return None
+
+        if get_stale_values():
+            MutableHeaders(scope=message)["cache-control"] = "no-cache"
+            return None
+
+        validators = Validators.of(url, dependencies, max_age, self.version)
+        if validators is not None:
+            self.validators.set(url, validators, VALIDATORS_TTL)
+        return validators
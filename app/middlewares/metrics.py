@@ -0,0 +1,45 @@
+import time
+
+from app.utils.metrics import (
+    http_request_duration,
+    http_requests,
+    http_requests_in_flight,
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording the count, status and latency of the HTTP requests.
+
+    Requests are labelled with the path template of their route (e.g.
+    "/v1/players/stats/career/{player_id}"), so the label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_request_duration.labels(scope["method"], path).observe(
+                time.perf_counter() - started_at
+            )
+            http_requests.labels(scope["method"], path, str(status_code)).inc()
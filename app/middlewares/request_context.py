@@ -0,0 +1,35 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+
+from app.utils.request_context import get_stale_values, request_scope
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware opening a request scope for every HTTP request.
+
+    When the response is built from stale upstream values, it gets a ``Warning``
+    header and an ``X-Data-Age`` header with the age in seconds of the oldest one.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_staleness(message):
+            if message["type"] == "http.response.start":
+                stale = get_stale_values()
+                if stale:
+                    oldest = min(stored_at for _, stored_at in stale)
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Warning", '110 - "Response is Stale"')
+                    headers["X-Data-Age"] = str(int(time.time() - oldest))
+            await send(message)
+
+        with request_scope():
+            await self.app(scope, receive, send_with_staleness)
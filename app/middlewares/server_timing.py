@@ -0,0 +1,93 @@
+import hmac
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.config.settings import (
+    PROFILE_DIR,
+    PROFILE_INTERVAL,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_TOKEN,
+)
+from app.utils.profiler import SamplingProfiler
+from app.utils.timing import timing_scope
+
+logger = logging.getLogger(__name__)
+
+# The profiler samples every thread, so profiled requests are profiled one at a time
+_profiling = threading.Lock()
+
+
+def _save_profile(name, profiler):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{name}.folded")
+    with open(path, "w") as file:
+        file.write(profiler.collapsed())
+    return path
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware reporting where the time of each HTTP request went.
+
+    The spans recorded during the request (see ``app.utils.timing``) are sent in a
+    ``Server-Timing`` header, next to the total time until the response started.
+
+    A fraction ``PROFILE_SAMPLE_RATE`` of the requests, and the requests sending
+    the ``X-Profile`` header with the value of ``PROFILE_TOKEN``, are also profiled:
+    their collapsed stacks are saved to ``PROFILE_DIR`` under the name given in the
+    ``X-Profile-Id`` response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler = None
+        if self._should_profile(scope) and _profiling.acquire(blocking=False):
+            profiler = SamplingProfiler(PROFILE_INTERVAL).start()
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+        with timing_scope() as timings:
+
+            async def send_with_timings(message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.server_timing())
+                    if profiler is not None:
+                        headers["X-Profile-Id"] = profile_id
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timings)
+            finally:
+                if profiler is not None:
+                    profiler.stop()
+                    _profiling.release()
+                    path = await anyio.to_thread.run_sync(
+                        _save_profile, profile_id, profiler
+                    )
+                    logger.info(
+                        "Profiled %s %s",
+                        scope["method"],
+                        scope["path"],
+                        extra={"profile": path, "samples": profiler.samples},
+                    )
+
+    @staticmethod
+    def _should_profile(scope):
+        if PROFILE_TOKEN:
+            token = Headers(scope=scope).get("x-profile")
+            if token is not None and hmac.compare_digest(token, PROFILE_TOKEN):
+                return True
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
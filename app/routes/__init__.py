@@ -1,6 +1,7 @@
 from .players_route import router as players_route
 from .teams_route import router as teams_route
 from .articles_route import router as articles_route
+from .leaderboards_route import router as leaderboards_route
 from fastapi import APIRouter
 
 router = APIRouter()
@@ -8,4 +9,5 @@ router = APIRouter()
 
 router.include_router(players_route)
 router.include_router(articles_route)
-router.include_router(teams_route)
\ No newline at end of file
+router.include_router(teams_route)
+router.include_router(leaderboards_route)
\ No newline at end of file
@@ -1,51 +1,76 @@
 from typing import List, Optional
 
-from fastapi.responses import JSONResponse
-from app.services.scrapper import get_articles
-from fastapi import APIRouter, FastAPI, Query
+from app.config.settings import CACHE_CONTROL_ARTICLES_MAX_AGE
+from app.services.articles_index import articles_index
+from app.services.articles_ingestion import get_snapshot
+from app.utils.conditional import cache_policy, depends_on
+from app.utils.json_response import FastJSONResponse
+from app.utils.query import Query as ListQuery
+from fastapi import APIRouter, FastAPI, HTTPException, Query
 
 app = FastAPI()
 router = APIRouter()
 
 
 @router.get("/articles", response_model=List[dict])
-def get_nba_articles(
+@cache_policy(max_age=CACHE_CONTROL_ARTICLES_MAX_AGE)
+async def get_nba_articles(
     source: Optional[str] = Query(None, description="Filter by source"),
     player_name: Optional[str] = Query(None, description="Filter by player name"),
     team_name: Optional[str] = Query(None, description="Filter by team name"),
+    q: Optional[str] = Query(None, description="Search the articles by keywords"),
     limit: Optional[int] = Query(None, description="Limit the number of articles"),
     page: Optional[int] = Query(None, description="Paginate the articles"),
     page_size: Optional[int] = Query(10, description="Paginate the articles"),
+    cursor: Optional[str] = Query(
+        None, description="Cursor of the page, from the X-Next-Cursor header"
+    ),
 ):
-    articles = get_articles()
+    """
+    Retrieve the latest NBA articles.
 
-    if source is None:
-        articles = sorted(articles, key=lambda x: x["source"].lower() != "nba")
+    When searching by player name, team name or keywords, the articles must match
+    every given filter and are ranked by relevance.
+
+    The total number of articles is sent in the X-Total-Count header, and the
+    cursor of the next page, if any, in the X-Next-Cursor header.
+    """
+    snapshot = get_snapshot()
+    articles_index.sync(snapshot)
+
+    # Until the first ingestion the list is empty, and must not be kept by any cache
+    ingested = snapshot.modified_at > 0
+    depends_on(
+        "articles",
+        snapshot.modified_at if ingested else None,
+        lambda: get_snapshot().modified_at,
+        modified_at=snapshot.modified_at if ingested else None,
+    )
+
+    if player_name or team_name or q:
+        query = ListQuery(articles_index.search([player_name, team_name, q], source=source))
+    elif source is None:
+        query = ListQuery(snapshot.articles).order_by(
+            lambda article: article["source"].lower() != "nba"
+        )
     else:
-        articles = [a for a in articles if a["source"].lower() == source.lower()]
-
-    if limit:
-        articles = articles[:limit]
-
-    if player_name:
-        name_parts = player_name.lower().split()
-        filtered_articles = [
-            article for article in articles
-            if any(part in article["title"].lower() or part in article["url"].lower() for part in name_parts)
-        ]
-        return filtered_articles
-
-    if team_name:
-        for article in articles:
-            if (
-                team_name.lower() in article["title"].lower()
-                or team_name.lower() in article["url"].lower()
-            ):
-                return [article]
-
-    if page:
-        page = page or 1
-        if page_size is not None:
-            articles = articles[(page - 1) * page_size : page * page_size]
-
-    return JSONResponse(content=articles)
+        query = ListQuery(snapshot.articles).filter(
+            lambda article: article["source"].lower() == source.lower()
+        )
+
+    try:
+        result = query.limit(limit).page(page, page_size, cursor).execute()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {
+        **result.headers(),
+        "X-Articles-Updated-At": ", ".join(
+            f"{name}={updated_at.isoformat()}"
+            for name, updated_at in snapshot.updated_at.items()
+        ),
+    }
+    if not ingested:
+        headers["Cache-Control"] = "no-store"
+
+    return FastJSONResponse(content=result.items, headers=headers)
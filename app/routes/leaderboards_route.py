@@ -0,0 +1,71 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.config.settings import CACHE_CONTROL_WAREHOUSE_MAX_AGE
+from app.services.analytics import get_leaderboard
+from app.services.warehouse import get_warehouse
+from app.utils.conditional import cache_policy
+from app.utils.json_response import FastJSONResponse
+
+router = APIRouter()
+
+
+@router.get("/leaderboards", response_model=dict)
+@cache_policy(max_age=CACHE_CONTROL_WAREHOUSE_MAX_AGE)
+async def get_leaderboards(
+    stat: str = Query(
+        "PTS", description="Rank by a stat (PTS, REB, AST...) or a metric (PER, TS_PCT...)"
+    ),
+    season: Optional[str] = Query(
+        None, description="Filter by season: (2023-24) or None for the latest season"
+    ),
+    season_type: Literal["Regular Season", "Playoffs"] = "Regular Season",
+    per_mode: Literal["Totals", "PerGame", "Per36", "Per100"] = "PerGame",
+    min_games: int = Query(0, ge=0, description="Minimum number of games played"),
+    limit: int = Query(25, ge=1, le=100, description="Number of players ranked"),
+    ascending: bool = Query(False, description="Rank the lowest values first"),
+):
+    """
+    Rank the players of a season by a stat, from the stats warehouse.
+
+    Args:
+        stat (str): The stat or the metric to rank the players by.
+        season (Optional[str]): Filter by season, e.g. '2023-24'.
+        season_type (Literal["Regular Season", "Playoffs"]): Filter by season type.
+        per_mode (Literal["Totals", "PerGame", "Per36", "Per100"]): Mode of the counting stats.
+        min_games (int): Minimum number of games played to be ranked.
+        limit (int): Number of players ranked.
+        ascending (bool): Rank the lowest values first.
+
+    Returns:
+        dict: The parameters of the leaderboard and the ranked players.
+
+    Raises:
+        HTTPException: If the season or the stat is invalid, or the warehouse is empty.
+    """
+    if not season:
+        seasons = get_warehouse().snapshot().seasons(season_type)
+        if not seasons:
+            raise HTTPException(status_code=404, detail="No stats in the warehouse")
+        season = seasons[0]
+
+    try:
+        ranking = get_leaderboard(
+            stat, season, season_type, per_mode, min_games, limit, ascending
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid season: {season}")
+
+    if ranking is None:
+        raise HTTPException(status_code=400, detail=f"Unknown stat: {stat}")
+
+    return FastJSONResponse(
+        content={
+            "stat": stat.upper(),
+            "season": season,
+            "season_type": season_type,
+            "per_mode": per_mode,
+            "leaders": ranking,
+        }
+    )
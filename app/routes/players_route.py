@@ -1,54 +1,94 @@
-from collections import Counter, defaultdict
+from collections import defaultdict
 from typing import List, Literal, Optional
 
-from nba_api.stats.endpoints import CommonTeamRoster
-from fastapi.responses import JSONResponse
 import pandas as pd
 from app.services.nba_api.nba_client_service import (
     get_active_players,
     get_all_players,
-    get_player_awards,
-    get_player_carrer_totals,
-    get_player_seasons_dashboard,
-    get_player_dashboard_by_year_over_year,
-    get_player_info,
+    get_player_awards_async,
+    get_player_carrer_totals_async,
+    get_player_seasons_dashboard_async,
+    get_player_dashboard_by_year_over_year_async,
+    get_player_info_async,
+    get_players_info_async,
     get_inactive_players,
-    get_player_career_dashboard,
+    get_player_career_dashboard_async,
     get_team_by_name,
+    get_team_player_ids_async,
 )
-from fastapi import APIRouter, FastAPI, HTTPException, Query
+from fastapi import APIRouter, Body, FastAPI, HTTPException, Query
 
-from app.utils.clean_json import clean_nan
+from app.config.settings import (
+    CACHE_CONTROL_FINAL_MAX_AGE,
+    CACHE_CONTROL_WAREHOUSE_MAX_AGE,
+    PLAYER_INFO_BATCH_MAX_SIZE,
+    PLAYER_METRICS_BATCH_MAX_SIZE,
+)
+from app.services.analytics import (
+    get_player_metrics,
+    get_season_metrics,
+    metrics_record,
+    per_game,
+)
+from app.services.players_search import count_lookup, get_players_index, player_counter
+from app.services.warehouse import get_warehouse
+from app.utils.conditional import cache_policy
+from app.utils.json_response import FastJSONResponse
+from app.utils.query import Query as ListQuery
+from app.utils.timing import span
 
 app = FastAPI()
 router = APIRouter()
-player_counter = Counter()
+
+CAREER_PER_GAME_COLUMNS = [
+    "pts",
+    "reb",
+    "ast",
+    "stl",
+    "blk",
+    "tov",
+    "fgm",
+    "fga",
+    "fg3m",
+    "fg3a",
+    "ftm",
+    "fta",
+]
 
 
 @router.get("/players", response_model=List[dict])
-def get_players(
+@cache_policy(max_age=CACHE_CONTROL_FINAL_MAX_AGE)
+async def get_players(
     is_active: Optional[bool] = Query(None, description="Filter by active players"),
     player_name: Optional[str] = Query(None, description="Filter by player name"),
     team_name: Optional[str] = Query(None, description="Filter by team"),
     limit: Optional[int] = Query(None, description="Limit the number of players"),
     page: Optional[int] = Query(None, description="Paginate the teams"),
     page_size: Optional[int] = Query(10, description="Paginate the teams"),
+    cursor: Optional[str] = Query(
+        None, description="Cursor of the page, from the X-Next-Cursor header"
+    ),
 ):
+    """
+    Retrieve the players, optionally filtered by name, activity and team.
 
+    The total number of players is sent in the X-Total-Count header, and the
+    cursor of the next page, if any, in the X-Next-Cursor header.
+    """
     players = []
 
-    if is_active is True:
+    if player_name:
+        players = get_players_index().filter(player_name, is_active=is_active)
+        if len(players) == 1:
+            count_lookup(players[0]["id"])
+    elif is_active is True:
         players = get_active_players()
     elif is_active is False:
         players = get_inactive_players()
     else:
         players = get_all_players()
 
-    if player_name:
-        players = list(
-            filter(lambda p: player_name.lower() in p["full_name"].lower(), players)
-        )
-        player_counter[player_name.lower()] += 1
+    query = ListQuery(players)
 
     if team_name:
         teams = list(
@@ -57,27 +97,46 @@ def get_players(
                 get_team_by_name(team_name),
             )
         )
-        team = teams[0]
-        roster = CommonTeamRoster(
-            team_id=team["id"]
-        ).common_team_roster.get_data_frame()
-        players = list(
-            filter(lambda p: p["id"] in roster["PLAYER_ID"].tolist(), players)
-        )
+        if not teams:
+            raise HTTPException(status_code=404, detail="Team not found")
+
+        roster_ids = await get_team_player_ids_async(teams[0]["id"])
+        query.filter(lambda player: player["id"] in roster_ids)
 
-    if limit:
-        players = players[:limit]
+    try:
+        result = query.limit(limit).page(page, page_size, cursor).execute()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if page:
-        page = page or 1
-        if page and page_size:
-            players = players[(page - 1) * page_size : page * page_size]
+    return FastJSONResponse(content=result.items, headers=result.headers())
 
-    return JSONResponse(content=players)
+
+@router.get("/players/search", response_model=List[dict])
+async def search_players(
+    q: str = Query(..., min_length=1, description="Beginning or part of the player name"),
+    is_active: Optional[bool] = Query(None, description="Filter by active players"),
+    limit: int = Query(10, ge=1, le=50, description="Limit the number of players"),
+):
+    """
+    Typeahead search of the players by name.
+
+    Players are ranked by how well their name matches the query (exact, prefix,
+    word prefix, substring, then similar names to tolerate typos) and, for
+    matches of the same kind, by how often they have been looked up.
+    """
+    players = get_players_index().search(
+        q,
+        limit=limit,
+        is_active=is_active,
+        popularity=lambda player: player_counter[player["id"]],
+    )
+
+    return FastJSONResponse(content=players)
 
 
 @router.get("/players/stats/career/{player_id}", response_model=dict)
-def get_player_career_stats(
+@cache_policy(max_age=CACHE_CONTROL_FINAL_MAX_AGE)
+async def get_player_career_stats(
     player_id: str,
     season_type: Optional[Literal["Regular Season", "Pre Season", "Playoffs"]] = Query(
         None, description="Filter by season type"
@@ -95,6 +154,9 @@ def get_player_career_stats(
     ] = Query(None, description="Filter by per mode"),
     page: Optional[int] = Query(None, description="Paginate the seasons"),
     page_size: Optional[int] = Query(10, description="Paginate the seasons"),
+    cursor: Optional[str] = Query(
+        None, description="Cursor of the page, from the X-Next-Cursor header"
+    ),
 ):
     """
     Retrieve the career statistics for a specific player using provided parameters.
@@ -105,6 +167,7 @@ def get_player_career_stats(
         season (str): Filter by specific season, e.g., '2023-24', All or empty to get the carrer totals.
         page (int): Paginate the seasons.
         page_size (int): Paginate the seasons.
+        cursor (str): Cursor of the page, sent in the X-Next-Cursor header of the previous one.
 
     Returns:
         dict: A dictionary containing the career statistics information.
@@ -118,6 +181,9 @@ def get_player_career_stats(
             detail="Param player_id is required",
         )
 
+    if not player_id.isdigit():
+        raise HTTPException(status_code=400, detail=f"Invalid player_id: {player_id}")
+
     params = {
         "player_id": player_id,
     }
@@ -125,7 +191,8 @@ def get_player_career_stats(
     if perMode:
         params["per_mode36"] = perMode
 
-    player_totals = get_player_carrer_totals(params)
+    player_totals = await get_player_carrer_totals_async(params)
+    count_lookup(player_id)
 
     if season == "All":
         if season_type == "Playoffs":
@@ -163,53 +230,39 @@ def get_player_career_stats(
     df.columns = df.columns.str.lower()
 
     if "gp" not in df.columns or df["gp"].sum() == 0:
-        return JSONResponse(
+        return FastJSONResponse(
             content={
                 "season_type": season_type or "Regular Season",
                 "totals" if season != "All" else "seasons": [],
             }
         )
 
-    stats_columns = [
-        "pts",
-        "reb",
-        "ast",
-        "stl",
-        "blk",
-        "tov",
-        "fgm",
-        "fga",
-        "fg3m",
-        "fg3a",
-        "ftm",
-        "fta",
-    ]
-
-    for stat in stats_columns:
-        if stat in df.columns:
-            df[f"{stat}_per_game"] = (df[stat] / df["gp"]).round(1)
-
-    if page:
-        start_idx = (page - 1) * (page_size or 0)
-        end_idx = (start_idx) + (page_size or 0)
-        df = df.iloc[start_idx:end_idx]
+    try:
+        result = (
+            ListQuery.from_frame(df)
+            .page(page, page_size, cursor)
+            .transform(lambda rows: per_game(rows, CAREER_PER_GAME_COLUMNS))
+            .transform(lambda rows: rows.drop(columns=["player_id"]))
+            .execute()
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     response_key = "totals" if season != "All" else "seasons"
 
-    records = df.drop(columns=["player_id"]).to_dict(orient="records")
-
-    safe_data = clean_nan(records)
-    return JSONResponse(
+    return FastJSONResponse(
         content={
             "season_type": season_type or "Regular Season",
-            response_key: safe_data,
-        }
+            response_key: result.items,
+        },
+        headers=result.headers(),
     )
 
 
 # Retrieve general information about the player (age, height, weight, etc.)
 @router.get("/players/player/info", response_model=dict)
-def get_player_common_info(
+@cache_policy(max_age=CACHE_CONTROL_FINAL_MAX_AGE)
+async def get_player_common_info(
     player_id: Optional[int] = Query(None, description="Filter by player id"),
     player_name: Optional[str] = Query(None, description="Filter by player name"),
 ):
@@ -220,30 +273,54 @@ def get_player_common_info(
         )
 
     if player_id:
-        player_info = get_player_info(player_id)
+        player_info = await get_player_info_async(player_id)
+        count_lookup(player_id)
         return {"player_id": player_id, "player_info": player_info}
 
     if player_name:
-        all_players = get_all_players()
-        filtered_players = list(
-            filter(lambda p: player_name.lower() in p["full_name"].lower(), all_players)
-        )
+        filtered_players = get_players_index().filter(player_name)
 
         if not filtered_players:
             raise HTTPException(
                 status_code=404, detail="No players found with that name"
             )
 
-        player_infos = [get_player_info(player["id"]) for player in filtered_players]
+        results = await get_players_info_async([player["id"] for player in filtered_players])
+        if len(filtered_players) == 1:
+            count_lookup(filtered_players[0]["id"])
 
-        df = pd.DataFrame(player_infos)
-        df.columns = df.columns.str.lower()
+        player_infos = [
+            {key.lower(): value for key, value in result["player_info"].items()}
+            if "player_info" in result
+            else {"person_id": result["player_id"], "error": result["error"]}
+            for result in results
+        ]
+
+        return FastJSONResponse(content=player_infos)
+
+
+@router.post("/players/player/info:batch", response_model=List[dict])
+async def get_players_common_info(
+    player_ids: List[int] = Body(
+        ...,
+        min_length=1,
+        max_length=PLAYER_INFO_BATCH_MAX_SIZE,
+        description="The ids of the players",
+    ),
+):
+    """
+    Retrieve the general information of several players at once.
 
-        return JSONResponse(content=df.to_dict(orient="records"))
+    The players are fetched concurrently. A player whose information can't be
+    retrieved gets an entry with an "error" and its "status_code" instead of
+    failing the whole batch.
+    """
+    return FastJSONResponse(content=await get_players_info_async(player_ids))
 
 
 @router.get("/players/player/awards", response_model=dict)
-def fetch_player_awards(
+@cache_policy(max_age=CACHE_CONTROL_FINAL_MAX_AGE)
+async def fetch_player_awards(
     player_id: int = Query(None, description="Filter by player id"),
     detailed: Optional[bool] = Query(
         False, description="Return detailed awards information"
@@ -270,7 +347,8 @@ def fetch_player_awards(
             status_code=400, detail="Missing required parameter: player_id"
         )
 
-    raw_awards = get_player_awards(player_id)
+    raw_awards = await get_player_awards_async(player_id)
+    count_lookup(player_id)
 
     if not raw_awards:
         return {"summary": "", "details": []} if detailed else ""
@@ -307,13 +385,99 @@ def fetch_player_awards(
     )
 
     if not detailed:
-        return JSONResponse(content=summary)
+        return FastJSONResponse(content=summary)
 
     return {"summary": summary, "details": raw_awards}
 
 
+@router.get("/players/stats/metrics/{player_id}", response_model=List[dict])
+@cache_policy(max_age=CACHE_CONTROL_WAREHOUSE_MAX_AGE)
+async def get_player_advanced_metrics(
+    player_id: int,
+    season: Optional[str] = Query(
+        None, description="Filter by season: (2022-23) or None for all the seasons played"
+    ),
+    season_type: Literal["Regular Season", "Playoffs"] = "Regular Season",
+):
+    """
+    Retrieve the advanced metrics of a player (PER, TS%, eFG%, USG%, per 36 minutes
+    and per 100 possessions rates), computed from the stats warehouse.
+
+    Args:
+        player_id (int): The unique identifier for the player.
+        season (Optional[str]): Filter by season, e.g. '2023-24'.
+        season_type (Literal["Regular Season", "Playoffs"]): Filter by season type.
+
+    Returns:
+        list: The metrics of each season, most recent first.
+
+    Raises:
+        HTTPException: If the season is invalid or no stats of the player were ingested.
+    """
+    try:
+        records = get_player_metrics(player_id, season, season_type)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid season: {season}")
+
+    if not records:
+        raise HTTPException(
+            status_code=404, detail="No stats found for this player in the warehouse"
+        )
+
+    count_lookup(player_id)
+    return FastJSONResponse(content=records)
+
+
+@router.post("/players/stats/metrics:batch", response_model=List[dict])
+async def get_players_advanced_metrics(
+    player_ids: List[int] = Body(
+        ...,
+        min_length=1,
+        max_length=PLAYER_METRICS_BATCH_MAX_SIZE,
+        description="The ids of the players",
+    ),
+    season: Optional[str] = Query(
+        None, description="Filter by season: (2022-23) or None for the latest season"
+    ),
+    season_type: Literal["Regular Season", "Playoffs"] = "Regular Season",
+):
+    """
+    Retrieve the advanced metrics of several players for a season at once.
+
+    A player without stats in the season gets an entry with an "error" and its
+    "status_code" instead of failing the whole batch.
+    """
+    if not season:
+        seasons = get_warehouse().snapshot().seasons(season_type)
+        if not seasons:
+            raise HTTPException(status_code=404, detail="No stats in the warehouse")
+        season = seasons[0]
+
+    try:
+        table, metrics = get_season_metrics(season, season_type)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid season: {season}")
+
+    results = []
+    for player_id in player_ids:
+        row = table.row_of(player_id)
+        if row is None:
+            results.append(
+                {
+                    "player_id": player_id,
+                    "error": f"No stats found for this player in season {season}",
+                    "status_code": 404,
+                }
+            )
+        else:
+            results.append(metrics_record(table, metrics, row))
+
+    return FastJSONResponse(content=results)
+
+
 @router.get("/players/stats/advanced/{player_id}", response_model=dict)
-def get_player_advanced_stats(
+@cache_policy(max_age=CACHE_CONTROL_FINAL_MAX_AGE)
+async def get_player_advanced_stats(
     player_id: int,
     per_mode: Literal[
         "Totals",
@@ -360,44 +524,47 @@ def get_player_advanced_stats(
     fantasy_profile_df = pd.DataFrame()
 
     if season == "All":
-        fantasy_profile_df = get_player_seasons_dashboard(params)
+        fantasy_profile_df = await get_player_seasons_dashboard_async(params)
         fantasy_profile_df.columns = fantasy_profile_df.columns.str.lower()
 
     elif season and season != "Totals":
         params["season"] = season
-        dashboard = get_player_dashboard_by_year_over_year(params)
+        dashboard = await get_player_dashboard_by_year_over_year_async(params)
         fantasy_profile_df = dashboard.by_year_player_dashboard.get_data_frame()
         fantasy_profile_df.columns = fantasy_profile_df.columns.str.lower()
 
     elif season == "Totals":
-        fantasy_profile_df = get_player_career_dashboard(params)
+        fantasy_profile_df = await get_player_career_dashboard_async(params)
         if fantasy_profile_df is not None:
             fantasy_profile_df.columns = fantasy_profile_df.columns.str.lower()
 
     else:
-        dashboard = get_player_dashboard_by_year_over_year(params)
+        dashboard = await get_player_dashboard_by_year_over_year_async(params)
         fantasy_profile_df = dashboard.overall_player_dashboard.get_data_frame()
         fantasy_profile_df.columns = fantasy_profile_df.columns.str.lower()
 
+    count_lookup(player_id)
+
     if fantasy_profile_df is not None:
-        stats_data = fantasy_profile_df.drop(
-            columns=[
-                col
-                for col in fantasy_profile_df.columns
-                if "_rank" in col
-                or "group_set" in col
-                or "wnba_fantasy_pts" in col
-                or "season" in col
-            ],
-            errors="ignore",
-        ).drop_duplicates(keep="first")
-
-    return JSONResponse(
+        with span("transform"):
+            stats_data = fantasy_profile_df.drop(
+                columns=[
+                    col
+                    for col in fantasy_profile_df.columns
+                    if "_rank" in col
+                    or "group_set" in col
+                    or "wnba_fantasy_pts" in col
+                    or "season" in col
+                ],
+                errors="ignore",
+            ).drop_duplicates(keep="first")
+
+    return FastJSONResponse(
         content={
             "player_id": player_id,
             "per_mode": per_mode or "All",
             "season": season or "All",
             "season_type": season_type or "All",
-            "stats": stats_data.to_dict(orient="records"),
+            "stats": stats_data,
         }
     )
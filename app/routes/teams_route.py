@@ -1,13 +1,22 @@
 from typing import List, Optional
-from fastapi import APIRouter, FastAPI, Query
-from fastapi.responses import JSONResponse
-from app.services.nba_api.nba_client_service import get_all_teams, get_team_by_name, get_team_by_nickname
+from fastapi import APIRouter, FastAPI, HTTPException, Query
+from app.services.nba_api.nba_client_service import (
+    get_all_teams,
+    get_team_by_id,
+    get_team_by_name,
+    get_team_by_nickname,
+    get_team_roster_async,
+)
+from app.config.settings import CACHE_CONTROL_FINAL_MAX_AGE
+from app.utils.conditional import cache_policy
+from app.utils.json_response import FastJSONResponse
 
 app = FastAPI()
 router = APIRouter()
 
 @router.get("/teams", response_model=List[dict])
-def get_teams(
+@cache_policy(max_age=CACHE_CONTROL_FINAL_MAX_AGE)
+async def get_teams(
         nickname: Optional[str] = Query(None, description="Filter by team nickname"), 
         name: Optional[str] = Query(None, description="Filter by team name"),
         limit: Optional[int] = Query(None, description="Limit the number of teams"),
@@ -33,4 +42,26 @@ def get_teams(
         if page_size is not None:
             teams = teams[(page - 1) * page_size : page * page_size]
         
-    return JSONResponse(content=teams)
\ No newline at end of file
+    return FastJSONResponse(content=teams)
+
+
+@router.get("/teams/{team_id}/roster", response_model=dict)
+@cache_policy(max_age=CACHE_CONTROL_FINAL_MAX_AGE)
+async def get_roster(team_id: int):
+    """
+    Retrieve the current roster of a team.
+
+    Args:
+        team_id (int): The unique identifier for the team.
+
+    Returns:
+        dict: A dictionary containing the team and the players of its roster.
+
+    Raises:
+        HTTPException: If the team does not exist.
+    """
+    team = get_team_by_id(team_id)
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+
+    return FastJSONResponse(content={"team": team, "players": await get_team_roster_async(team_id)})
@@ -1,9 +1,343 @@
-# from http.client import HTTPException
-# import pandas as pd
+"""
+Advanced metrics computed from the season tables of the stats warehouse.
 
-# from app.routes.players_route import get_players
-# from app.services.nba_api.nba_client_service import get_player_seasons_dashboard
+Every metric is computed for all the players of a season at once, with NumPy
+operations over the columns of the table, and cached until the warehouse changes.
+"""
+import threading
 
+import numpy as np
+import pandas as pd
+from nba_api.stats.static import players
 
-# def analysis_player_per(player_name: str) -> dict:
-#     pass
\ No newline at end of file
+from app.config.settings import (
+    CACHE_CONTROL_WAREHOUSE_MAX_AGE,
+    LEADERBOARD_CACHE_MAX_ENTRIES,
+)
+from app.services.warehouse import STAT_COLUMNS, get_warehouse, season_id
+from app.utils.conditional import depends_on
+from app.utils.ttl_cache import MISSING, TTLCache
+
+# Counting stats reported per game, per 36 minutes and per 100 possessions
+RATE_STATS = (
+    "PTS",
+    "OREB",
+    "DREB",
+    "REB",
+    "AST",
+    "STL",
+    "BLK",
+    "TOV",
+    "FGM",
+    "FGA",
+    "FG3M",
+    "FG3A",
+    "FTM",
+    "FTA",
+    "PF",
+)
+
+# Metrics of a season are immutable for a given warehouse version
+METRICS_CACHE_TTL = 24 * 60 * 60
+
+# Modes of the counting stats in leaderboards, and the metric suffix of each of them
+PER_MODES = {"Totals": "", "PerGame": "_PER_GAME", "Per36": "_PER_36", "Per100": "_PER_100"}
+
+_metrics_cache = TTLCache(max_entries=256)
+_leaderboards_cache = TTLCache(max_entries=LEADERBOARD_CACHE_MAX_ENTRIES)
+
+_player_names = None
+_player_names_lock = threading.Lock()
+
+
+def _ratio(numerator, denominator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def _possessions(c):
+    """
+    Estimate the possessions used by a player or a team from its totals.
+    """
+    return c["FGA"] + 0.44 * c["FTA"] - c["OREB"] + c["TOV"]
+
+
+def compute_metrics(table):
+    """
+    Compute the advanced metrics of every player of a season table.
+
+    Team totals come from the players' team rows and league totals from the
+    team totals. A traded player is compared to the last team they played for.
+
+    Args:
+        table (SeasonTable): The season table of the warehouse.
+
+    Returns:
+        dict: The arrays of each metric, aligned with ``table.player_ids``.
+    """
+    c = {name: np.nan_to_num(column) for name, column in table.columns.items()}
+    gp, minutes = c["GP"], c["MIN"]
+
+    # Team totals of each player's team, aligned with the players, NaN for the
+    # players whose team has no totals (the metrics relying on them are then NaN)
+    team = _team_totals(table)
+    league = {name: column.sum() for name, column in table.team_columns.items()}
+
+    metrics = {"GP": gp, "MIN": minutes, "MIN_PER_GAME": _ratio(minutes, gp)}
+
+    # Player possessions are their share of the team's possessions while on court
+    team_possessions = _possessions(team)
+    on_court_possessions = team_possessions * _ratio(minutes, team["MIN"] / 5)
+
+    for name in RATE_STATS:
+        metrics[f"{name}_PER_GAME"] = _ratio(c[name], gp)
+        metrics[f"{name}_PER_36"] = 36 * _ratio(c[name], minutes)
+        metrics[f"{name}_PER_100"] = 100 * _ratio(c[name], on_court_possessions)
+
+    metrics["TS_PCT"] = _ratio(c["PTS"], 2 * (c["FGA"] + 0.44 * c["FTA"]))
+    metrics["EFG_PCT"] = _ratio(c["FGM"] + 0.5 * c["FG3M"], c["FGA"])
+    metrics["USG_PCT"] = 100 * _ratio(
+        (c["FGA"] + 0.44 * c["FTA"] + c["TOV"]) * (team["MIN"] / 5),
+        minutes * (team["FGA"] + 0.44 * team["FTA"] + team["TOV"]),
+    )
+    # The league totals are all zero in a season without team rows
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics["PER"] = _player_efficiency_rating(c, team, league)
+
+    return {name: np.round(values, 3) for name, values in metrics.items()}
+
+
+def _team_totals(table):
+    """
+    Return the totals of the team of each player of a season table, NaN when the
+    season has no totals for their team.
+    """
+    if not len(table.teams):
+        missing = np.full(len(table.team_ids), np.nan)
+        return {name: missing for name in table.team_columns}
+
+    rows = np.searchsorted(table.teams, table.team_ids).clip(max=len(table.teams) - 1)
+    found = table.teams[rows] == table.team_ids
+    return {
+        name: np.where(found, column[rows], np.nan)
+        for name, column in table.team_columns.items()
+    }
+
+
+def _player_efficiency_rating(c, team, league):
+    """
+    Hollinger's PER, adjusted for the team pace and scaled to a league average of 15.
+    """
+    factor = (2 / 3) - (0.5 * (league["AST"] / league["FGM"])) / (
+        2 * (league["FGM"] / league["FTM"])
+    )
+    vop = league["PTS"] / _possessions(league)
+    drb_pct = (league["REB"] - league["OREB"]) / league["REB"]
+    team_ast_ratio = _ratio(team["AST"], team["FGM"])
+
+    unadjusted = _ratio(1, c["MIN"]) * (
+        c["FG3M"]
+        + (2 / 3) * c["AST"]
+        + (2 - factor * team_ast_ratio) * c["FGM"]
+        + c["FTM"] * 0.5 * (1 + (1 - team_ast_ratio) + (2 / 3) * team_ast_ratio)
+        - vop * c["TOV"]
+        - vop * drb_pct * (c["FGA"] - c["FGM"])
+        - vop * 0.44 * (0.44 + 0.56 * drb_pct) * (c["FTA"] - c["FTM"])
+        + vop * (1 - drb_pct) * (c["REB"] - c["OREB"])
+        + vop * drb_pct * c["OREB"]
+        + vop * c["STL"]
+        + vop * drb_pct * c["BLK"]
+        - c["PF"]
+        * ((league["FTM"] / league["PF"]) - 0.44 * (league["FTA"] / league["PF"]) * vop)
+    )
+
+    # Possessions per 48 minutes, the team minutes count the 5 players on court
+    team_pace = 48 * _ratio(_possessions(team), team["MIN"] / 5)
+    league_pace = 48 * _possessions(league) / (league["MIN"] / 5)
+    adjusted = _ratio(league_pace, team_pace) * unadjusted
+
+    played = np.isfinite(adjusted) & (c["MIN"] > 0)
+    if not played.any():
+        return adjusted
+    league_average = np.average(adjusted[played], weights=c["MIN"][played])
+    return adjusted * (15 / league_average)
+
+
+def get_season_metrics(season, season_type="Regular Season"):
+    """
+    Return the season table and the metrics of all its players, computed on first use.
+
+    Args:
+        season (str): The season id, e.g. "2023-24".
+        season_type (str): "Regular Season" or "Playoffs".
+
+    Returns:
+        tuple: The SeasonTable and the dict of metric arrays aligned with its players.
+    """
+    snapshot = get_warehouse().snapshot()
+    depends_on(
+        "warehouse",
+        snapshot.updated_at,
+        lambda: get_warehouse().snapshot().updated_at,
+        modified_at=snapshot.updated_at or None,
+        max_age=CACHE_CONTROL_WAREHOUSE_MAX_AGE,
+    )
+
+    table = snapshot.season_table(season, season_type)
+    key = (table.season, table.season_type, table.version)
+
+    metrics = _metrics_cache.get(key)
+    if metrics is MISSING:
+        metrics = compute_metrics(table) if len(table) else {}
+        _metrics_cache.set(key, metrics, METRICS_CACHE_TTL)
+    return table, metrics
+
+
+def metrics_record(table, metrics, row):
+    """
+    Return the metrics of the player at ``row`` of the table as a dict.
+    """
+    record = {
+        "player_id": int(table.player_ids[row]),
+        "team_id": int(table.team_ids[row]),
+        "season": table.season,
+        "season_type": table.season_type,
+    }
+    record.update({name.lower(): float(values[row]) for name, values in metrics.items()})
+    return record
+
+
+def get_player_metrics(player_id, season=None, season_type="Regular Season"):
+    """
+    Return the metrics of a player for a season, or for every season they played.
+
+    Returns:
+        list: One metrics record per season, most recent first.
+    """
+    if season:
+        seasons = [season]
+    else:
+        starts, _ = get_warehouse().snapshot().player_rows(player_id, season_type)
+        seasons = [season_id(int(start)) for start in starts[::-1]]
+
+    records = []
+    for season in seasons:
+        table, metrics = get_season_metrics(season, season_type)
+        row = table.row_of(player_id)
+        if row is not None:
+            records.append(metrics_record(table, metrics, row))
+    return records
+
+
+def per_game(df, columns, games="gp"):
+    """
+    Add a ``<stat>_per_game`` column for each of the columns present in the frame.
+    """
+    columns = [column for column in columns if column in df.columns]
+    averages = df[columns].div(df[games], axis=0).round(1).add_suffix("_per_game")
+    return pd.concat([df, averages], axis=1)
+
+
+def _leaderboard_values(table, metrics, stat, per_mode):
+    stat = stat.upper()
+    if stat in STAT_COLUMNS:
+        # Games and games started are only ranked by their totals
+        return metrics.get(f"{stat}{PER_MODES[per_mode]}", table.columns[stat])
+    return metrics.get(stat)
+
+
+def _top_k(values, mask, limit, ascending=False):
+    """
+    Return the rows of the ``limit`` best values among the masked ones, best first.
+
+    Only the selected rows are sorted, the others are partitioned away.
+    """
+    candidates = np.flatnonzero(mask & np.isfinite(values))
+    keys = values[candidates] if ascending else -values[candidates]
+
+    if limit < len(candidates):
+        selected = np.argpartition(keys, limit - 1)[:limit]
+        candidates, keys = candidates[selected], keys[selected]
+
+    return candidates[np.argsort(keys, kind="stable")]
+
+
+def _player_name(player_id):
+    global _player_names
+    if _player_names is None:
+        with _player_names_lock:
+            if _player_names is None:
+                _player_names = {
+                    player["id"]: player["full_name"] for player in players.get_players()
+                }
+    return _player_names.get(player_id)
+
+
+def get_leaderboard(
+    stat,
+    season,
+    season_type="Regular Season",
+    per_mode="PerGame",
+    min_games=0,
+    limit=25,
+    ascending=False,
+):
+    """
+    Rank the players of a season by a stat or a metric.
+
+    Rankings are cached per parameters and warehouse version.
+
+    Args:
+        stat (str): A counting stat of ``STAT_COLUMNS`` or a metric, e.g. "PTS" or "PER".
+        season (str): The season id, e.g. "2023-24".
+        season_type (str): "Regular Season" or "Playoffs".
+        per_mode (str): One of ``PER_MODES``, only used for the counting stats.
+        min_games (int): Minimum number of games played to be ranked.
+        limit (int): Number of players ranked.
+        ascending (bool): Rank the lowest values first.
+
+    Returns:
+        list: The ranked players, or None if the stat is unknown.
+
+    Raises:
+        ValueError: If the season or the season type is invalid.
+    """
+    table, metrics = get_season_metrics(season, season_type)
+    key = (
+        table.season,
+        table.season_type,
+        table.version,
+        stat.upper(),
+        per_mode,
+        min_games,
+        limit,
+        ascending,
+    )
+
+    ranking = _leaderboards_cache.get(key)
+    if ranking is not MISSING:
+        return ranking
+
+    if not len(table):
+        return []
+
+    values = _leaderboard_values(table, metrics, stat, per_mode)
+    if values is None:
+        return None
+
+    games = table.columns["GP"]
+    rows = _top_k(values, games >= min_games, limit, ascending)
+    ranking = [
+        {
+            "rank": rank,
+            "player_id": int(table.player_ids[row]),
+            "player_name": _player_name(int(table.player_ids[row])),
+            "team_id": int(table.team_ids[row]),
+            "gp": int(games[row]),
+            "value": float(values[row]),
+        }
+        for rank, row in enumerate(rows, start=1)
+    ]
+
+    _leaderboards_cache.set(key, ranking, METRICS_CACHE_TTL)
+    return ranking
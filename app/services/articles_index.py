@@ -0,0 +1,132 @@
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from app.utils.text import tokenize
+
+TITLE_WEIGHT = 2
+URL_WEIGHT = 1
+
+
+def article_key(article):
+    return (article["source"], article.get("url") or article["title"])
+
+
+def article_tokens(article):
+    """
+    Return the weight of each token of an article's title and URL slug.
+    """
+    weights = defaultdict(int)
+    for token in tokenize(article.get("title")):
+        weights[token] += TITLE_WEIGHT
+    if article.get("url"):
+        for token in tokenize(urlparse(article["url"]).path):
+            weights[token] += URL_WEIGHT
+    return weights
+
+
+class ArticlesIndex:
+    """
+    Inverted index of the articles' title and URL slug tokens.
+
+    The index follows an ``ArticlesSnapshot``: ``sync`` only indexes the articles
+    added or changed since the last synced snapshot and drops the ones that left it.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._articles = {}
+        self._tokens = {}
+        self._positions = {}
+        self._postings = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def sync(self, snapshot):
+        if snapshot.version == self.version:
+            return
+
+        with self._lock:
+            if snapshot.version == self.version:
+                return
+
+            articles = {article_key(a): a for a in snapshot.articles}
+
+            for key in self._articles.keys() - articles.keys():
+                self._remove(key)
+            for key, article in articles.items():
+                if self._articles.get(key) is article:
+                    continue
+                tokens = article_tokens(article)
+                if tokens != self._tokens.get(key):
+                    if key in self._tokens:
+                        self._remove(key)
+                    self._add(key, tokens)
+
+            self._articles = articles
+            self._positions = {key: i for i, key in enumerate(articles)}
+            self.version = snapshot.version
+
+    def _add(self, key, tokens):
+        self._tokens[key] = tokens
+        for token, weight in tokens.items():
+            self._postings[token][key] = weight
+
+    def _remove(self, key):
+        for token in self._tokens.pop(key):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[token]
+
+    def search(self, queries, source=None):
+        """
+        Return the articles matching every query, best matches first.
+
+        An article matches a query when it contains at least one of its terms.
+        Articles are ranked by the number of distinct terms they contain, then by
+        the weight of these terms (title matches count more than URL matches).
+
+        Args:
+            queries (list): Free text queries, e.g. a player and a team name.
+            source (str, optional): Only return the articles of this source.
+
+        Returns:
+            list: The matching articles.
+        """
+        queries = [tokenize(query) for query in queries if query]
+        queries = [terms for terms in queries if terms]
+        if not queries:
+            return []
+
+        with self._lock:
+            return self._search(queries, source)
+
+    def _search(self, queries, source):
+        postings = self._postings
+        candidates = None
+        matches = defaultdict(int)
+        scores = defaultdict(int)
+
+        for terms in queries:
+            query_docs = set()
+            for term in dict.fromkeys(terms):
+                for key, weight in postings.get(term, {}).items():
+                    query_docs.add(key)
+                    matches[key] += 1
+                    scores[key] += weight
+            candidates = query_docs if candidates is None else candidates & query_docs
+            if not candidates:
+                return []
+
+        if source:
+            candidates = {key for key in candidates if key[0].lower() == source.lower()}
+
+        positions = self._positions
+        ranked = sorted(
+            candidates, key=lambda key: (-matches[key], -scores[key], positions[key])
+        )
+        return [self._articles[key] for key in ranked]
+
+
+articles_index = ArticlesIndex()
@@ -0,0 +1,166 @@
+"""
+Background ingestion of the articles.
+
+The websites are scraped on a schedule and their articles are published in an
+immutable in-memory snapshot, which the /articles route serves without touching
+the network.
+"""
+import asyncio
+import logging
+import random
+import threading
+from datetime import datetime, timezone
+
+from app.config.settings import (
+    ARTICLES_REFRESH_INTERVAL,
+    ARTICLES_REFRESH_JITTER,
+    ARTICLES_SOURCE_REFRESH_INTERVALS,
+)
+from app.services.articles_index import articles_index
+from bs4 import BeautifulSoup
+
+from app.services.scrapper import (
+    WEBSITES,
+    get_page_html_async,
+    parse_articles,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ArticlesSnapshot:
+    """
+    Immutable view of the ingested articles.
+
+    Attributes:
+        articles (tuple): Articles of every source, in the order of WEBSITES.
+        by_source (dict): Articles of each source.
+        updated_at (dict): Time of the last successful refresh of each source.
+        modified_at (float): Timestamp of the last refresh of any source, 0 if none.
+        version (int): Incremented on every publication.
+    """
+
+    __slots__ = ("articles", "by_source", "updated_at", "modified_at", "version")
+
+    def __init__(self, by_source=None, updated_at=None, version=0):
+        self.by_source = by_source or {}
+        self.updated_at = updated_at or {}
+        self.modified_at = max(
+            (refreshed_at.timestamp() for refreshed_at in self.updated_at.values()),
+            default=0.0,
+        )
+        self.version = version
+        self.articles = tuple(
+            article
+            for website in WEBSITES
+            for article in self.by_source.get(website["name"], ())
+        )
+
+
+_snapshot = ArticlesSnapshot()
+_publish_lock = threading.Lock()
+
+
+def get_snapshot():
+    return _snapshot
+
+
+def publish(source_articles: dict):
+    """
+    Atomically replace the articles of the given sources in the snapshot.
+
+    Args:
+        source_articles (dict): Articles of each refreshed source.
+    """
+    global _snapshot
+
+    now = datetime.now(timezone.utc)
+    with _publish_lock:
+        current = _snapshot
+        by_source = {
+            **current.by_source,
+            **{source: tuple(a) for source, a in source_articles.items()},
+        }
+        updated_at = {**current.updated_at, **{source: now for source in source_articles}}
+        _snapshot = ArticlesSnapshot(by_source, updated_at, current.version + 1)
+
+    articles_index.sync(_snapshot)
+    return _snapshot
+
+
+async def refresh_address_async(address, websites=WEBSITES):
+    """
+    Scrape an address once and publish the articles of every website sharing it.
+
+    The page is downloaded on the event loop and parsed in a worker thread. The
+    previous articles of these websites are kept when the page is unavailable.
+    """
+    html = await get_page_html_async(address)
+    if html is None:
+        return None
+
+    def parse():
+        soup = BeautifulSoup(html, "html.parser")
+        return publish(_parse_address_articles(soup, address, websites))
+
+    return await asyncio.to_thread(parse)
+
+
+def _parse_address_articles(soup, address, websites):
+    return {
+        website["name"]: parse_articles(soup, website)
+        for website in websites
+        if website["address"] == address
+    }
+
+
+def source_interval(source):
+    return ARTICLES_SOURCE_REFRESH_INTERVALS.get(source, ARTICLES_REFRESH_INTERVAL)
+
+
+class ArticlesIngestionScheduler:
+    """
+    Refresh the articles in the background, one task per distinct address.
+
+    Each address is refreshed on the shortest interval of the websites sharing it,
+    plus a random jitter so the sources don't all hit the network at the same time.
+    """
+
+    def __init__(self, websites=WEBSITES, jitter=ARTICLES_REFRESH_JITTER):
+        self.websites = websites
+        self.jitter = jitter
+        self._tasks = []
+
+    def intervals(self):
+        intervals = {}
+        for website in self.websites:
+            interval = source_interval(website["name"])
+            address = website["address"]
+            intervals[address] = min(intervals.get(address, interval), interval)
+        return intervals
+
+    async def _run(self, address, interval):
+        while True:
+            try:
+                await refresh_address_async(address, self.websites)
+            except Exception as e:
+                logger.warning(
+                    "Error refreshing articles from %s: %s",
+                    address,
+                    e,
+                    extra={"address": address},
+                )
+
+            await asyncio.sleep(interval + random.uniform(0, self.jitter))
+
+    def start(self):
+        self._tasks = [
+            asyncio.create_task(self._run(address, interval))
+            for address, interval in self.intervals().items()
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
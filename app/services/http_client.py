@@ -0,0 +1,130 @@
+import asyncio
+import time
+import weakref
+from urllib.parse import urlparse
+
+import httpx
+
+from app.config.settings import (
+    UPSTREAM_HOST_LIMITS,
+    UPSTREAM_HOST_MAX_CONCURRENCY,
+    UPSTREAM_MAX_CONCURRENCY,
+)
+from app.utils.metrics import observe_retry, observe_upstream
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class AsyncHTTPClient:
+    """
+    Asyncio HTTP client shared by every upstream call of the event loop.
+
+    Requests go through a global concurrency limit and a limit per host, so a slow
+    upstream can hold at most its own share of the connections. Requests answered
+    with a transient error status are retried with an exponential backoff, like the
+    retry policy of the nba_api session.
+
+    Args:
+        max_concurrency (int): Maximum number of concurrent requests overall.
+        host_max_concurrency (int): Default maximum number of concurrent requests per host.
+        host_limits (dict, optional): Maximum number of concurrent requests of specific hosts.
+    """
+
+    def __init__(
+        self,
+        max_concurrency=UPSTREAM_MAX_CONCURRENCY,
+        host_max_concurrency=UPSTREAM_HOST_MAX_CONCURRENCY,
+        host_limits=None,
+    ):
+        self.host_max_concurrency = host_max_concurrency
+        self.host_limits = UPSTREAM_HOST_LIMITS if host_limits is None else host_limits
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._host_slots = {}
+        self._client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+
+    def host_slots(self, host):
+        slots = self._host_slots.get(host)
+        if slots is None:
+            limit = self.host_limits.get(host, self.host_max_concurrency)
+            slots = self._host_slots[host] = asyncio.Semaphore(limit)
+        return slots
+
+    async def get(
+        self,
+        url,
+        params=None,
+        headers=None,
+        timeout=None,
+        retries=0,
+        backoff_factor=1,
+        governor=None,
+    ):
+        """
+        Send a GET request, retrying up to ``retries`` times on transient errors.
+
+        With a ``governor`` (see ``RateGovernor``), every attempt waits for its
+        admission, and the backoff between attempts does not hold a slot.
+
+        Returns:
+            httpx.Response: The last response received.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = await self._send(url, params, headers, timeout, governor)
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+            except httpx.TransportError:
+                if attempt >= retries:
+                    raise
+
+            observe_retry(url)
+            await asyncio.sleep(backoff_factor * 2**attempt)
+            attempt += 1
+
+    async def _send(self, url, params, headers, timeout, governor):
+        started_at = await governor.acquire_async() if governor is not None else None
+        status_code = None
+        try:
+            async with self._slots, self.host_slots(urlparse(url).hostname):
+                sent_at = time.perf_counter()
+                try:
+                    response = await self._client.get(
+                        url, params=params, headers=headers, timeout=timeout
+                    )
+                    status_code = response.status_code
+                finally:
+                    observe_upstream(url, time.perf_counter() - sent_at, status_code)
+            return response
+        finally:
+            if governor is not None:
+                governor.release(started_at, status_code)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_http_client():
+    """
+    Return the HTTP client of the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = AsyncHTTPClient()
+    return client
+
+
+async def close_http_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,59 @@
+from nba_api.stats.library.http import NBAStatsHTTP
+
+from app.services.http_client import get_http_client
+from app.services.nba_api.upstream import raise_for_client_error, stats_governor
+
+TIMEOUT = 70
+RETRIES = 5
+
+
+def _load(endpoint, contents, status_code=None, url=None):
+    http = NBAStatsHTTP()
+    endpoint.nba_response = http.nba_response(
+        response=http.clean_contents(contents), status_code=status_code, url=url
+    )
+    endpoint.load_response()
+    return endpoint
+
+
+def load_endpoint(endpoint_class, contents, **params):
+    """
+    Build an nba_api endpoint from a raw stats.nba.com response.
+
+    The endpoint is created without sending its request and then loaded as if
+    nba_api had fetched ``contents`` itself.
+    """
+    return _load(endpoint_class(**params, get_request=False), contents)
+
+
+async def fetch_endpoint(endpoint_class, **params):
+    """
+    Asynchronously fetch an nba_api endpoint from stats.nba.com.
+
+    Args:
+        endpoint_class (type): The nba_api endpoint class, e.g. ``PlayerCareerStats``.
+        **params: The parameters of the endpoint class.
+
+    Returns:
+        Endpoint: The loaded endpoint, as returned by the synchronous nba_api call.
+
+    Raises:
+        HTTPException: 404 or 400 if stats.nba.com rejected the request.
+    """
+    endpoint = endpoint_class(**params, get_request=False)
+    url = NBAStatsHTTP.base_url.format(endpoint=endpoint.endpoint)
+
+    # Sort parameters by key, like nba_api does, some requests depend on it
+    parameters = sorted(endpoint.parameters.items(), key=lambda kv: kv[0])
+
+    response = await get_http_client().get(
+        url,
+        params=[(key, value) for key, value in parameters if value is not None],
+        headers=NBAStatsHTTP.headers,
+        timeout=TIMEOUT,
+        retries=RETRIES,
+        governor=stats_governor,
+    )
+
+    raise_for_client_error(response.status_code)
+    return _load(endpoint, response.text, response.status_code, str(response.url))
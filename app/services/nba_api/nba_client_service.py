@@ -1,36 +1,132 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import importlib.metadata
 import json
+import logging
+import weakref
 from fastapi import HTTPException
+from nba_api.stats.library.parameters import Season
 from nba_api.stats.static import players, teams
 from nba_api.stats.endpoints import (
     playercareerstats,
     commonplayerinfo,
+    commonteamroster,
     playerawards,
     playerdashboardbyyearoveryear,
 )
 import pandas as pd
 
+from app.config.settings import (
+    CACHE_CONTROL_FINAL_MAX_AGE,
+    DISK_CACHE_CURRENT_TTL,
+    PLAYER_INFO_BATCH_MAX_WORKERS,
+    ROSTERS_REFRESH_MAX_WORKERS,
+    SEASONS_FANOUT_MAX_IN_FLIGHT,
+    SEASONS_FANOUT_MAX_WORKERS,
+)
+from app.services.nba_api.async_nba_client import fetch_endpoint, load_endpoint
+from app.services.nba_api.upstream import Persistence, cached_upstream
+from app.utils.conditional import depends_on
+from app.utils.timing import span
+
+logger = logging.getLogger(__name__)
+
+# Semaphore of the per-season fan-outs of the process, one per event loop
+_fanout_slots = weakref.WeakKeyDictionary()
+
+
+def _seasons_fanout_slots():
+    loop = asyncio.get_running_loop()
+    slots = _fanout_slots.get(loop)
+    if slots is None:
+        slots = _fanout_slots[loop] = asyncio.Semaphore(SEASONS_FANOUT_MAX_IN_FLIGHT)
+    return slots
+
+# The static players and teams lists only change with the nba_api release
+STATIC_DATA_VERSION = importlib.metadata.version("nba_api")
+
+
+def depend_on_static_data():
+    """
+    Record the static players and teams lists as a dependency of the current response.
+    """
+    depends_on(
+        "nba_api.static",
+        STATIC_DATA_VERSION,
+        lambda: STATIC_DATA_VERSION,
+        max_age=CACHE_CONTROL_FINAL_MAX_AGE,
+    )
+
 
 def get_active_players():
+    depend_on_static_data()
     return players.get_active_players()
 
 
 def get_inactive_players():
+    depend_on_static_data()
     return players.get_inactive_players()
 
 
 def get_all_players():
+    depend_on_static_data()
     return players.get_players()
 
 
+def _season_ttl(params: dict):
+    """
+    Stats of a completed season are final, those of the current season may still change.
+    """
+    if params.get("season", Season.current_season) < Season.current_season:
+        return None
+    return DISK_CACHE_CURRENT_TTL
+
+
+def _player_ttl(player_id):
+    """
+    The career of a retired player is final, the one of an active player may still change.
+    """
+    player = players.find_player_by_id(int(player_id))
+    if player is not None and not player["is_active"]:
+        return None
+    return DISK_CACHE_CURRENT_TTL
+
+
+def _persist_endpoint(endpoint_class, ttl):
+    return Persistence(
+        encode=lambda endpoint: endpoint.nba_response.get_response(),
+        decode=lambda payload, params: load_endpoint(endpoint_class, payload, **params),
+        ttl=ttl,
+    )
+
+
+persist_career_stats = _persist_endpoint(
+    playercareerstats.PlayerCareerStats,
+    ttl=lambda params: _player_ttl(params["player_id"]),
+)
+persist_dashboard = _persist_endpoint(
+    playerdashboardbyyearoveryear.PlayerDashboardByYearOverYear, ttl=_season_ttl
+)
+persist_awards = Persistence(
+    encode=json.dumps,
+    decode=lambda payload, player_id: json.loads(payload),
+    ttl=_player_ttl,
+)
+
+
 # Get the player totals
+@cached_upstream("playercareerstats", persist=persist_career_stats)
 def get_player_carrer_totals(params: dict):
     return playercareerstats.PlayerCareerStats(**params, timeout=70)
 
 
-def get_player_info(player_id):
-    player_info_df = commonplayerinfo.CommonPlayerInfo(
-        player_id, timeout=70
-    ).common_player_info.get_data_frame()
+@cached_upstream("playercareerstats", persist=persist_career_stats)
+async def get_player_carrer_totals_async(params: dict):
+    return await fetch_endpoint(playercareerstats.PlayerCareerStats, **params)
+
+
+def _player_info_record(player_info):
+    player_info_df = player_info.common_player_info.get_data_frame()
 
     if player_info_df.empty:
         raise HTTPException(status_code=404, detail="Player not found")
@@ -38,7 +134,51 @@ def get_player_info(player_id):
     return player_info_df.to_dict(orient="records")[0]
 
 
-def get_player_dashboard_by_year_over_year(params: dict):
+@cached_upstream("commonplayerinfo")
+async def get_player_info_async(player_id):
+    return _player_info_record(
+        await fetch_endpoint(commonplayerinfo.CommonPlayerInfo, player_id=player_id)
+    )
+
+
+async def get_players_info_async(player_ids, max_workers=PLAYER_INFO_BATCH_MAX_WORKERS):
+    """
+    Get the information of several players concurrently.
+
+    A player whose information can't be retrieved gets an error entry instead of
+    failing the whole batch.
+
+    Args:
+        player_ids (list): The unique identifiers of the players.
+        max_workers (int): Maximum number of concurrent upstream calls.
+
+    Returns:
+        list: One entry per distinct player id, in order, with either a
+            "player_info" or an "error" and its "status_code".
+    """
+    player_ids = list(dict.fromkeys(player_ids))
+    slots = asyncio.Semaphore(max_workers)
+
+    async def fetch(player_id):
+        try:
+            async with slots:
+                return _player_info_entry(player_id, await get_player_info_async(player_id))
+        except Exception as e:
+            return _player_info_entry(player_id, error=e)
+
+    return list(await asyncio.gather(*(fetch(player_id) for player_id in player_ids)))
+
+
+def _player_info_entry(player_id, player_info=None, error=None):
+    if error is None:
+        return {"player_id": player_id, "player_info": player_info}
+    if isinstance(error, HTTPException):
+        return {"player_id": player_id, "error": error.detail, "status_code": error.status_code}
+    return {"player_id": player_id, "error": str(error), "status_code": 502}
+
+
+@cached_upstream("playerdashboardbyyearoveryear", persist=persist_dashboard)
+async def get_player_dashboard_by_year_over_year_async(params: dict):
     """
     Retrieve the fantasy profile for a specific player using provided parameters.
 
@@ -46,14 +186,15 @@ def get_player_dashboard_by_year_over_year(params: dict):
         params (dict): A dictionary of parameters to fetch the player's fantasy profile.
 
     Returns:
-        list: A list of data frames containing the player's fantasy profile information.
+        PlayerDashboardByYearOverYear: The player's fantasy profile.
 
     Raises:
         HTTPException: If there is an error decoding JSON response or an unexpected error occurs.
     """
-
     try:
-        return playerdashboardbyyearoveryear.PlayerDashboardByYearOverYear(**params, timeout=70)
+        return await fetch_endpoint(
+            playerdashboardbyyearoveryear.PlayerDashboardByYearOverYear, **params
+        )
 
     except json.JSONDecodeError as e:
         raise HTTPException(status_code=502, detail=f"Error decoding JSON: {e}")
@@ -61,16 +202,16 @@ def get_player_dashboard_by_year_over_year(params: dict):
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
 
 
-def get_player_seasons_dashboard(params: dict):
-    dfs = []
-    season_df = pd.DataFrame()
-    player_id = params.get("player_id")
-    season_type = params.get("season_type_playoffs", "Regular Season")
-    per_mode = params.get("per_mode_detailed", "PerGame")
-    season = params.get("season", "All")
+def _seasons_params(params: dict):
+    return (
+        params.get("player_id"),
+        params.get("season_type_playoffs", "Regular Season"),
+        params.get("per_mode_detailed", "PerGame"),
+        params.get("season", "All"),
+    )
 
-    career_stats = get_player_carrer_totals({"player_id": player_id})
-    print(season)
+
+def _seasons_ids(career_stats, season, season_type):
     if season != "All":
         if season_type == "Playoffs":
             season_df = career_stats.career_totals_post_season.get_data_frame()
@@ -82,51 +223,75 @@ def get_player_seasons_dashboard(params: dict):
         else:
             season_df = career_stats.season_totals_regular_season.get_data_frame()
 
-    all_seasons = season_df["SEASON_ID"].unique()
+    return season_df["SEASON_ID"].unique()
 
-    for season_id in all_seasons:
-        try:
-            dashboard = get_player_dashboard_by_year_over_year(
-                {
-                    "player_id": player_id,
-                    "season": season_id,
-                    "per_mode_detailed": per_mode,
-                    "season_type_playoffs": season_type,
-                }
-            )
 
-            df = dashboard.by_year_player_dashboard.get_data_frame()
-            df.columns = df.columns.str.lower()
-            df["SEASON"] = season_id
+def _season_dashboard_params(player_id, season_id, per_mode, season_type):
+    return {
+        "player_id": player_id,
+        "season": season_id,
+        "per_mode_detailed": per_mode,
+        "season_type_playoffs": season_type,
+    }
 
-            dfs.append(df)
 
-        except Exception as e:
-            print(
-                f"[WARN] Error getting fantasy profile for player {player_id} in season {season_id}: {e}"
-            )
+@span("transform")
+def _season_dashboard_frame(dashboard, season_id):
+    df = dashboard.by_year_player_dashboard.get_data_frame()
+    df.columns = df.columns.str.lower()
+    df["SEASON"] = season_id
 
-    return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+    return df
 
-def get_player_career_dashboard(params: dict):
-    """
-    Retrieve the fantasy profile for a specific player using provided parameters.
-    Returns a DataFrame containing the player's fantasy profile and career totals stats.
 
-    Args:
-        params (dict): A dictionary of parameters to fetch the player's fantasy profile.
+def _warn_season_dashboard(player_id, season_id, e):
+    logger.warning(
+        "Error getting fantasy profile for player %s in season %s: %s",
+        player_id,
+        season_id,
+        e,
+        extra={"player_id": player_id, "season_id": season_id},
+    )
 
-    Returns:
-        pd.DataFrame: A DataFrame containing the player's fantasy profile information.
 
-    Raises:
-        HTTPException: If no fantasy profile is found for the player.
+async def get_player_seasons_dashboard_async(params: dict):
     """
-    player_id = params.get("player_id")
-    season_type = params.get("season_type_playoffs", "Regular Season")
-    
-    career_stats = get_player_carrer_totals({"player_id": player_id})
-    
+    Retrieve the fantasy profile of a player for each of the requested seasons.
+
+    At most SEASONS_FANOUT_MAX_WORKERS seasons of a request, and
+    SEASONS_FANOUT_MAX_IN_FLIGHT seasons of all the requests combined, are
+    fetched at the same time.
+    """
+    player_id, season_type, per_mode, season = _seasons_params(params)
+
+    career_stats = await get_player_carrer_totals_async({"player_id": player_id})
+    all_seasons = _seasons_ids(career_stats, season, season_type)
+    slots = asyncio.Semaphore(SEASONS_FANOUT_MAX_WORKERS)
+    fanout_slots = _seasons_fanout_slots()
+
+    async def get_season_dashboard(season_id):
+        try:
+            async with slots, fanout_slots:
+                dashboard = await get_player_dashboard_by_year_over_year_async(
+                    _season_dashboard_params(player_id, season_id, per_mode, season_type)
+                )
+
+            return _season_dashboard_frame(dashboard, season_id)
+
+        except Exception as e:
+            _warn_season_dashboard(player_id, season_id, e)
+            return None
+
+    # asyncio.gather keeps the results in season order
+    results = await asyncio.gather(*(get_season_dashboard(s) for s in all_seasons))
+    dfs = [df for df in results if df is not None]
+
+    with span("transform"):
+        return pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
+
+
+@span("transform")
+def _career_dashboard_frame(career_stats, season_type, all_seasons_df):
     if season_type == "Playoffs":
         base_df = career_stats.career_totals_post_season.get_data_frame()
     else:
@@ -134,10 +299,6 @@ def get_player_career_dashboard(params: dict):
     
     base_df.columns = base_df.columns.str.lower()
     
-    params_all = params.copy()
-    params_all["season"] = "All"
-    all_seasons_df = get_player_seasons_dashboard(params_all)
-    
     if not all_seasons_df.empty:
         fantasy_cols = [col for col in all_seasons_df.columns 
                        if "fantasy" in col or "advanced" in col
@@ -151,7 +312,34 @@ def get_player_career_dashboard(params: dict):
         final_df = pd.concat([base_df.reset_index(drop=True), fantasy_totals.reset_index(drop=True)], axis=1)
         return final_df
 
-def get_player_awards(player_id):
+
+async def get_player_career_dashboard_async(params: dict):
+    """
+    Retrieve the fantasy profile for a specific player using provided parameters.
+    Returns a DataFrame containing the player's fantasy profile and career totals stats.
+
+    Args:
+        params (dict): A dictionary of parameters to fetch the player's fantasy profile.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the player's fantasy profile information.
+
+    Raises:
+        HTTPException: If no fantasy profile is found for the player.
+    """
+    player_id = params.get("player_id")
+    season_type = params.get("season_type_playoffs", "Regular Season")
+
+    career_stats = await get_player_carrer_totals_async({"player_id": player_id})
+
+    params_all = params.copy()
+    params_all["season"] = "All"
+    all_seasons_df = await get_player_seasons_dashboard_async(params_all)
+
+    return _career_dashboard_frame(career_stats, season_type, all_seasons_df)
+
+@cached_upstream("playerawards", persist=persist_awards)
+async def get_player_awards_async(player_id):
     """
     Get awards for a specific player by their player ID.
 
@@ -159,12 +347,18 @@ def get_player_awards(player_id):
         player_id (int): The unique identifier for the player.
 
     Returns:
-        dict: A dictionary containing the awards information.
+        list: The awards of the player.
 
     Raises:
         HTTPException: If no awards are found for the player.
     """
-    awards_list = playerawards.PlayerAwards(player_id=player_id, timeout=70).get_data_frames()
+    return _awards_records(
+        await fetch_endpoint(playerawards.PlayerAwards, player_id=player_id)
+    )
+
+
+def _awards_records(player_awards):
+    awards_list = player_awards.get_data_frames()
 
     if not awards_list or awards_list[0].empty:
         raise HTTPException(status_code=404, detail=f"No awards found for this player")
@@ -175,13 +369,103 @@ def get_player_awards(player_id):
     return awards_df.to_dict(orient="records")
 
 
+@cached_upstream("commonteamroster")
+def get_team_roster(team_id):
+    """
+    Get the current roster of a team.
+
+    Args:
+        team_id (int): The unique identifier for the team.
+
+    Returns:
+        list: A list of dictionaries containing the players of the roster.
+    """
+    return _roster_records(commonteamroster.CommonTeamRoster(team_id=team_id, timeout=70))
+
+
+@cached_upstream("commonteamroster")
+async def get_team_roster_async(team_id):
+    """
+    Asynchronous version of ``get_team_roster``.
+    """
+    return _roster_records(
+        await fetch_endpoint(commonteamroster.CommonTeamRoster, team_id=team_id)
+    )
+
+
+def _roster_records(team_roster):
+    roster_df = team_roster.common_team_roster.get_data_frame()
+    roster_df.columns = roster_df.columns.str.lower()
+
+    return roster_df.to_dict(orient="records")
+
+
+# Player ids of each team, along with the cached roster they were built from
+_team_player_ids = {}
+
+
+async def get_team_player_ids_async(team_id):
+    """
+    Get the ids of the players in the current roster of a team.
+
+    The set is rebuilt only when the cached roster it comes from changes.
+
+    Returns:
+        frozenset: The player ids of the roster.
+    """
+    return _index_team_player_ids(team_id, await get_team_roster_async(team_id))
+
+
+def _index_team_player_ids(team_id, roster):
+    indexed = _team_player_ids.get(str(team_id))
+    if indexed is None or indexed[0] is not roster:
+        indexed = (roster, frozenset(player["player_id"] for player in roster))
+        _team_player_ids[str(team_id)] = indexed
+
+    return indexed[1]
+
+
+def refresh_team_rosters():
+    """
+    Fetch the rosters of every team from upstream and store them in the cache.
+
+    At most ROSTERS_REFRESH_MAX_WORKERS rosters are fetched at a time, so the
+    background refresh leaves most of the upstream capacity to requests.
+    """
+    all_teams = get_all_teams()
+    with ThreadPoolExecutor(max_workers=ROSTERS_REFRESH_MAX_WORKERS) as executor:
+        results = executor.map(
+            lambda team: _refresh_team_roster(team["id"]), all_teams
+        )
+        return sum(results)
+
+
+def _refresh_team_roster(team_id):
+    try:
+        get_team_roster.refresh(team_id)
+        return 1
+    except Exception as e:
+        logger.warning(
+            "Error refreshing roster of team %s: %s", team_id, e, extra={"team_id": team_id}
+        )
+        return 0
+
+
+def get_team_by_id(team_id):
+    depend_on_static_data()
+    return teams.find_team_name_by_id(team_id)
+
+
 def get_all_teams():
+    depend_on_static_data()
     return teams.get_teams()
 
 
 def get_team_by_name(full_name):
+    depend_on_static_data()
     return teams.find_teams_by_full_name(full_name)
 
 
 def get_team_by_nickname(nickname):
+    depend_on_static_data()
     return teams.find_teams_by_nickname(nickname)
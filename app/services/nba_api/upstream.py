@@ -0,0 +1,506 @@
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+
+from fastapi import HTTPException
+
+from app.config.settings import (
+    CACHE_CONTROL_FINAL_MAX_AGE,
+    CACHE_MAX_BYTES,
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_HALF_OPEN_CALLS,
+    CIRCUIT_MIN_CALLS,
+    CIRCUIT_OPEN_SECONDS,
+    CIRCUIT_SLOW_CALL_SECONDS,
+    CIRCUIT_WINDOW,
+    DISK_CACHE_DIR,
+    STATS_LATENCY_TARGET,
+    STATS_MAX_CONCURRENCY,
+    STATS_MIN_CONCURRENCY,
+    STATS_RATE_BURST,
+    STATS_RATE_LIMIT,
+)
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.conditional import depends_on
+from app.utils.disk_cache import DiskCache
+from app.utils.rate_governor import RateGovernor
+from app.utils.request_context import get_request_memo, mark_stale
+from app.utils.single_flight import AsyncSingleFlight, SingleFlight
+from app.utils.ttl_cache import MISSING, TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+def _size_of(value):
+    """
+    Approximate the memory used by a cached upstream response.
+
+    nba_api endpoint objects keep the raw JSON payload, which dominates their size.
+    """
+    nba_response = getattr(value, "nba_response", None)
+    if nba_response is not None:
+        return len(nba_response.get_response() or "")
+    return len(json.dumps(value, default=str))
+
+
+response_cache = TTLCache(
+    max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, size_of=_size_of
+)
+
+upstream_flights = SingleFlight()
+async_upstream_flights = AsyncSingleFlight()
+
+# Every HTTP request to stats.nba.com, synchronous or not, goes through it
+stats_governor = RateGovernor(
+    rate=STATS_RATE_LIMIT,
+    burst=STATS_RATE_BURST,
+    min_concurrency=STATS_MIN_CONCURRENCY,
+    max_concurrency=STATS_MAX_CONCURRENCY,
+    latency_target=STATS_LATENCY_TARGET,
+)
+
+
+# One circuit breaker per stats.nba.com endpoint, shared by the sync and async calls
+circuit_breakers = {}
+
+
+def get_circuit_breaker(endpoint: str):
+    breaker = circuit_breakers.get(endpoint)
+    if breaker is None:
+        breaker = circuit_breakers.setdefault(
+            endpoint,
+            CircuitBreaker(
+                endpoint,
+                failure_threshold=CIRCUIT_FAILURE_THRESHOLD / 100,
+                min_calls=CIRCUIT_MIN_CALLS,
+                window=CIRCUIT_WINDOW,
+                slow_call_seconds=CIRCUIT_SLOW_CALL_SECONDS,
+                open_seconds=CIRCUIT_OPEN_SECONDS,
+                half_open_calls=CIRCUIT_HALF_OPEN_CALLS,
+            ),
+        )
+    return breaker
+
+
+def raise_for_client_error(status_code):
+    """
+    Raise the HTTPException of an upstream response rejecting the request itself.
+
+    stats.nba.com answers with a 4xx status to the requests with invalid
+    parameters, such as an unknown player id, retrying them can't succeed.
+    Timeouts (408) and rate limiting (429) are upstream failures, left to the caller.
+
+    Raises:
+        HTTPException: 404 if upstream did not find the resource, 400 otherwise.
+    """
+    if 400 <= status_code < 500 and status_code not in (408, 429):
+        raise HTTPException(
+            status_code=404 if status_code == 404 else 400,
+            detail=f"Invalid request, rejected upstream with status {status_code}",
+        )
+
+
+def is_upstream_failure(error):
+    """
+    Tell whether an error comes from upstream, rather than from the request itself.
+
+    Client errors (see ``raise_for_client_error``) are not failures: they are not
+    counted by the circuit breakers and no stale value is served instead.
+    """
+    if isinstance(error, HTTPException):
+        return error.status_code >= 500
+    return True
+
+
+def _open_circuit_error(error):
+    return HTTPException(
+        status_code=503,
+        detail=f"Upstream unavailable: {error}",
+        headers={"Retry-After": str(max(1, round(error.retry_after)))},
+    )
+
+
+def _normalize(value):
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _normalize(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(v) for v in value)
+    return str(value)
+
+
+def make_key(endpoint: str, args: tuple, kwargs: dict):
+    """
+    Build the cache key of an upstream call from the endpoint and its normalized params.
+
+    Values are compared by their string form, so ``{"player_id": 2544}`` and
+    ``{"player_id": "2544"}`` share the same entry.
+    """
+    return (endpoint, _normalize(args), _normalize(kwargs))
+
+
+class Persistence:
+    """
+    Describe how the results of an upstream function are kept in the disk cache.
+
+    Args:
+        encode (callable): Turns a result into a string payload.
+        decode (callable): Turns a payload back into a result, given the call args and kwargs.
+        ttl (callable): Returns the time to live of a call's result, given its args and
+            kwargs, or None when the result is final and never expires.
+    """
+
+    def __init__(self, encode, decode, ttl):
+        self.encode = encode
+        self.decode = decode
+        self.ttl = ttl
+
+    def load(self, key, args, kwargs):
+        disk_cache = get_disk_cache()
+        if disk_cache is None:
+            return MISSING
+
+        try:
+            payload = disk_cache.get(json.dumps(key))
+            if payload is None:
+                return MISSING
+            return self.decode(payload, *args, **kwargs)
+        except Exception as e:
+            logger.warning("Error reading %s from the disk cache: %s", key, e)
+            return MISSING
+
+    def load_stale(self, key, args, kwargs):
+        """
+        Return the stored value and the time it was stored at, even if it is expired.
+        """
+        disk_cache = get_disk_cache()
+        if disk_cache is None:
+            return MISSING
+
+        try:
+            row = disk_cache.get_stale(json.dumps(key))
+            if row is None:
+                return MISSING
+            return self.decode(row[0], *args, **kwargs), row[1]
+        except Exception as e:
+            logger.warning("Error reading %s from the disk cache: %s", key, e)
+            return MISSING
+
+    def store(self, key, value, args, kwargs):
+        disk_cache = get_disk_cache()
+        if disk_cache is None:
+            return
+
+        try:
+            disk_cache.set(json.dumps(key), self.encode(value), self.ttl(*args, **kwargs))
+        except Exception as e:
+            _warn_disk_cache_write(key, e)
+
+
+_disk_cache_write_failed = False
+
+
+def _warn_disk_cache_write(key, e):
+    # A read-only directory fails every write, only the first one is a warning
+    global _disk_cache_write_failed
+    log = logger.debug if _disk_cache_write_failed else logger.warning
+    _disk_cache_write_failed = True
+    log("Error writing %s to the disk cache in %s: %s", key, DISK_CACHE_DIR, e)
+
+
+_disk_cache = MISSING
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache():
+    """
+    Return the disk cache, opened on first use, or None when it is disabled or unusable.
+
+    Opening it lazily keeps imports free of side effects: the directory of the
+    database is only created once a persisted result is read or written.
+    """
+    global _disk_cache
+    if _disk_cache is MISSING:
+        with _disk_cache_lock:
+            if _disk_cache is MISSING:
+                _disk_cache = _open_disk_cache()
+    return _disk_cache
+
+
+def _open_disk_cache():
+    if not DISK_CACHE_DIR:
+        return None
+
+    try:
+        return DiskCache(DISK_CACHE_DIR)
+    except Exception as e:
+        logger.warning("Disk cache disabled, %s is not usable: %s", DISK_CACHE_DIR, e)
+        return None
+
+
+def cached_upstream(endpoint: str, persist: Persistence = None):
+    """
+    Cache the results of a function calling the stats.nba.com ``endpoint``.
+
+    Results are first memoized in the current request scope, so composed service
+    functions reuse each other's calls within a request whatever the TTL. They are
+    then cached across requests for the time to live configured per endpoint in
+    ``CACHE_TTL``. On a miss, concurrent identical calls wait on a single upstream
+    fetch and share its result or its exception. Exceptions are never cached.
+
+    With ``persist``, results are also kept in the disk cache, which is read before
+    calling upstream, so they survive restarts.
+
+    Upstream calls go through the circuit breaker of the endpoint. When a call
+    fails upstream, or the circuit is open, the last known value is served instead
+    if there is one, and the request is marked as served stale data. Otherwise an
+    open circuit fails fast with a 503.
+
+    The decorated function gets a ``refresh`` attribute, which fetches the value
+    from upstream whether it is cached or not and stores it in the caches, and an
+    ``uncached`` attribute, which gets the value from the disk cache or upstream,
+    through the circuit breaker and with the stale fallback, without reading or
+    storing it in the in-memory cache. Bulk work uses it so it does not evict the
+    entries of live traffic.
+
+    Coroutine functions are supported too, and share the cache entries of the
+    synchronous functions decorated with the same endpoint.
+    """
+    ttl = CACHE_TTL.get(endpoint, 0)
+    breaker = get_circuit_breaker(endpoint)
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            return _async_cached(endpoint, ttl, persist, breaker, func)
+
+        def call(args, kwargs):
+            breaker.before_call()
+            started_at = time.monotonic()
+            failed = True
+            try:
+                value = func(*args, **kwargs)
+                failed = False
+                return value
+            except Exception as e:
+                failed = is_upstream_failure(e)
+                raise
+            finally:
+                breaker.record(time.monotonic() - started_at, failed)
+
+        def fetch(key, args, kwargs, use_disk=True, keep=True):
+            value = MISSING
+            if persist is not None and use_disk:
+                value = persist.load(key, args, kwargs)
+
+            if value is MISSING:
+                value = call(args, kwargs)
+                if persist is not None:
+                    persist.store(key, value, args, kwargs)
+
+            if keep:
+                response_cache.set(key, value, ttl)
+            return value
+
+        def fetch_or_stale(key, args, kwargs, keep=True):
+            try:
+                return upstream_flights.do(key, fetch, key, args, kwargs, keep=keep)
+            except Exception as e:
+                if not is_upstream_failure(e):
+                    raise
+                stale = _stale_value(endpoint, key)
+                if stale is MISSING and persist is not None:
+                    stale = _mark_stale(endpoint, persist.load_stale(key, args, kwargs))
+                if stale is MISSING:
+                    if isinstance(e, CircuitOpenError):
+                        raise _open_circuit_error(e)
+                    raise
+                return stale
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(endpoint, args, kwargs)
+
+            memo = get_request_memo()
+            if memo is not None and key in memo:
+                return memo[key]
+
+            value = response_cache.get(key)
+            if value is MISSING:
+                try:
+                    value = fetch_or_stale(key, args, kwargs)
+                except Exception:
+                    depends_on(repr(key), None, lambda: None)
+                    raise
+
+            _depend_on(key, persist, args, kwargs)
+            if memo is not None:
+                memo[key] = value
+            return value
+
+        def refresh(*args, **kwargs):
+            key = make_key(endpoint, args, kwargs)
+            return upstream_flights.do(key, fetch, key, args, kwargs, use_disk=False)
+
+        def uncached(*args, **kwargs):
+            return fetch_or_stale(make_key(endpoint, args, kwargs), args, kwargs, keep=False)
+
+        wrapper.refresh = refresh
+        wrapper.uncached = uncached
+        return wrapper
+
+    return decorator
+
+
+def _fresh_stored_at(key):
+    entry = response_cache.peek(key)
+    if entry is None or not entry.is_fresh():
+        return None
+    return entry.stored_at
+
+
+def _depend_on(key, persist, args, kwargs):
+    """
+    Record the cached value of an upstream call as a dependency of the current response.
+
+    Final values (the ones the disk cache never expires) keep the same version
+    forever, the others are versioned by the time they were fetched at and may be
+    cached until they expire. A stale value, like a failed call, has no version.
+    """
+    name = repr(key)
+    if persist is not None and persist.ttl(*args, **kwargs) is None:
+        depends_on(name, "final", lambda: "final", max_age=CACHE_CONTROL_FINAL_MAX_AGE)
+        return
+
+    entry = response_cache.peek(key)
+    if entry is None or not entry.is_fresh():
+        depends_on(name, None, lambda: None)
+        return
+
+    depends_on(
+        name,
+        entry.stored_at,
+        lambda: _fresh_stored_at(key),
+        modified_at=entry.stored_at,
+        max_age=entry.expires_at - time.time(),
+    )
+
+
+def _stale_value(endpoint, key):
+    entry = response_cache.get_stale(key)
+    if entry is None:
+        return MISSING
+    return _mark_stale(endpoint, (entry.value, entry.stored_at))
+
+
+def _mark_stale(endpoint, stale):
+    if stale is MISSING:
+        return MISSING
+    value, stored_at = stale
+    mark_stale(endpoint, stored_at)
+    return value
+
+
+def _async_cached(endpoint, ttl, persist, breaker, func):
+    async def call(args, kwargs):
+        breaker.before_call()
+        started_at = time.monotonic()
+        failed = True
+        try:
+            value = await func(*args, **kwargs)
+            failed = False
+            return value
+        except Exception as e:
+            failed = is_upstream_failure(e)
+            raise
+        finally:
+            breaker.record(time.monotonic() - started_at, failed)
+
+    async def fetch(key, args, kwargs, use_disk=True, keep=True):
+        value = MISSING
+        if persist is not None and use_disk:
+            value = await asyncio.to_thread(persist.load, key, args, kwargs)
+
+        if value is MISSING:
+            value = await call(args, kwargs)
+            if persist is not None:
+                await asyncio.to_thread(persist.store, key, value, args, kwargs)
+
+        if keep:
+            response_cache.set(key, value, ttl)
+        return value
+
+    async def fetch_or_stale(key, args, kwargs, keep=True):
+        try:
+            return await async_upstream_flights.do(
+                key, fetch, key, args, kwargs, keep=keep
+            )
+        except Exception as e:
+            if not is_upstream_failure(e):
+                raise
+            stale = _stale_value(endpoint, key)
+            if stale is MISSING and persist is not None:
+                stale = _mark_stale(
+                    endpoint,
+                    await asyncio.to_thread(persist.load_stale, key, args, kwargs),
+                )
+            if stale is MISSING:
+                if isinstance(e, CircuitOpenError):
+                    raise _open_circuit_error(e)
+                raise
+            return stale
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = make_key(endpoint, args, kwargs)
+
+        memo = get_request_memo()
+        if memo is not None and key in memo:
+            return memo[key]
+
+        value = response_cache.get(key)
+        if value is MISSING:
+            try:
+                value = await fetch_or_stale(key, args, kwargs)
+            except Exception:
+                depends_on(repr(key), None, lambda: None)
+                raise
+
+        _depend_on(key, persist, args, kwargs)
+        if memo is not None:
+            memo[key] = value
+        return value
+
+    async def refresh(*args, **kwargs):
+        key = make_key(endpoint, args, kwargs)
+        return await async_upstream_flights.do(
+            key, fetch, key, args, kwargs, use_disk=False
+        )
+
+    async def uncached(*args, **kwargs):
+        return await fetch_or_stale(
+            make_key(endpoint, args, kwargs), args, kwargs, keep=False
+        )
+
+    wrapper.refresh = refresh
+    wrapper.uncached = uncached
+    return wrapper
+
+
+def get_upstream_stats():
+    # Reading the stats must not open the disk cache
+    disk_cache = None if _disk_cache is MISSING else _disk_cache
+    return {
+        "cache": response_cache.stats(),
+        "single_flight": upstream_flights.stats(),
+        "async_single_flight": async_upstream_flights.stats(),
+        "governor": stats_governor.stats(),
+        "circuits": {
+            endpoint: breaker.stats() for endpoint, breaker in circuit_breakers.items()
+        },
+        "disk_cache": disk_cache.stats() if disk_cache is not None else None,
+    }
@@ -0,0 +1,279 @@
+"""
+In-memory search index over the static list of players.
+
+Names are case and accent folded and indexed by their 1 to 3 character grams, which
+answers substring queries of any length with a few set intersections instead of a
+scan of the whole list, and typo tolerant queries by trigram similarity.
+"""
+import bisect
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+
+from nba_api.stats.static import players
+
+from app.config.settings import POPULARITY_PATH
+from app.services.nba_api.nba_client_service import depend_on_static_data
+from app.utils.text import fold
+
+MAX_GRAM = 3
+
+# Rank of each kind of match, lower is better
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+
+FUZZY_MIN_SIMILARITY = 0.3
+
+# Number of the most looked up players kept when the popularity is saved
+POPULARITY_MAX_ENTRIES = 5000
+
+logger = logging.getLogger(__name__)
+
+# Number of lookups of each player, by id, ranking the search results and choosing
+# the players warmed at startup. Use ``count_lookup`` to update it, the saves
+# read it from a worker thread.
+player_counter = Counter()
+_popularity_lock = threading.Lock()
+_popularity_save_failed = False
+
+
+def grams(text: str, n: int):
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+def padded_trigrams(text: str):
+    return grams(f"  {text} ", 3)
+
+
+class PlayersSearchIndex:
+    def __init__(self, all_players):
+        self.players = all_players
+        self.names = [fold(p["full_name"]) for p in all_players]
+        self.words = [name.split() for name in self.names]
+        self.postings = defaultdict(set)
+        self.fuzzy_postings = defaultdict(set)
+        self.fuzzy_entries = []
+        self.exact = defaultdict(list)
+        self.sorted_names = sorted((name, i) for i, name in enumerate(self.names))
+        self.sorted_words = sorted(
+            (word, i) for i, words in enumerate(self.words) for word in words[1:]
+        )
+
+        for i, name in enumerate(self.names):
+            self.exact[name].append(i)
+            for n in range(1, MAX_GRAM + 1):
+                for gram in grams(name, n):
+                    self.postings[gram].add(i)
+            # Names are compared as a whole and word by word, so that a typo in
+            # one word of a long name still scores as similar
+            for text in dict.fromkeys([name, *self.words[i]]):
+                entry = len(self.fuzzy_entries)
+                text_grams = padded_trigrams(text)
+                self.fuzzy_entries.append((i, len(text_grams)))
+                for gram in text_grams:
+                    self.fuzzy_postings[gram].add(entry)
+
+    def find(self, query: str):
+        """
+        Return the indices of the players whose name contains the query.
+        """
+        query = fold(query).strip()
+        if not query:
+            return set(range(len(self.players)))
+
+        if len(query) <= MAX_GRAM:
+            return set(self.postings.get(query, ()))
+
+        query_grams = sorted(
+            (self.postings.get(gram, set()) for gram in grams(query, MAX_GRAM)),
+            key=len,
+        )
+        candidates = set.intersection(*query_grams)
+        return {i for i in candidates if query in self.names[i]}
+
+    def filter(self, query: str, is_active=None):
+        """
+        Return the players whose name contains the query, in the static list order.
+        """
+        return [
+            self.players[i]
+            for i in sorted(self.find(query))
+            if is_active is None or self.players[i]["is_active"] == is_active
+        ]
+
+    def similar(self, query: str, exclude=()):
+        """
+        Return the trigram similarity of the players sharing trigrams with the query.
+
+        The similarity of a player is the best one of its full name and of each
+        word of its name.
+        """
+        query_grams = padded_trigrams(query)
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for entry in self.fuzzy_postings.get(gram, ()):
+                shared[entry] += 1
+
+        similarities = {}
+        for entry, count in shared.items():
+            i, text_grams = self.fuzzy_entries[entry]
+            if i in exclude:
+                continue
+            similarity = count / (len(query_grams) + text_grams - count)
+            if similarity >= FUZZY_MIN_SIMILARITY and similarity > similarities.get(i, 0):
+                similarities[i] = similarity
+        return similarities
+
+    def search(self, query: str, limit=10, is_active=None, popularity=None):
+        """
+        Rank the players matching a typeahead query.
+
+        Exact matches come first, then names starting with the query, names with a
+        word starting with the query, names containing it and finally names similar
+        to it. Matches of the same kind are ranked by popularity. Each kind is only
+        looked up while fewer than ``limit`` players have been found.
+
+        Args:
+            query (str): The text typed so far.
+            limit (int): Maximum number of players to return.
+            is_active (bool, optional): Only return active or inactive players.
+            popularity (callable, optional): Returns the popularity of a player.
+
+        Returns:
+            list: The best matching players.
+        """
+        query = fold(query).strip()
+        if not query:
+            return []
+
+        popularity = popularity or (lambda player: 0)
+        found = []
+        seen = set()
+
+        def collect(candidates, distance=None):
+            candidates = [
+                i
+                for i in candidates
+                if i not in seen
+                and (is_active is None or self.players[i]["is_active"] == is_active)
+            ]
+            seen.update(candidates)
+            best = heapq.nsmallest(
+                limit - len(found),
+                candidates,
+                key=lambda i: (
+                    distance[i] if distance else 0,
+                    -popularity(self.players[i]),
+                    self.names[i],
+                ),
+            )
+            found.extend(best)
+            return len(found) >= limit
+
+        tiers = (
+            lambda: self.exact.get(query, ()),
+            lambda: self._prefixed(self.sorted_names, query),
+            lambda: self._prefixed(self.sorted_words, query),
+            lambda: self.find(query),
+        )
+        for tier in tiers:
+            if collect(tier()):
+                break
+        else:
+            similarities = self.similar(query, exclude=seen)
+            collect(similarities, {i: -s for i, s in similarities.items()})
+
+        return [self.players[i] for i in found]
+
+    @staticmethod
+    def _prefixed(sorted_keys, prefix):
+        start = bisect.bisect_left(sorted_keys, (prefix,))
+        end = bisect.bisect_left(sorted_keys, (prefix + "\uffff",))
+        return [i for _, i in sorted_keys[start:end]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_players_index():
+    """
+    Return the players search index, building it on first use.
+    """
+    global _index
+    depend_on_static_data()
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = PlayersSearchIndex(players.get_players())
+    return _index
+
+
+def count_lookup(player_id):
+    """
+    Count a lookup of the player with the given id.
+    """
+    with _popularity_lock:
+        player_counter[int(player_id)] += 1
+
+
+def save_popularity(path=POPULARITY_PATH):
+    """
+    Save the most looked up players, to rank the search and warm their stats after
+    a restart.
+
+    Errors are logged rather than raised, an unwritable path only once as a warning.
+    """
+    global _popularity_save_failed
+    with _popularity_lock:
+        popular = dict(player_counter.most_common(POPULARITY_MAX_ENTRIES))
+
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump(popular, f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        log = logger.debug if _popularity_save_failed else logger.warning
+        log("Error saving the players popularity to %s: %s", path, e)
+        _popularity_save_failed = True
+
+
+def load_popularity(path=POPULARITY_PATH):
+    """
+    Add the popularity saved by ``save_popularity`` to the current one.
+
+    Returns:
+        bool: Whether a saved popularity was loaded.
+    """
+    if not os.path.exists(path):
+        return False
+
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not load the players popularity: %s", e)
+        return False
+
+    # Entries not keyed by a player id, from older saves keyed by name, are dropped
+    with _popularity_lock:
+        player_counter.update(
+            {int(key): int(count) for key, count in saved.items() if key.isdigit()}
+        )
+    return True
+
+
+def most_popular_players(limit):
+    """
+    Return the ``limit`` most looked up players, most first.
+    """
+    with _popularity_lock:
+        popular = player_counter.most_common()
+
+    by_id = {player["id"]: player for player in get_players_index().players}
+    ranked = (by_id[player_id] for player_id, _ in popular if player_id in by_id)
+    return list(itertools.islice(ranked, limit))
@@ -1,6 +1,14 @@
-import requests
+import asyncio
+import logging
+from urllib.parse import urlsplit
+
 from bs4 import BeautifulSoup
 
+from app.config.settings import SCRAPER_BASE_URL, SCRAPER_TIMEOUT
+from app.services.http_client import close_http_client, get_http_client
+
+logger = logging.getLogger(__name__)
+
 WEBSITES = [
     {
         "name": "espn",
@@ -56,34 +64,58 @@ Inspired by the following sources:
 """
 
 
-# Get data from a website
-def get_data(website):
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36"
+}
+
+def select(soup, selector):
+    return soup.select(selector) if selector else []
+
+
+# URL a website address is downloaded from, under SCRAPER_BASE_URL when it is set
+def download_url(address):
+    if not SCRAPER_BASE_URL:
+        return address
+    parts = urlsplit(address)
+    url = f"{SCRAPER_BASE_URL.rstrip('/')}/{parts.netloc}{parts.path or '/'}"
+    return f"{url}?{parts.query}" if parts.query else url
+
+
+# Download a page with the asyncio client, returning its HTML or None when it is unavailable
+async def get_page_html_async(address, timeout=SCRAPER_TIMEOUT):
     try:
-        articles = []
-        session = requests.Session()
-        session.headers.update(
-            {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36"
-            }
+        response = await get_http_client().get(
+            download_url(address), headers=HEADERS, timeout=timeout
         )
-
-        response = session.get(website["address"])
         if response.status_code != 200:
-            print(
-                f"Failed to retrieve data from {website['name']}, status code {response.status_code}"
+            logger.warning(
+                "Failed to retrieve data from %s, status code %s",
+                address,
+                response.status_code,
+                extra={"address": address, "status_code": response.status_code},
             )
-            return []
+            return None
 
-        response.encoding = "utf-8"
+        return response.content.decode("utf-8", errors="replace")
 
-        soup = BeautifulSoup(response.text, "html.parser")
+    except Exception as e:
+        logger.warning(
+            "Error downloading %s: %s", address, e, extra={"address": address}
+        )
+        return None
+
+
+# Extract the articles of a website from its parsed page
+def parse_articles(soup, website):
+    try:
+        articles = []
 
         titles = [
             title.get_text(strip=True)
-            for title in soup.select(website["selectorTitle"])
+            for title in select(soup, website["selectorTitle"])
         ]
-        urls = [url.get("href") for url in soup.select(website["selectorUrl"])]
-        image_elements = soup.select(website["selectorImage"])
+        urls = [url.get("href") for url in select(soup, website["selectorUrl"])]
+        image_elements = select(soup, website["selectorImage"])
 
         for i, title in enumerate(titles):
             url = urls[i] if i < len(urls) else None
@@ -111,14 +143,55 @@ def get_data(website):
         return articles
 
     except Exception as e:
-        print(f"Error: {e}")
+        logger.warning(
+            "Error parsing the articles of %s: %s",
+            website["name"],
+            e,
+            extra={"source": website["name"]},
+        )
         return []
 
 
 # Get articles from all websites
-def get_articles():
+async def get_articles_async(websites=WEBSITES):
+    """
+    Scrape the articles of every website.
+
+    Each distinct address is downloaded once, concurrently; the websites sharing an
+    address are all parsed from the same document. Articles are returned in the
+    order of ``websites``.
+    """
+    addresses = list(dict.fromkeys(website["address"] for website in websites))
+    pages = dict(
+        zip(addresses, await asyncio.gather(*map(get_page_html_async, addresses)))
+    )
+    soups = {
+        address: BeautifulSoup(html, "html.parser")
+        for address, html in pages.items()
+        if html is not None
+    }
+
     articles = []
-    for website in WEBSITES:
-        articles.extend(get_data(website))
+    for website in websites:
+        soup = soups.get(website["address"])
+        if soup is not None:
+            articles.extend(parse_articles(soup, website))
 
     return articles
+
+
+def get_articles(websites=WEBSITES):
+    """
+    Scrape the articles of every website outside of an event loop, see ``get_articles_async``.
+
+    The app serves the articles ingested in the background by articles_ingestion,
+    this is for scripts and one-off scrapes.
+    """
+
+    async def scrape():
+        try:
+            return await get_articles_async(websites)
+        finally:
+            await close_http_client()
+
+    return asyncio.run(scrape())
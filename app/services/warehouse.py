@@ -0,0 +1,545 @@
+"""
+League-wide columnar store of the players' season stats.
+
+The per-season totals of every player are ingested from their career stats into
+NumPy arrays, with one row per player, season, season type and team. Queries run
+on immutable snapshots of these arrays, so analytics and leaderboards never fan
+out to stats.nba.com.
+
+The arrays and a manifest of the ingested players are saved on disk, so an
+interrupted refresh resumes where it stopped and a restart does not start over.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from nba_api.stats.static import players
+
+from app.config.settings import (
+    WAREHOUSE_CHECKPOINT_EVERY,
+    WAREHOUSE_DIR,
+    WAREHOUSE_MAX_AGE,
+    WAREHOUSE_MAX_WORKERS,
+)
+from app.services.nba_api.nba_client_service import get_player_carrer_totals
+
+logger = logging.getLogger(__name__)
+
+SEASON_TYPES = ("Regular Season", "Playoffs")
+
+STAT_COLUMNS = (
+    "GP",
+    "GS",
+    "MIN",
+    "FGM",
+    "FGA",
+    "FG3M",
+    "FG3A",
+    "FTM",
+    "FTA",
+    "OREB",
+    "DREB",
+    "REB",
+    "AST",
+    "STL",
+    "BLK",
+    "TOV",
+    "PF",
+    "PTS",
+)
+
+_COLUMN_INDEX = {name: i for i, name in enumerate(STAT_COLUMNS)}
+
+
+def season_start(season):
+    """
+    Return the starting year of a season id, e.g. 2023 for "2023-24".
+    """
+    return int(str(season)[:4])
+
+
+def season_id(start):
+    """
+    Return the season id starting in the given year, e.g. "2023-24" for 2023.
+    """
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+class PlayerRows:
+    """
+    Season totals of a single player, one row per season, season type and team.
+
+    A player traded during a season has a row per team and a "TOT" row with the
+    season totals. ``is_player_row`` marks the rows counted for the player (the
+    "TOT" row or the single team row) and ``is_team_row`` the rows counted for a
+    team (every row except "TOT").
+    """
+
+    __slots__ = (
+        "season_type",
+        "season",
+        "team_id",
+        "is_player_row",
+        "is_team_row",
+        "stats",
+    )
+
+    def __init__(self, season_type, season, team_id, is_player_row, is_team_row, stats):
+        self.season_type = season_type
+        self.season = season
+        self.team_id = team_id
+        self.is_player_row = is_player_row
+        self.is_team_row = is_team_row
+        self.stats = stats
+
+    @classmethod
+    def from_career_stats(cls, career_stats):
+        frames = (
+            career_stats.season_totals_regular_season.get_data_frame(),
+            career_stats.season_totals_post_season.get_data_frame(),
+        )
+
+        parts = []
+        for season_type, df in enumerate(frames):
+            if df.empty:
+                continue
+
+            is_total = (df["TEAM_ABBREVIATION"] == "TOT").to_numpy()
+            rows_per_season = df.groupby("SEASON_ID")["SEASON_ID"].transform("size")
+
+            parts.append(
+                cls(
+                    season_type=np.full(len(df), season_type, dtype=np.int8),
+                    season=df["SEASON_ID"].str[:4].astype(np.int16).to_numpy(),
+                    team_id=df["TEAM_ID"].fillna(0).astype(np.int64).to_numpy(),
+                    is_player_row=is_total | (rows_per_season == 1).to_numpy(),
+                    is_team_row=~is_total,
+                    stats=df[list(STAT_COLUMNS)]
+                    .apply(lambda column: column.astype(float))
+                    .to_numpy(dtype=np.float64, na_value=np.nan),
+                )
+            )
+
+        return cls.concatenate(parts)
+
+    @classmethod
+    def empty(cls):
+        return cls(
+            season_type=np.empty(0, dtype=np.int8),
+            season=np.empty(0, dtype=np.int16),
+            team_id=np.empty(0, dtype=np.int64),
+            is_player_row=np.empty(0, dtype=bool),
+            is_team_row=np.empty(0, dtype=bool),
+            stats=np.empty((0, len(STAT_COLUMNS)), dtype=np.float64),
+        )
+
+    @classmethod
+    def concatenate(cls, parts):
+        if not parts:
+            return cls.empty()
+
+        return cls(
+            *(
+                np.concatenate([getattr(part, name) for part in parts])
+                for name in cls.__slots__
+            )
+        )
+
+    def __len__(self):
+        return len(self.season)
+
+
+class SeasonTable:
+    """
+    Columnar totals of the players and teams of a season.
+
+    Attributes:
+        season (str): The season id, e.g. "2023-24".
+        season_type (str): "Regular Season" or "Playoffs".
+        player_ids (np.ndarray): One entry per player who played the season.
+        team_ids (np.ndarray): Team of each player, the last one for traded players.
+        columns (dict): Totals of each stat of ``STAT_COLUMNS``, aligned with ``player_ids``.
+        teams (np.ndarray): One entry per team.
+        team_columns (dict): Totals of each stat of ``STAT_COLUMNS``, aligned with ``teams``.
+        version (int): Version of the warehouse snapshot the table was built from.
+    """
+
+    def __init__(
+        self, season, season_type, player_ids, team_ids, stats, teams, team_stats, version
+    ):
+        self.season = season
+        self.season_type = season_type
+        self.player_ids = player_ids
+        self.team_ids = team_ids
+        self.teams = teams
+        self.version = version
+        self.columns = {name: stats[:, i] for name, i in _COLUMN_INDEX.items()}
+        self.team_columns = {name: team_stats[:, i] for name, i in _COLUMN_INDEX.items()}
+        self._rows = None
+
+    def row_of(self, player_id):
+        """
+        Return the row of the player, or None if they did not play the season.
+        """
+        if self._rows is None:
+            self._rows = {int(pid): row for row, pid in enumerate(self.player_ids)}
+        return self._rows.get(int(player_id))
+
+    def __len__(self):
+        return len(self.player_ids)
+
+
+class WarehouseSnapshot:
+    """
+    Immutable columnar view of the rows of every ingested player.
+
+    Attributes:
+        version (int): Incremented every time a snapshot is rebuilt.
+        updated_at (float): Time of the last ingestion of the rows, which also
+            versions them across restarts.
+    """
+
+    def __init__(self, player_rows=None, version=0, updated_at=0.0):
+        player_rows = player_rows or {}
+        self.version = version
+        self.updated_at = updated_at
+        self.player_count = len(player_rows)
+
+        rows = PlayerRows.concatenate(list(player_rows.values()))
+        self.player_id = np.repeat(
+            np.fromiter(player_rows.keys(), dtype=np.int64, count=len(player_rows)),
+            [len(part) for part in player_rows.values()],
+        )
+        self.season_type = rows.season_type
+        self.season = rows.season
+        self.team_id = rows.team_id
+        self.is_player_row = rows.is_player_row
+        self.is_team_row = rows.is_team_row
+        self.stats = rows.stats
+
+        self._tables = {}
+        self._tables_lock = threading.Lock()
+
+    def seasons(self, season_type="Regular Season"):
+        """
+        Return the ids of the seasons with ingested stats, most recent first.
+        """
+        starts = np.unique(self.season[self.season_type == _season_type_code(season_type)])
+        return [season_id(int(start)) for start in starts[::-1]]
+
+    def season_table(self, season, season_type="Regular Season"):
+        """
+        Return the table of a season, built on first use.
+        """
+        key = (season_start(season), _season_type_code(season_type))
+        table = self._tables.get(key)
+        if table is None:
+            with self._tables_lock:
+                table = self._tables.get(key)
+                if table is None:
+                    table = self._build_season_table(*key)
+                    self._tables[key] = table
+        return table
+
+    def player_rows(self, player_id, season_type="Regular Season"):
+        """
+        Return the seasons and stats of the player rows of a player, oldest first.
+        """
+        mask = (
+            (self.player_id == int(player_id))
+            & (self.season_type == _season_type_code(season_type))
+            & self.is_player_row
+        )
+        order = np.argsort(self.season[mask], kind="stable")
+        return self.season[mask][order], self.stats[mask][order]
+
+    def _build_season_table(self, start, season_type):
+        in_season = (self.season == start) & (self.season_type == season_type)
+
+        player_mask = in_season & self.is_player_row
+        team_mask = in_season & self.is_team_row
+
+        # The team of a traded player is the last team row of their season
+        team_rows = np.flatnonzero(team_mask)
+        last_team = dict(zip(self.player_id[team_rows], self.team_id[team_rows]))
+        player_ids = self.player_id[player_mask]
+        team_ids = np.array(
+            [last_team.get(pid, 0) for pid in player_ids], dtype=np.int64
+        )
+
+        teams, inverse = np.unique(self.team_id[team_mask], return_inverse=True)
+        team_stats = np.zeros((len(teams), len(STAT_COLUMNS)))
+        np.add.at(team_stats, inverse, np.nan_to_num(self.stats[team_mask]))
+
+        return SeasonTable(
+            season=season_id(start),
+            season_type=SEASON_TYPES[season_type],
+            player_ids=player_ids,
+            team_ids=team_ids,
+            stats=self.stats[player_mask],
+            teams=teams,
+            team_stats=team_stats,
+            version=self.version,
+        )
+
+
+def _season_type_code(season_type):
+    try:
+        return SEASON_TYPES.index(season_type)
+    except ValueError:
+        raise ValueError(f"Unknown season type: {season_type}")
+
+
+class StatsWarehouse:
+    """
+    Ingest the season stats of the players and serve snapshots of them.
+
+    Args:
+        directory (str, optional): Directory where the arrays and the manifest are
+            saved. Nothing is saved if None.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._player_rows = {}
+        self._manifest = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._snapshot = WarehouseSnapshot()
+        self._dirty = False
+        self._save_failed = False
+
+    def ingest(self, player_id, career_stats):
+        """
+        Replace the rows of a player with the season totals of their career stats.
+        """
+        rows = PlayerRows.from_career_stats(career_stats)
+        with self._lock:
+            self._player_rows[int(player_id)] = rows
+            self._manifest[int(player_id)] = time.time()
+            self._dirty = True
+
+    def snapshot(self):
+        """
+        Return a snapshot of the ingested rows, rebuilt only when they changed.
+
+        During a refresh the snapshot is only rebuilt at its checkpoints, rather
+        than on every call while players are being ingested.
+        """
+        with self._lock:
+            if self._dirty and not self._refresh_lock.locked():
+                self._publish()
+            return self._snapshot
+
+    def _publish(self):
+        # Called with the lock held
+        self._snapshot = WarehouseSnapshot(
+            dict(self._player_rows),
+            self._snapshot.version + 1,
+            max(self._manifest.values(), default=0.0),
+        )
+        self._dirty = False
+
+    def _checkpoint(self):
+        with self._lock:
+            if self._dirty:
+                self._publish()
+        self.save()
+
+    def is_stale(self, player, max_age=WAREHOUSE_MAX_AGE):
+        """
+        Tell whether a player has to be (re)ingested.
+
+        The stats of a retired player are final once ingested, the ones of an
+        active player are refreshed after ``max_age`` seconds.
+        """
+        ingested_at = self._manifest.get(player["id"])
+        if ingested_at is None:
+            return True
+        return player["is_active"] and time.time() - ingested_at > max_age
+
+    def refresh(
+        self,
+        player_list=None,
+        max_age=WAREHOUSE_MAX_AGE,
+        max_workers=WAREHOUSE_MAX_WORKERS,
+        checkpoint_every=WAREHOUSE_CHECKPOINT_EVERY,
+    ):
+        """
+        Ingest the stale players, with a checkpoint every ``checkpoint_every`` players.
+
+        A checkpoint publishes the players ingested so far in a new snapshot and saves
+        the warehouse.
+
+        Players that fail to be fetched are skipped, and retried on the next refresh.
+        Only one refresh runs at a time, concurrent calls return immediately.
+
+        Args:
+            player_list (list, optional): Players to refresh, as returned by
+                ``nba_api.stats.static.players``. Defaults to all players.
+            max_age (int): Seconds after which the stats of an active player are stale.
+            max_workers (int): Maximum number of concurrent upstream calls.
+            checkpoint_every (int): Number of ingested players between two checkpoints.
+
+        Returns:
+            int: The number of ingested players.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return 0
+
+        try:
+            stale = [
+                player
+                for player in (player_list or players.get_players())
+                if self.is_stale(player, max_age)
+            ]
+
+            ingested = 0
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for done in executor.map(self._ingest_player, stale):
+                    if not done:
+                        continue
+                    ingested += 1
+                    if ingested % checkpoint_every == 0:
+                        self._checkpoint()
+
+            if ingested:
+                self._checkpoint()
+            return ingested
+        finally:
+            self._refresh_lock.release()
+
+    def _ingest_player(self, player):
+        # Bypasses the in-memory cache, so a full refresh does not evict the entries
+        # of live traffic. The calls go through the rate governor with the
+        # background priority, the circuit breaker and the disk cache
+        try:
+            self.ingest(
+                player["id"],
+                get_player_carrer_totals.uncached({"player_id": player["id"]}),
+            )
+            return True
+        except Exception as e:
+            logger.warning(
+                "Error ingesting the stats of player %s: %s",
+                player["id"],
+                e,
+                extra={"player_id": player["id"]},
+            )
+            return False
+
+    def save(self):
+        """
+        Save the rows and the manifest, replacing the previous files atomically.
+        """
+        if self.directory is None:
+            return
+
+        try:
+            self._save()
+        except OSError as e:
+            # An unwritable directory fails every checkpoint, only the first one is a warning
+            log = logger.debug if self._save_failed else logger.warning
+            log("Error saving the warehouse to %s: %s", self.directory, e)
+            self._save_failed = True
+
+    def _save(self):
+        with self._lock:
+            player_rows = dict(self._player_rows)
+            manifest = dict(self._manifest)
+
+        os.makedirs(self.directory, exist_ok=True)
+        counts = np.array([len(rows) for rows in player_rows.values()], dtype=np.int64)
+        rows = PlayerRows.concatenate(list(player_rows.values()))
+
+        arrays_path = os.path.join(self.directory, "stats.npz")
+        with open(arrays_path + ".tmp", "wb") as f:
+            np.savez(
+                f,
+                player_id=np.fromiter(player_rows.keys(), dtype=np.int64),
+                counts=counts,
+                columns=np.array(STAT_COLUMNS),
+                **{name: getattr(rows, name) for name in PlayerRows.__slots__},
+            )
+        os.replace(arrays_path + ".tmp", arrays_path)
+
+        # The manifest is written last, a player it lists always has saved rows
+        manifest_path = os.path.join(self.directory, "manifest.json")
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump({"players": manifest}, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    def load(self):
+        """
+        Load the rows and the manifest saved by a previous process, if any.
+
+        Returns:
+            bool: Whether saved data was loaded.
+        """
+        if self.directory is None:
+            return False
+
+        arrays_path = os.path.join(self.directory, "stats.npz")
+        manifest_path = os.path.join(self.directory, "manifest.json")
+        if not (os.path.exists(arrays_path) and os.path.exists(manifest_path)):
+            return False
+
+        try:
+            with open(manifest_path) as f:
+                manifest = {int(k): v for k, v in json.load(f)["players"].items()}
+
+            with np.load(arrays_path) as data:
+                if tuple(data["columns"]) != STAT_COLUMNS:
+                    logger.warning("Saved warehouse has other stat columns, ignoring it")
+                    return False
+
+                bounds = np.cumsum(data["counts"])[:-1]
+                columns = [np.split(data[name], bounds) for name in PlayerRows.__slots__]
+                player_rows = {
+                    int(player_id): PlayerRows(*(parts[i] for parts in columns))
+                    for i, player_id in enumerate(data["player_id"])
+                }
+        except Exception as e:
+            logger.warning("Error loading the saved warehouse: %s", e)
+            return False
+
+        with self._lock:
+            self._player_rows = player_rows
+            self._manifest = {pid: t for pid, t in manifest.items() if pid in player_rows}
+            self._dirty = True
+        return True
+
+    def stats(self):
+        snapshot = self.snapshot()
+        return {
+            "players": snapshot.player_count,
+            "rows": len(snapshot.season),
+            "version": snapshot.version,
+            "refreshing": self._refresh_lock.locked(),
+        }
+
+
+_warehouse = None
+_warehouse_lock = threading.Lock()
+
+
+def get_warehouse():
+    """
+    Return the stats warehouse, loading the saved data on first use.
+    """
+    global _warehouse
+    if _warehouse is None:
+        with _warehouse_lock:
+            if _warehouse is None:
+                warehouse = StatsWarehouse(WAREHOUSE_DIR or None)
+                warehouse.load()
+                _warehouse = warehouse
+    return _warehouse
+
+
+def refresh_warehouse():
+    return get_warehouse().refresh()
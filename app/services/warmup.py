@@ -0,0 +1,109 @@
+"""
+Startup warming of the caches, and readiness of the API.
+
+Until the warming is done the API reports itself not ready on ``/ready``, so new
+instances only take traffic once the static tables, the players search index and
+the stats of the most popular players are loaded. The warming runs outside of any
+request, so its upstream calls have the background priority and yield to the
+requests served meanwhile.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+from app.config.settings import WARMUP_HOT_PLAYERS
+from app.services.nba_api.nba_client_service import (
+    get_all_players,
+    get_all_teams,
+    get_player_awards_async,
+    get_player_carrer_totals_async,
+    get_player_info_async,
+)
+from app.services.players_search import get_players_index, most_popular_players
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def set_ready(ready):
+    if ready:
+        _ready.set()
+    else:
+        _ready.clear()
+
+
+def warm_static_data(hot_players):
+    """
+    Load the static tables and build the players search index.
+
+    Returns:
+        list: The ``hot_players`` most popular players.
+    """
+    get_all_players()
+    get_all_teams()
+    get_players_index()
+    return most_popular_players(hot_players)
+
+
+async def warm_player(player_id):
+    """
+    Load the stats of a popular player in the caches.
+    """
+    await asyncio.gather(
+        get_player_carrer_totals_async({"player_id": player_id}),
+        get_player_info_async(player_id),
+        get_player_awards_async(player_id),
+    )
+
+
+async def warm_up(hot_players=WARMUP_HOT_PLAYERS):
+    """
+    Load the static tables, then the stats of the ``hot_players`` most popular players.
+
+    The players are warmed one at a time, a player whose stats can't be loaded is
+    logged and skipped.
+    """
+    started_at = time.perf_counter()
+    popular = await asyncio.to_thread(warm_static_data, hot_players)
+
+    warmed = 0
+    for player in popular:
+        try:
+            await warm_player(player["id"])
+            warmed += 1
+        except Exception as e:
+            logger.warning("Could not warm the stats of player %s: %s", player["id"], e)
+
+    logger.info(
+        "Caches warmed with %d popular players in %.1fs",
+        warmed,
+        time.perf_counter() - started_at,
+    )
+
+
+async def warm_up_then_ready(timeout):
+    """
+    Warm the caches, then report the API ready.
+
+    The API is reported ready after ``timeout`` seconds even if the warming is not
+    done, which goes on in the background, so a slow upstream can't keep it out of
+    service.
+    """
+    warming = asyncio.create_task(warm_up())
+    try:
+        await asyncio.wait_for(asyncio.shield(warming), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Caches still warming after %ss, reporting ready", timeout)
+    except asyncio.CancelledError:
+        warming.cancel()
+        raise
+    except Exception as e:
+        logger.exception("Error warming the caches: %s", e)
+    set_ready(True)
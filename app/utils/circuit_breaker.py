@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling upstream while the circuit is open.
+
+    Attributes:
+        retry_after (float): Seconds until the circuit lets a trial call through.
+    """
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit {name} is open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Stop calling a failing upstream, and probe it until it recovers.
+
+    The breaker is closed while the failure ratio of the calls of the last
+    ``window`` seconds stays under ``failure_threshold``. Calls slower than
+    ``slow_call_seconds`` count as failures. Once tripped, the breaker is open and
+    calls fail fast for ``open_seconds``. It then lets ``half_open_calls`` trial
+    calls through: it closes if they all succeed and opens again on a failure.
+
+    Args:
+        name (str): Name of the protected upstream, used in errors and stats.
+        failure_threshold (float): Failure ratio tripping the breaker, between 0 and 1.
+        min_calls (int): Minimum number of calls in the window before it can trip.
+        window (float): Seconds of call outcomes taken into account.
+        slow_call_seconds (float): Duration above which a successful call is a failure.
+        open_seconds (float): Seconds the breaker stays open before the trial calls.
+        half_open_calls (int): Number of trial calls made while half-open.
+    """
+
+    def __init__(
+        self,
+        name,
+        failure_threshold=0.5,
+        min_calls=10,
+        window=60,
+        slow_call_seconds=20,
+        open_seconds=30,
+        half_open_calls=3,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._outcomes = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials_started = 0
+        self._trials_succeeded = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.trips = 0
+
+    def before_call(self):
+        """
+        Reserve the right to call upstream.
+
+        Raises:
+            CircuitOpenError: If the breaker is open, or half-open with all its trial
+                calls in progress.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN:
+                retry_after = self._opened_at + self.open_seconds - now
+                if retry_after > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, retry_after)
+                self.state = HALF_OPEN
+                self._trials_started = 0
+                self._trials_succeeded = 0
+
+            if self.state == HALF_OPEN:
+                if self._trials_started >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.open_seconds)
+                self._trials_started += 1
+
+    def record(self, duration, failed=False):
+        """
+        Record the outcome of a call allowed by ``before_call``.
+        """
+        failed = failed or duration > self.slow_call_seconds
+
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                if failed:
+                    self._open(now)
+                else:
+                    self._trials_succeeded += 1
+                    if self._trials_succeeded >= self.half_open_calls:
+                        self.state = CLOSED
+                        self._outcomes.clear()
+                        self._failures = 0
+                return
+
+            if self.state == OPEN:
+                return
+
+            self._outcomes.append((now, failed))
+            self._failures += failed
+            while self._outcomes and self._outcomes[0][0] < now - self.window:
+                self._failures -= self._outcomes.popleft()[1]
+
+            if (
+                len(self._outcomes) >= self.min_calls
+                and self._failures / len(self._outcomes) >= self.failure_threshold
+            ):
+                self._open(now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "calls": len(self._outcomes),
+                "failures": self._failures,
+                "rejected": self.rejected,
+                "trips": self.trips,
+            }
+
+    def _open(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self._failures = 0
+        self.trips += 1
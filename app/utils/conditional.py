@@ -0,0 +1,75 @@
+import contextlib
+import contextvars
+
+_request_dependencies = contextvars.ContextVar("request_dependencies", default=None)
+
+
+class Dependency:
+    """
+    A piece of data a response is built from, at the version it was used at.
+
+    Attributes:
+        name (str): Identifies the data, e.g. the key of a cached upstream call.
+        version: Version of the data used, None when it can't be revalidated
+            (e.g. a stale value).
+        current (callable): Returns the current version of the data.
+        modified_at (float): Time the data last changed at, None if unknown.
+        max_age (float): Seconds the data may be cached for, None for no limit.
+    """
+
+    __slots__ = ("name", "version", "current", "modified_at", "max_age")
+
+    def __init__(self, name, version, current, modified_at=None, max_age=None):
+        self.name = name
+        self.version = version
+        self.current = current
+        self.modified_at = modified_at
+        self.max_age = max_age
+
+    def is_current(self):
+        return self.version is not None and self.current() == self.version
+
+
+def depends_on(name, version, current, modified_at=None, max_age=None):
+    """
+    Record that the response of the current request is built from a piece of data.
+
+    Outside of a dependency scope, e.g. in background work, nothing is recorded.
+    See ``Dependency`` for the arguments.
+    """
+    dependencies = _request_dependencies.get()
+    if dependencies is not None:
+        dependencies.append(Dependency(name, version, current, modified_at, max_age))
+
+
+@contextlib.contextmanager
+def dependency_scope():
+    """
+    Collect the dependencies recorded in the current context into a list.
+
+    Like the request scope, the list follows the request into the threadpool as
+    long as the context is copied.
+    """
+    dependencies = []
+    token = _request_dependencies.set(dependencies)
+    try:
+        yield dependencies
+    finally:
+        _request_dependencies.reset(token)
+
+
+def cache_policy(max_age):
+    """
+    Let the responses of a route be cached and revalidated, for at most ``max_age`` seconds.
+
+    Responses of the decorated route get an ETag and a Last-Modified derived from
+    the versions of the data they are built from, and a Cache-Control max-age
+    bounded by ``max_age`` and by the time the data may be cached for. Only routes
+    recording every piece of data they use with ``depends_on`` may be decorated.
+    """
+
+    def decorator(func):
+        func.cache_max_age = max_age
+        return func
+
+    return decorator
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """
+    Persistent key-value cache stored in a SQLite database.
+
+    Entries survive restarts and may never expire (``expires_at`` is None), which
+    suits upstream data that is final once its season is over.
+
+    Args:
+        directory (str): Directory of the database file, created if needed.
+        filename (str): Name of the database file.
+    """
+
+    def __init__(self, directory, filename="upstream.sqlite3"):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, filename)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL
+            )
+            """
+        )
+        self._connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Return the payload stored under the key, or None if it is absent or expired.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or (row[1] is not None and row[1] <= time.time()):
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return row[0]
+
+    def get_stale(self, key):
+        """
+        Return the payload stored under the key even if it is expired, and the
+        time it was stored at, or None if it is absent.
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT payload, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+    def set(self, key, payload, ttl=None):
+        """
+        Store the payload under the key for ``ttl`` seconds, or forever if ttl is None.
+        """
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries (key, payload, stored_at, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, payload, now, expires_at),
+            )
+            self._connection.commit()
+
+    def purge_expired(self):
+        with self._lock:
+            deleted = self._connection.execute(
+                "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            ).rowcount
+            self._connection.commit()
+            return deleted
+
+    def stats(self):
+        with self._lock:
+            entries, final = self._connection.execute(
+                "SELECT COUNT(*), COUNT(*) - COUNT(expires_at) FROM entries"
+            ).fetchone()
+            return {
+                "entries": entries,
+                "final_entries": final,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
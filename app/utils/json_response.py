@@ -0,0 +1,41 @@
+import orjson
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+from app.utils.clean_json import frame_json
+from app.utils.timing import span
+
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    if isinstance(obj, pd.DataFrame):
+        return orjson.Fragment(frame_json(obj, _default, OPTIONS))
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content) -> bytes:
+    """
+    Serialize a value to JSON bytes with orjson.
+
+    NaN and infinities are written as null, and floats with their shortest
+    round-trip representation, like the standard library. DataFrames found
+    anywhere in the value are written as arrays of records by ``frame_json``,
+    and embedded in the output as is.
+    """
+    if isinstance(content, pd.DataFrame):
+        return frame_json(content, _default, OPTIONS)
+
+    return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson, which also accepts DataFrames as values.
+    """
+
+    def render(self, content) -> bytes:
+        with span("serialize"):
+            return dumps(content)
@@ -0,0 +1,208 @@
+"""
+Prometheus metrics of the API, exposed by the /metrics route.
+"""
+from urllib.parse import urlparse
+
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from app.utils.timing import record_span
+
+# Upstream calls are much slower than our own processing, hence the wider buckets
+UPSTREAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 70)
+
+http_requests = Counter(
+    "backcourt_http_requests_total",
+    "HTTP requests handled, by route and status",
+    ["method", "route", "status"],
+)
+http_request_duration = Histogram(
+    "backcourt_http_request_duration_seconds",
+    "Time spent handling HTTP requests, by route",
+    ["method", "route"],
+)
+http_requests_in_flight = Gauge(
+    "backcourt_http_requests_in_flight", "HTTP requests being handled"
+)
+
+threadpool_busy = Gauge(
+    "backcourt_threadpool_busy_threads",
+    "Worker threads of the default threadpool in use",
+)
+threadpool_size = Gauge(
+    "backcourt_threadpool_max_threads", "Size of the default threadpool"
+)
+
+upstream_requests = Counter(
+    "backcourt_upstream_requests_total",
+    "HTTP requests sent upstream, by host, endpoint and status ('error' when it raised)",
+    ["upstream", "endpoint", "status"],
+)
+upstream_request_duration = Histogram(
+    "backcourt_upstream_request_duration_seconds",
+    "Duration of the HTTP requests sent upstream, by host and endpoint",
+    ["upstream", "endpoint"],
+    buckets=UPSTREAM_BUCKETS,
+)
+upstream_retries = Counter(
+    "backcourt_upstream_retries_total",
+    "HTTP requests sent upstream again after a transient error",
+    ["upstream", "endpoint"],
+)
+
+
+def upstream_labels(url):
+    """
+    Return the host and the endpoint of an upstream URL.
+
+    The endpoint is the last segment of the stats.nba.com paths (e.g.
+    "playercareerstats") and the path of the other hosts (the scraped pages).
+    """
+    parsed = urlparse(str(url))
+    if parsed.hostname == "stats.nba.com":
+        return parsed.hostname, parsed.path.rstrip("/").rsplit("/", 1)[-1]
+    return parsed.hostname or "", parsed.path or "/"
+
+
+def observe_upstream(url, duration, status_code=None):
+    """
+    Record an HTTP request sent upstream, also in the "upstream" span of the request.
+
+    Args:
+        url (str): The requested URL.
+        duration (float): Seconds until the response, or the error.
+        status_code (int, optional): The response status, None if the request raised.
+    """
+    upstream, endpoint = upstream_labels(url)
+    status = "error" if status_code is None else str(status_code)
+    upstream_requests.labels(upstream, endpoint, status).inc()
+    upstream_request_duration.labels(upstream, endpoint).observe(duration)
+    record_span("upstream", duration)
+
+
+def observe_retry(url):
+    upstream_retries.labels(*upstream_labels(url)).inc()
+
+
+_CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class UpstreamStatsCollector:
+    """
+    Expose the stats of the upstream layer (see ``get_upstream_stats``) at scrape time.
+
+    Args:
+        stats (callable): Returns the dict of the upstream stats.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def collect(self):
+        stats = self.stats()
+
+        cache = stats["cache"]
+        yield _gauge(
+            "cache_entries", "Upstream responses cached in memory", cache["entries"]
+        )
+        yield _gauge(
+            "cache_bytes",
+            "Approximate size of the cached upstream responses",
+            cache["bytes"],
+        )
+        yield _counter(
+            "cache_hits", "Lookups served by the memory cache", cache["hits"]
+        )
+        yield _counter(
+            "cache_misses", "Lookups missing the memory cache", cache["misses"]
+        )
+        yield _counter(
+            "cache_evictions",
+            "Entries evicted from the memory cache",
+            cache["evictions"],
+        )
+        yield _counter(
+            "cache_stale_hits",
+            "Stale values served from the memory cache",
+            cache["stale_hits"],
+        )
+        yield _gauge(
+            "cache_hit_ratio", "Hit ratio of the memory cache", cache["hit_ratio"]
+        )
+
+        disk = stats.get("disk_cache")
+        if disk is not None:
+            yield _gauge(
+                "disk_cache_entries",
+                "Upstream responses stored on disk",
+                disk["entries"],
+            )
+            yield _counter(
+                "disk_cache_hits", "Lookups served by the disk cache", disk["hits"]
+            )
+            yield _counter(
+                "disk_cache_misses", "Lookups missing the disk cache", disk["misses"]
+            )
+
+        for name in ("single_flight", "async_single_flight"):
+            flights = stats[name]
+            yield _counter(
+                f"{name}_executions", "Upstream fetches executed", flights["executions"]
+            )
+            yield _counter(
+                f"{name}_coalesced",
+                "Calls waiting on another identical fetch",
+                flights["coalesced"],
+            )
+
+        governor = stats["governor"]
+        yield _gauge(
+            "governor_queue_depth",
+            "Calls waiting for admission",
+            governor["queue_depth"],
+        )
+        yield _gauge(
+            "governor_in_flight",
+            "Calls admitted and in progress",
+            governor["in_flight"],
+        )
+        yield _gauge(
+            "governor_concurrency_limit",
+            "Adaptive concurrency limit",
+            governor["concurrency_limit"],
+        )
+        yield _counter("governor_granted", "Calls admitted", governor["granted"])
+        yield _counter(
+            "governor_throttled",
+            "Calls throttled upstream (429)",
+            governor["throttled"],
+        )
+        yield _counter(
+            "governor_wait_seconds",
+            "Time spent waiting for admission",
+            governor["wait_seconds_total"],
+        )
+
+        state = GaugeMetricFamily(
+            "backcourt_circuit_state",
+            "State of the circuit breakers (0 closed, 1 half-open, 2 open)",
+            labels=["endpoint"],
+        )
+        rejected = CounterMetricFamily(
+            "backcourt_circuit_rejected",
+            "Calls rejected by the open circuit breakers",
+            labels=["endpoint"],
+        )
+        for endpoint, circuit in stats["circuits"].items():
+            state.add_metric([endpoint], _CIRCUIT_STATES[circuit["state"]])
+            rejected.add_metric([endpoint], circuit["rejected"])
+        yield state
+        yield rejected
+
+
+def _gauge(name, documentation, value):
+    return GaugeMetricFamily(f"backcourt_upstream_{name}", documentation, value=value)
+
+
+def _counter(name, documentation, value):
+    return CounterMetricFamily(f"backcourt_upstream_{name}", documentation, value=value)
@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+from collections import Counter
+
+# Frames of these directories are shortened to their path relative to it
+_ROOTS = sorted({os.path.dirname(path) for path in sys.path if path}, key=len, reverse=True)
+
+
+def _frame_label(code):
+    filename = code.co_filename
+    for root in _ROOTS:
+        if filename.startswith(root + os.sep):
+            filename = filename[len(root) + 1 :]
+            break
+    return f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stacks of every thread of the process.
+
+    A background thread records the stack of each other thread every ``interval``
+    seconds, from ``sys._current_frames``. Samples are aggregated as collapsed
+    stacks ("thread;outer;...;inner count" lines), the input of flame graph tools
+    such as flamegraph.pl and speedscope.
+
+    All the threads are sampled, so the work of the requests running at the same
+    time as the profiled one shows up as well.
+
+    Args:
+        interval (float): Seconds between two samples.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = 0
+        self._stacks = Counter()
+        self._labels = {}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        return self
+
+    def collapsed(self):
+        """
+        Return the samples as collapsed stacks, one stack per line.
+        """
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self._stacks.most_common()
+        )
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = self._labels.get(code)
+                    if label is None:
+                        label = self._labels[code] = _frame_label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
@@ -0,0 +1,227 @@
+"""
+Lazy query pipeline for the list routes: filter, order, page, transform, serialize.
+
+A ``Query`` only describes the stages. ``execute`` runs the filters and the
+ordering in a single pass over the rows, keeping only the rows of the requested
+page (with a bounded heap when ordering), and the transformation only runs on
+that page. The total count is tallied during the same pass, without
+materializing the filtered rows.
+
+Pages are selected either by number (``page`` and ``page_size``) or by cursor.
+A cursor is an opaque token holding the ordering key and the position of the
+last row returned, so the next page resumes after that row even when rows were
+added or removed in between.
+"""
+
+import base64
+import heapq
+import itertools
+from operator import itemgetter
+
+import orjson
+
+from app.utils.timing import span
+
+
+def _to_tuples(value):
+    if isinstance(value, list):
+        return tuple(_to_tuples(item) for item in value)
+    return value
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(orjson.dumps(key)).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Return the ordering key held by a cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        key = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, orjson.JSONDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(key, list) or len(key) != 2 or not isinstance(key[1], int):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return _to_tuples(key)
+
+
+class Page:
+    """
+    Rows of a page of a query.
+
+    Attributes:
+        items: The transformed rows of the page, a list or a DataFrame.
+        total (int): Number of rows matching the query, on every page.
+        next_cursor (str): Cursor of the next page, None on the last page.
+    """
+
+    __slots__ = ("items", "total", "next_cursor")
+
+    def __init__(self, items, total, next_cursor):
+        self.items = items
+        self.total = total
+        self.next_cursor = next_cursor
+
+    def headers(self):
+        """
+        Return the ``X-Total-Count`` and ``X-Next-Cursor`` response headers of the page.
+        """
+        headers = {"X-Total-Count": str(self.total)}
+        if self.next_cursor is not None:
+            headers["X-Next-Cursor"] = self.next_cursor
+        return headers
+
+
+class Query:
+    """
+    Lazy query over a sequence of rows, or over the rows of a DataFrame.
+
+    Each stage returns the query, so they can be chained:
+
+        page = (
+            Query(players)
+            .filter(lambda player: player["is_active"])
+            .limit(limit)
+            .page(page, page_size, cursor)
+            .execute()
+        )
+
+    Args:
+        rows (sequence): The rows to query.
+    """
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._take = lambda positions: [rows[position] for position in positions]
+        self._filters = []
+        self._key = None
+        self._limit = None
+        self._offset = 0
+        self._page_size = None
+        self._cursor = None
+        self._transforms = []
+
+    @classmethod
+    def from_frame(cls, frame):
+        """
+        Query the rows of a DataFrame.
+
+        The rows are filtered and ordered by their position, filter the frame
+        beforehand with vectorized conditions. The page is taken with ``iloc``,
+        so the transformations receive a DataFrame of the page rows.
+        """
+        query = cls(range(len(frame)))
+        query._take = lambda positions: frame.iloc[list(positions)]
+        return query
+
+    def filter(self, predicate):
+        """
+        Keep the rows for which ``predicate(row)`` is true.
+        """
+        self._filters.append(predicate)
+        return self
+
+    def order_by(self, key):
+        """
+        Order the rows by ``key(row)``, then by their position.
+        """
+        self._key = key
+        return self
+
+    def limit(self, limit):
+        """
+        Only consider the first ``limit`` matching rows, all of them if None.
+        """
+        self._limit = limit or None
+        return self
+
+    def page(self, page=None, page_size=None, cursor=None):
+        """
+        Select a page of the rows, every row when neither a page nor a cursor is given.
+
+        Args:
+            page (int, optional): Number of the page, starting at 1.
+            page_size (int, optional): Number of rows of a page.
+            cursor (str, optional): Cursor of the page, returned with the previous one.
+
+        Raises:
+            ValueError: If the cursor is malformed.
+        """
+        if cursor:
+            self._cursor = decode_cursor(cursor)
+            self._page_size = page_size
+        elif page:
+            self._offset = (page - 1) * (page_size or 0)
+            self._page_size = page_size
+        return self
+
+    def transform(self, func):
+        """
+        Transform the rows of the page with ``func(rows)``, after paging.
+        """
+        self._transforms.append(func)
+        return self
+
+    def execute(self):
+        """
+        Run the query and return its ``Page``.
+        """
+        key = self._key
+        filters = self._filters
+        counts = {"total": 0, "before": 0}
+
+        def matching():
+            for position, row in enumerate(self._rows):
+                if all(predicate(row) for predicate in filters):
+                    counts["total"] += 1
+                    yield (key(row) if key else None, position), position
+
+        def after_cursor(rows):
+            for order, position in rows:
+                try:
+                    before = order <= self._cursor
+                except TypeError:
+                    raise ValueError("Invalid cursor: not a cursor of this query")
+                if before:
+                    counts["before"] += 1
+                    continue
+                yield order, position
+
+        rows = matching()
+        if self._cursor is not None:
+            if key is None:
+                self._cursor = (None, self._cursor[1])
+            rows = after_cursor(rows)
+
+        # One more row than the page tells whether there is a next one
+        size = None if self._page_size is None else self._offset + self._page_size + 1
+        if key is None:
+            selected = list(itertools.islice(rows, size))
+            for _ in rows:
+                pass
+        elif size is None:
+            selected = sorted(rows, key=itemgetter(0))
+        else:
+            selected = heapq.nsmallest(size, rows, key=itemgetter(0))
+
+        total = counts["total"]
+        if self._limit is not None:
+            total = min(total, self._limit)
+            selected = selected[: max(0, self._limit - counts["before"])]
+
+        end = None if self._page_size is None else self._offset + self._page_size
+        page = selected[self._offset : end]
+        next_cursor = None
+        if end is not None and len(selected) > end and page:
+            next_cursor = encode_cursor(page[-1][0])
+
+        items = self._take([position for _, position in page])
+        if self._transforms:
+            with span("transform"):
+                for func in self._transforms:
+                    items = func(items)
+        return Page(items, total, next_cursor)
@@ -0,0 +1,216 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+from app.utils.request_context import get_request_priority
+from app.utils.timing import record_span
+
+
+class _Waiter:
+    __slots__ = ("enqueued_at", "granted", "cancelled", "event", "future", "loop")
+
+    def __init__(self, event=None, future=None, loop=None):
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+        self.event = event
+        self.future = future
+        self.loop = loop
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class RateGovernor:
+    """
+    Process-wide admission control of the calls to an upstream API.
+
+    Calls wait in a priority queue, lower priorities first and in arrival order
+    within a priority, until a token of the bucket and a concurrency slot are free.
+    The bucket refills at ``rate`` tokens per second up to ``burst`` tokens.
+
+    The concurrency limit adapts to upstream (AIMD): it grows by one slot per
+    window of successful calls and is halved when a call is throttled (429), fails
+    or is slower than ``latency_target``. A throttled call also empties the bucket.
+
+    Threads wait with ``acquire`` and coroutines with ``acquire_async``. Both
+    return the start time of the call, to pass to ``release`` once it is done.
+
+    Args:
+        rate (float): Tokens added to the bucket per second.
+        burst (int): Capacity of the bucket.
+        min_concurrency (int): Lowest concurrency limit.
+        max_concurrency (int): Highest concurrency limit.
+        latency_target (float): Seconds above which a call counts as congested.
+    """
+
+    def __init__(self, rate, burst, min_concurrency, max_concurrency, latency_target):
+        self.rate = rate
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.limit = float(max(min_concurrency, max_concurrency // 2))
+        self.in_flight = 0
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._last_decrease = 0.0
+        self._queue = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.throttled = 0
+        self.congested = 0
+        self.max_queue_depth = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def acquire(self, priority=None):
+        """
+        Block the calling thread until the call may start.
+        """
+        waiter = self._enqueue(priority, _Waiter(event=threading.Event()))
+        while True:
+            with self._lock:
+                delay = self._dispatch()
+                if waiter.granted:
+                    return self._granted(waiter)
+            waiter.event.wait(delay)
+
+    async def acquire_async(self, priority=None):
+        """
+        Wait until the call may start without blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = self._enqueue(
+            priority, _Waiter(future=loop.create_future(), loop=loop)
+        )
+        try:
+            while True:
+                with self._lock:
+                    delay = self._dispatch()
+                    if waiter.granted:
+                        return self._granted(waiter)
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), delay)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self.in_flight -= 1
+                    self._dispatch()
+                else:
+                    waiter.cancelled = True
+            raise
+
+    def release(self, started_at, status_code=None):
+        """
+        Free the slot of a call and adapt the concurrency limit to its outcome.
+
+        Args:
+            started_at (float): The value returned by ``acquire``.
+            status_code (int, optional): The upstream status, None if the call raised.
+        """
+        now = time.monotonic()
+        throttled = status_code == 429
+        failed = status_code is None or status_code >= 500
+        slow = now - started_at > self.latency_target
+
+        with self._lock:
+            self.in_flight -= 1
+
+            if throttled or failed or slow:
+                self.congested += 1
+                if throttled:
+                    self.throttled += 1
+                    self._tokens = 0.0
+                # Calls started before the last decrease already saw the reduced limit
+                if started_at > self._last_decrease:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+            self._dispatch()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": sum(
+                    1 for _, _, waiter in self._queue if not waiter.cancelled
+                ),
+                "max_queue_depth": self.max_queue_depth,
+                "in_flight": self.in_flight,
+                "concurrency_limit": round(self.limit, 2),
+                "tokens": round(self._tokens, 2),
+                "granted": self.granted,
+                "throttled": self.throttled,
+                "congested": self.congested,
+                "wait_seconds_total": round(self.wait_seconds_total, 4),
+                "wait_seconds_max": round(self.wait_seconds_max, 4),
+                "wait_seconds_avg": (
+                    round(self.wait_seconds_total / self.granted, 4) if self.granted else 0.0
+                ),
+            }
+
+    def _granted(self, waiter):
+        now = time.monotonic()
+        record_span("upstream-queue", now - waiter.enqueued_at)
+        return now
+
+    def _enqueue(self, priority, waiter):
+        if priority is None:
+            priority = get_request_priority()
+
+        with self._lock:
+            heapq.heappush(self._queue, (priority, next(self._sequence), waiter))
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        return waiter
+
+    def _dispatch(self):
+        """
+        Grant the waiters at the head of the queue while tokens and slots are free.
+
+        Must be called with the lock held.
+
+        Returns:
+            float: Seconds until the next token if the head waits for one, else None.
+        """
+        now = time.monotonic()
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._refilled_at) * self.rate
+        )
+        self._refilled_at = now
+
+        while self._queue:
+            waiter = self._queue[0][2]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            if self.in_flight >= int(self.limit):
+                return None
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+
+            heapq.heappop(self._queue)
+            self._tokens -= 1
+            self.in_flight += 1
+            self.granted += 1
+            wait = now - waiter.enqueued_at
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+            waiter.granted = True
+            waiter.wake()
+
+        return None
@@ -0,0 +1,79 @@
+import contextlib
+import contextvars
+
+# Priorities of the upstream calls, lower values are served first. Work started
+# outside of a request (ingestion, warming...) is background work.
+INTERACTIVE = 0
+BACKGROUND = 1
+
+_request_memo = contextvars.ContextVar("request_memo", default=None)
+_request_priority = contextvars.ContextVar("request_priority", default=BACKGROUND)
+_request_stale = contextvars.ContextVar("request_stale", default=None)
+
+
+@contextlib.contextmanager
+def request_scope():
+    """
+    Open a request scope in which identical upstream calls are memoized.
+
+    Scopes are bound to the current context, so they follow the request into the
+    threadpool as long as the context is copied (see ``run_in_context``). The
+    upstream calls made in a scope have the interactive priority.
+    """
+    token = _request_memo.set({})
+    priority_token = _request_priority.set(INTERACTIVE)
+    stale_token = _request_stale.set([])
+    try:
+        yield
+    finally:
+        _request_stale.reset(stale_token)
+        _request_priority.reset(priority_token)
+        _request_memo.reset(token)
+
+
+def get_request_memo():
+    """
+    Return the memo of the current request scope, or None outside of a request.
+    """
+    return _request_memo.get()
+
+
+def mark_stale(endpoint, stored_at):
+    """
+    Record that the current request is served a stale value of an upstream endpoint.
+
+    Args:
+        endpoint (str): The upstream endpoint.
+        stored_at (float): The time the stale value was fetched at.
+    """
+    stale = _request_stale.get()
+    if stale is not None:
+        stale.append((endpoint, stored_at))
+
+
+def get_stale_values():
+    """
+    Return the endpoints and fetch times of the stale values served to the current request.
+    """
+    return _request_stale.get() or []
+
+
+def get_request_priority():
+    """
+    Return the priority of the upstream calls of the current context.
+    """
+    return _request_priority.get()
+
+
+def run_in_context(func):
+    """
+    Wrap ``func`` so it runs in a copy of the caller's context.
+
+    Use it when submitting work to an executor, which does not propagate contextvars.
+    """
+    context = contextvars.copy_context()
+
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return wrapper
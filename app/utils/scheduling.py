@@ -0,0 +1,27 @@
+import asyncio
+import logging
+import random
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(func, interval, jitter=0, delay=0):
+    """
+    Run a blocking function in a worker thread every ``interval`` seconds.
+
+    Errors are logged and do not stop the schedule. Cancel the task to stop it.
+
+    Args:
+        func (callable): The function to run.
+        interval (float): Seconds between the end of a run and the start of the next.
+        jitter (float): Maximum random number of seconds added to each interval.
+        delay (float): Seconds to wait before the first run.
+    """
+    await asyncio.sleep(delay)
+    while True:
+        try:
+            await asyncio.to_thread(func)
+        except Exception as e:
+            logger.exception("Error running %s: %s", func.__name__, e)
+
+        await asyncio.sleep(interval + random.uniform(0, jitter))
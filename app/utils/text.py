@@ -0,0 +1,16 @@
+import re
+import unicodedata
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """
+    Lowercase a text and strip its accents, e.g. "Dončić" -> "doncic".
+    """
+    normalized = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in normalized if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str) -> list:
+    return _TOKEN_PATTERN.findall(fold(text))
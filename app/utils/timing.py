@@ -0,0 +1,78 @@
+import contextlib
+import contextvars
+import threading
+import time
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Timings:
+    """
+    Named spans of a request, the durations of the spans sharing a name are summed.
+
+    Spans are recorded from the event loop and from the threads serving the request,
+    so the sum of a span may exceed the duration of the request when its calls
+    run in parallel (e.g. the per-season fan-outs).
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._spans = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, duration):
+        with self._lock:
+            total, count = self._spans.get(name, (0.0, 0))
+            self._spans[name] = (total + duration, count + 1)
+
+    def server_timing(self):
+        """
+        Return the value of the ``Server-Timing`` header, durations in milliseconds.
+        """
+        with self._lock:
+            spans = list(self._spans.items())
+
+        metrics = [
+            f'{name};dur={total * 1000:.1f};desc="{count} calls"'
+            if count > 1
+            else f"{name};dur={total * 1000:.1f}"
+            for name, (total, count) in spans
+        ]
+        metrics.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+@contextlib.contextmanager
+def timing_scope():
+    """
+    Collect the spans recorded in the current context into a new ``Timings``.
+    """
+    timings = Timings()
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def record_span(name, duration):
+    """
+    Add ``duration`` seconds to the span ``name`` of the current request, if any.
+    """
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(name, duration)
+
+
+@contextlib.contextmanager
+def span(name):
+    """
+    Time the body of the ``with`` block as the span ``name`` of the current request.
+
+    Also usable as a decorator, timing each call of the decorated function.
+    """
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started_at)
@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class CacheEntry:
+    __slots__ = ("value", "size", "stored_at", "expires_at")
+
+    def __init__(self, value, size, stored_at, expires_at):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+
+    def is_fresh(self, now=None):
+        return (now or time.time()) < self.expires_at
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache with a time to live per entry and LRU eviction.
+
+    The cache is bounded both by the number of entries and by the sum of their
+    sizes, as reported by the ``size_of`` callable. When either limit is exceeded
+    the least recently used entries are evicted first.
+
+    Expired entries are kept until they are evicted or replaced, so that
+    ``get_stale`` can still serve them when a fresh value can't be obtained.
+
+    Args:
+        max_entries (int): Maximum number of entries kept in the cache.
+        max_bytes (int): Maximum total size of the entries kept in the cache.
+        size_of (callable, optional): Function returning the size of a value. Defaults to 1 per entry.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=None, size_of=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_of = size_of or (lambda value: 1)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_hits = 0
+
+    def get(self, key):
+        """
+        Return the cached value for the key, or ``MISSING`` if it is absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.is_fresh():
+                self.misses += 1
+                return MISSING
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def get_stale(self, key):
+        """
+        Return the entry stored under the key even if it is expired, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.stale_hits += 1
+            return entry
+
+    def peek(self, key):
+        """
+        Return the entry stored under the key, or None, without counting a lookup.
+        """
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key, value, ttl):
+        """
+        Store the value under the key for ``ttl`` seconds.
+        """
+        if ttl <= 0:
+            return
+
+        now = time.time()
+        size = self.size_of(value)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = CacheEntry(value, size, now, now + ttl)
+            self._bytes += size
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale_hits": self.stale_hits,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self):
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,64 @@
+"""
+Micro-benchmark of the stats responses serialization.
+
+Compares the previous path (``to_dict`` + ``clean_nan`` + ``JSONResponse``) with
+``FastJSONResponse`` writing the DataFrame directly, on a payload shaped like
+``/players/stats/advanced/{player_id}?season=All`` (~60 columns x 20 seasons).
+
+Usage:
+    python -m benchmarks.bench_serialization [--rows 20] [--columns 60] [--number 500]
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+from app.utils.clean_json import clean_nan
+from app.utils.json_response import FastJSONResponse
+
+
+def make_frame(rows, columns, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(
+        rng.random((rows, columns)) * 100,
+        columns=[f"stat_{i}" for i in range(columns)],
+    )
+    df.iloc[::3, ::7] = np.nan
+    df.iloc[::5, ::11] = np.inf
+    df.insert(0, "group_value", [f"{2000 + i}-{(i + 1) % 100:02d}" for i in range(rows)])
+    df.insert(1, "gp", rng.integers(1, 82, rows))
+    return df
+
+
+def legacy_path(df):
+    records = df.to_dict(orient="records")
+    return JSONResponse(content={"player_id": 2544, "stats": clean_nan(records)}).body
+
+
+def fast_path(df):
+    return FastJSONResponse(content={"player_id": 2544, "stats": df}).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--columns", type=int, default=60)
+    parser.add_argument("--number", type=int, default=500)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, args.columns)
+
+    results = {}
+    for name, func in (("legacy", legacy_path), ("fast", fast_path)):
+        seconds = min(timeit.repeat(lambda: func(df), number=args.number, repeat=5))
+        results[name] = seconds / args.number * 1e6
+        print(f"{name:>8}: {results[name]:9.1f} us/response ({len(func(df))} bytes)")
+
+    print(f" speedup: {results['legacy'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""
+Local stand-in for stats.nba.com and the news websites, for the benchmarks.
+
+Serves the stats.nba.com endpoints used by the API under ``/stats/<endpoint>`` and
+the pages of ``WEBSITES`` under ``/<host>/<path>``, so the API can be pointed at
+it with ``NBA_STATS_BASE_URL=http://<address>/stats`` and
+``SCRAPER_BASE_URL=http://<address>``.
+
+Responses recorded with ``benchmarks.record_fixtures`` are replayed from
+``benchmarks/data``. The stats endpoints without a recording get a synthetic
+response, generated from the datasets nba_api expects and deterministic for a
+given endpoint and set of parameters.
+
+Every response can be delayed (``--latency`` and ``--jitter`` seconds) and
+replaced by an error (``--error-rate`` of the requests get ``--error-status``).
+
+Usage:
+    python -m benchmarks.fake_upstream [--port 8001] [--latency 0.05] [--jitter 0.02]
+        [--error-rate 0] [--error-status 503]
+"""
+
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import random
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from nba_api.stats.endpoints import (
+    commonplayerinfo,
+    commonteamroster,
+    playerawards,
+    playercareerstats,
+    playerdashboardbyyearoveryear,
+)
+from nba_api.stats.library.parameters import Season
+from nba_api.stats.static import players, teams
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+ENDPOINTS = {
+    endpoint_class.endpoint: endpoint_class
+    for endpoint_class in (
+        playercareerstats.PlayerCareerStats,
+        commonplayerinfo.CommonPlayerInfo,
+        playerawards.PlayerAwards,
+        playerdashboardbyyearoveryear.PlayerDashboardByYearOverYear,
+        commonteamroster.CommonTeamRoster,
+    )
+}
+
+AWARDS = (
+    "NBA All-Star",
+    "All-NBA",
+    "All-Defensive Team",
+    "NBA Player of the Week",
+    "NBA Player of the Month",
+    "Olympic Gold Medal",
+    "NBA Most Valuable Player",
+)
+
+
+def latest_season_start():
+    return int(Season.current_season[:4])
+
+
+def season_name(start):
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def stats_fixture_path(endpoint):
+    return os.path.join(DATA_DIR, "stats", f"{endpoint}.json")
+
+
+def page_fixture_path(host, path):
+    slug = "_".join(part for part in path.split("/") if part)
+    return os.path.join(
+        DATA_DIR, "pages", f"{host}_{slug}.html" if slug else f"{host}.html"
+    )
+
+
+def _rng(endpoint, params):
+    digest = hashlib.sha256(f"{endpoint}?{sorted(params.items())}".encode()).digest()
+    return np.random.default_rng(int.from_bytes(digest[:8], "little"))
+
+
+def _box_score(rng, games, minutes_per_game):
+    """
+    Return consistent totals of ``games`` games of a player.
+    """
+    minutes = games * minutes_per_game
+    fga = rng.poisson(minutes * 0.4)
+    fg3a = rng.binomial(fga, rng.uniform(0.1, 0.5))
+    fg3m = rng.binomial(fg3a, rng.uniform(0.25, 0.42))
+    fg2m = rng.binomial(fga - fg3a, rng.uniform(0.42, 0.6))
+    fta = rng.poisson(minutes * 0.1)
+    ftm = rng.binomial(fta, rng.uniform(0.6, 0.9))
+    oreb = rng.poisson(minutes * 0.04)
+    dreb = rng.poisson(minutes * 0.13)
+    stats = {
+        "GP": games,
+        "GS": int(rng.integers(0, games + 1)),
+        "MIN": round(float(minutes), 1),
+        "FGM": fg2m + fg3m,
+        "FGA": fga,
+        "FG3M": fg3m,
+        "FG3A": fg3a,
+        "FTM": ftm,
+        "FTA": fta,
+        "OREB": oreb,
+        "DREB": dreb,
+        "REB": oreb + dreb,
+        "AST": rng.poisson(minutes * 0.1),
+        "STL": rng.poisson(minutes * 0.03),
+        "BLK": rng.poisson(minutes * 0.02),
+        "BLKA": rng.poisson(minutes * 0.02),
+        "TOV": rng.poisson(minutes * 0.05),
+        "PF": rng.poisson(minutes * 0.08),
+        "PFD": rng.poisson(minutes * 0.08),
+        "PTS": 2 * fg2m + 3 * fg3m + ftm,
+        "PLUS_MINUS": int(rng.integers(-300, 300)),
+        "DD2": int(rng.integers(0, games // 3 + 1)),
+        "TD3": int(rng.integers(0, games // 20 + 1)),
+    }
+    for made, attempted in (("FGM", "FGA"), ("FG3M", "FG3A"), ("FTM", "FTA")):
+        pct = f"{made[:-1]}_PCT"
+        stats[pct] = (
+            round(stats[made] / stats[attempted], 3) if stats[attempted] else 0.0
+        )
+    stats["NBA_FANTASY_PTS"] = round(
+        stats["PTS"]
+        + 1.2 * stats["REB"]
+        + 1.5 * stats["AST"]
+        + 3 * (stats["STL"] + stats["BLK"])
+        - stats["TOV"],
+        1,
+    )
+    return {
+        name: value.item() if hasattr(value, "item") else value
+        for name, value in stats.items()
+    }
+
+
+def _row(headers, values, rng):
+    """
+    Return the row of ``headers``, with ``values`` and filler values for the others.
+    """
+    row = []
+    for header in headers:
+        if header in values:
+            row.append(values[header])
+        elif header.endswith("_RANK") or header.startswith("RANK_"):
+            row.append(int(rng.integers(1, 500)))
+        elif header.endswith("_ID"):
+            row.append(0)
+        else:
+            row.append(None)
+    return row
+
+
+def _result_sets(endpoint_class, rows):
+    return {
+        "resource": endpoint_class.endpoint,
+        "parameters": {},
+        "resultSets": [
+            {"name": name, "headers": headers, "rowSet": rows.get(name, [])}
+            for name, headers in endpoint_class.expected_data.items()
+        ],
+    }
+
+
+def _career_stats(params, rng):
+    player_id = int(params.get("PlayerID", 0))
+    player = players.find_player_by_id(player_id) or {"is_active": True}
+    all_teams = teams.get_teams()
+
+    last = (
+        latest_season_start()
+        if player["is_active"]
+        else latest_season_start() - int(rng.integers(1, 30))
+    )
+    first = last - int(rng.integers(0, 18))
+    expected = playercareerstats.PlayerCareerStats.expected_data
+    rows = {name: [] for name in expected}
+
+    for season_type, playoffs in (("RegularSeason", False), ("PostSeason", True)):
+        totals = {}
+        team = all_teams[int(rng.integers(len(all_teams)))]
+        for start in range(first, last + 1):
+            if playoffs and rng.random() < 0.5:
+                continue
+            if rng.random() < 0.1:
+                team = all_teams[int(rng.integers(len(all_teams)))]
+            games = int(rng.integers(1, 17 if playoffs else 83))
+            stats = _box_score(rng, games, float(rng.uniform(5, 38)))
+            for name, value in stats.items():
+                totals[name] = totals.get(name, 0) + value
+            values = {
+                **stats,
+                "PLAYER_ID": player_id,
+                "SEASON_ID": season_name(start),
+                "LEAGUE_ID": "00",
+                "TEAM_ID": team["id"],
+                "TEAM_ABBREVIATION": team["abbreviation"],
+                "PLAYER_AGE": 20 + start - first,
+            }
+            rows[f"SeasonTotals{season_type}"].append(
+                _row(expected[f"SeasonTotals{season_type}"], values, rng)
+            )
+            rows[f"SeasonRankings{season_type}"].append(
+                _row(expected[f"SeasonRankings{season_type}"], values, rng)
+            )
+
+        if totals:
+            values = {**totals, "PLAYER_ID": player_id, "LEAGUE_ID": "00", "Team_ID": 0}
+            for made, attempted in (("FGM", "FGA"), ("FG3M", "FG3A"), ("FTM", "FTA")):
+                values[f"{made[:-1]}_PCT"] = (
+                    round(totals[made] / totals[attempted], 3)
+                    if totals[attempted]
+                    else 0.0
+                )
+            rows[f"CareerTotals{season_type}"].append(
+                _row(expected[f"CareerTotals{season_type}"], values, rng)
+            )
+
+    return _result_sets(playercareerstats.PlayerCareerStats, rows)
+
+
+def _dashboard(params, rng):
+    endpoint_class = playerdashboardbyyearoveryear.PlayerDashboardByYearOverYear
+    expected = endpoint_class.expected_data
+    team = teams.get_teams()[int(rng.integers(30))]
+    season = params.get("Season") or Season.current_season
+    values = {
+        **_box_score(rng, int(rng.integers(1, 83)), float(rng.uniform(5, 38))),
+        "TEAM_ID": team["id"],
+        "TEAM_ABBREVIATION": team["abbreviation"],
+        "MAX_GAME_DATE": f"{season[:4]}-04-14T00:00:00",
+        "W": 0,
+        "L": 0,
+        "W_PCT": 0.5,
+        "CFID": 0,
+        "CFPARAMS": season,
+    }
+    return _result_sets(
+        endpoint_class,
+        {
+            "OverallPlayerDashboard": [
+                _row(
+                    expected["OverallPlayerDashboard"],
+                    {**values, "GROUP_SET": "Overall", "GROUP_VALUE": season},
+                    rng,
+                )
+            ],
+            "ByYearPlayerDashboard": [
+                _row(
+                    expected["ByYearPlayerDashboard"],
+                    {**values, "GROUP_SET": "By Year", "GROUP_VALUE": season},
+                    rng,
+                )
+            ],
+        },
+    )
+
+
+def _player_info(params, rng):
+    player_id = int(params.get("PlayerID", 0))
+    player = players.find_player_by_id(player_id)
+    if player is None:
+        return _result_sets(commonplayerinfo.CommonPlayerInfo, {})
+
+    team = teams.get_teams()[int(rng.integers(30))]
+    expected = commonplayerinfo.CommonPlayerInfo.expected_data
+    values = {
+        "PERSON_ID": player_id,
+        "PLAYER_ID": player_id,
+        "FIRST_NAME": player["first_name"],
+        "LAST_NAME": player["last_name"],
+        "DISPLAY_FIRST_LAST": player["full_name"],
+        "PLAYER_NAME": player["full_name"],
+        "DISPLAY_LAST_COMMA_FIRST": f"{player['last_name']}, {player['first_name']}",
+        "PLAYER_SLUG": player["full_name"].lower().replace(" ", "-"),
+        "BIRTHDATE": "1995-01-01T00:00:00",
+        "COUNTRY": "USA",
+        "HEIGHT": f"6-{int(rng.integers(0, 12))}",
+        "WEIGHT": str(int(rng.integers(180, 260))),
+        "SEASON_EXP": int(rng.integers(0, 20)),
+        "JERSEY": str(int(rng.integers(0, 100))),
+        "POSITION": "Forward",
+        "ROSTERSTATUS": "Active" if player["is_active"] else "Inactive",
+        "TEAM_ID": team["id"],
+        "TEAM_NAME": team["nickname"],
+        "TEAM_ABBREVIATION": team["abbreviation"],
+        "TEAM_CITY": team["city"],
+        "TimeFrame": Season.current_season,
+        "PTS": round(float(rng.uniform(0, 30)), 1),
+        "AST": round(float(rng.uniform(0, 10)), 1),
+        "REB": round(float(rng.uniform(0, 12)), 1),
+        "PIE": round(float(rng.uniform(0, 0.2)), 3),
+    }
+    return _result_sets(
+        commonplayerinfo.CommonPlayerInfo,
+        {
+            name: [_row(headers, values, rng)]
+            for name, headers in expected.items()
+            if name != "AvailableSeasons"
+        },
+    )
+
+
+def _awards(params, rng):
+    player_id = int(params.get("PlayerID", 0))
+    headers = playerawards.PlayerAwards.expected_data["PlayerAwards"]
+    rows = [
+        _row(
+            headers,
+            {
+                "PERSON_ID": player_id,
+                "DESCRIPTION": AWARDS[int(rng.integers(len(AWARDS)))],
+                "SEASON": season_name(int(rng.integers(2000, latest_season_start()))),
+                "TYPE": "Award",
+            },
+            rng,
+        )
+        for _ in range(int(rng.integers(1, 25)))
+    ]
+    return _result_sets(playerawards.PlayerAwards, {"PlayerAwards": rows})
+
+
+def _team_roster(params, rng):
+    team_id = int(params.get("TeamID", 0))
+    expected = commonteamroster.CommonTeamRoster.expected_data
+    active = players.get_active_players()
+    roster = rng.choice(len(active), size=15, replace=False)
+    rows = [
+        _row(
+            expected["CommonTeamRoster"],
+            {
+                "TeamID": team_id,
+                "SEASON": Season.current_season[:4],
+                "LeagueID": "00",
+                "PLAYER": active[index]["full_name"],
+                "NUM": str(number),
+                "POSITION": "G",
+                "AGE": int(rng.integers(19, 40)),
+                "EXP": str(int(rng.integers(0, 20))),
+                "PLAYER_ID": active[index]["id"],
+            },
+            rng,
+        )
+        for number, index in enumerate(roster)
+    ]
+    return _result_sets(commonteamroster.CommonTeamRoster, {"CommonTeamRoster": rows})
+
+
+GENERATORS = {
+    "playercareerstats": _career_stats,
+    "playerdashboardbyyearoveryear": _dashboard,
+    "commonplayerinfo": _player_info,
+    "playerawards": _awards,
+    "commonteamroster": _team_roster,
+}
+
+
+def synthetic_response(endpoint, params):
+    """
+    Return a synthetic response of a stats.nba.com endpoint as a dict.
+    """
+    return GENERATORS[endpoint](params, _rng(endpoint, params))
+
+
+@functools.lru_cache(maxsize=65536)
+def stats_body(endpoint, params):
+    path = stats_fixture_path(endpoint)
+    if os.path.exists(path):
+        with open(path, "rb") as file:
+            return file.read()
+    return json.dumps(synthetic_response(endpoint, dict(params))).encode()
+
+
+@functools.lru_cache(maxsize=None)
+def page_body(host, path):
+    fixture = page_fixture_path(host, path)
+    if not os.path.exists(fixture):
+        return None
+    with open(fixture, "rb") as file:
+        return file.read()
+
+
+def create_app(latency=0.0, jitter=0.0, error_rate=0.0, error_status=503):
+    app = FastAPI(title="Fake upstream")
+    app.state.requests = 0
+
+    async def delay():
+        app.state.requests += 1
+        seconds = max(0.0, random.gauss(latency, jitter)) if jitter else latency
+        if seconds:
+            await asyncio.sleep(seconds)
+        return error_rate and random.random() < error_rate
+
+    @app.get("/stats/{endpoint}")
+    async def stats(endpoint: str, request: Request):
+        if endpoint not in ENDPOINTS:
+            return Response(status_code=404)
+        if await delay():
+            return Response(status_code=error_status)
+        params = tuple(sorted(request.query_params.items()))
+        return Response(stats_body(endpoint, params), media_type="application/json")
+
+    @app.get("/{host}/{path:path}")
+    async def page(host: str, path: str):
+        body = page_body(host, path)
+        if body is None:
+            return Response(status_code=404)
+        if await delay():
+            return Response(status_code=error_status)
+        return Response(body, media_type="text/html; charset=utf-8")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="mean delay in seconds"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.02, help="standard deviation of the delay"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="fraction of failed responses"
+    )
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.jitter, args.error_rate, args.error_status)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
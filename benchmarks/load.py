@@ -0,0 +1,417 @@
+"""
+Load scenarios of the /v1 routes, run against the API backed by the fake upstream.
+
+Starts the fake upstream and the API (with uvicorn, pointed at the fake upstream
+and at a stats warehouse built from its synthetic careers), then runs every
+scenario in turn: ``--concurrency`` clients send requests back to back for
+``--duration`` seconds, after ``--warmup`` seconds whose requests are not counted.
+Each scenario reports its throughput, latency percentiles and errors (responses
+with a status of 400 or more).
+
+The results can be saved with ``--output`` and compared with a previous run with
+``--baseline``: the run fails when a scenario's throughput drops, or its p95
+latency grows, by more than ``--max-regression``.
+
+Use ``--target`` to load an API that is already running instead.
+
+Usage:
+    python -m benchmarks.load [--scenarios articles,player-career] [--concurrency 16]
+        [--duration 10] [--warmup 2] [--latency 0.05] [--error-rate 0]
+        [--output results.json] [--baseline baseline.json] [--max-regression 0.1]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+from nba_api.stats.endpoints import playercareerstats
+from nba_api.stats.library.parameters import Season
+from nba_api.stats.static import players, teams
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Settings of the API under test: no saved state between runs, no background
+# refreshes, and a rate limit high enough to measure the API rather than the governor
+API_ENV = {
+    "DISK_CACHE_DIR": "",
+    "POPULARITY_PATH": "",
+    "ROSTERS_REFRESH_INTERVAL": "0",
+    "WAREHOUSE_REFRESH_INTERVAL": "0",
+    "STATS_RATE_LIMIT": "100000",
+    "STATS_RATE_BURST": "100000",
+    "LOG_LEVEL": "WARNING",
+}
+
+
+class Pools:
+    """
+    Values the scenarios draw their parameters from.
+    """
+
+    def __init__(self, player_count, seed=0):
+        active = sorted(players.get_active_players(), key=lambda player: player["id"])
+        self.random = random.Random(seed)
+        self.players = self.random.sample(active, min(player_count, len(active)))
+        self.teams = teams.get_teams()
+        self.season = Season.current_season
+
+    def player(self):
+        return self.random.choice(self.players)
+
+    def player_id(self):
+        return self.player()["id"]
+
+    def player_ids(self, count):
+        return [player["id"] for player in self.random.sample(self.players, count)]
+
+
+# name: (method, function drawing the path, query parameters and JSON body of a request)
+SCENARIOS = {
+    "articles": ("GET", lambda p: ("/v1/articles", {"page": 1}, None)),
+    "articles-search": (
+        "GET",
+        lambda p: (
+            "/v1/articles",
+            {"q": p.random.choice(["lakers", "curry", "game 7"])},
+            None,
+        ),
+    ),
+    "players": (
+        "GET",
+        lambda p: ("/v1/players", {"page": p.random.randint(1, 50)}, None),
+    ),
+    "players-search": (
+        "GET",
+        lambda p: ("/v1/players/search", {"q": p.player()["last_name"][:3]}, None),
+    ),
+    "player-career": (
+        "GET",
+        lambda p: (
+            f"/v1/players/stats/career/{p.player_id()}",
+            {"season": "All"},
+            None,
+        ),
+    ),
+    "player-info": (
+        "GET",
+        lambda p: ("/v1/players/player/info", {"player_id": p.player_id()}, None),
+    ),
+    "player-info-batch": (
+        "POST",
+        lambda p: ("/v1/players/player/info:batch", None, p.player_ids(10)),
+    ),
+    "player-awards": (
+        "GET",
+        lambda p: (
+            "/v1/players/player/awards",
+            {"player_id": p.player_id(), "detailed": True},
+            None,
+        ),
+    ),
+    "player-advanced": (
+        "GET",
+        lambda p: (
+            f"/v1/players/stats/advanced/{p.player_id()}",
+            {"season": p.random.choice(["All", "Totals", p.season])},
+            None,
+        ),
+    ),
+    "player-metrics": (
+        "GET",
+        lambda p: (f"/v1/players/stats/metrics/{p.player_id()}", None, None),
+    ),
+    "player-metrics-batch": (
+        "POST",
+        lambda p: ("/v1/players/stats/metrics:batch", None, p.player_ids(50)),
+    ),
+    "teams": ("GET", lambda p: ("/v1/teams", None, None)),
+    "team-roster": (
+        "GET",
+        lambda p: (f"/v1/teams/{p.random.choice(p.teams)['id']}/roster", None, None),
+    ),
+    "leaderboards": (
+        "GET",
+        lambda p: (
+            "/v1/leaderboards",
+            {
+                "stat": p.random.choice(["PTS", "AST", "REB", "PER", "TS_PCT"]),
+                "season": p.season,
+                "per_mode": p.random.choice(["PerGame", "Per36", "Totals"]),
+            },
+            None,
+        ),
+    ),
+}
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def build_warehouse(directory, pools):
+    """
+    Save a warehouse of the synthetic careers of the players of the pools.
+    """
+    from app.services.nba_api.async_nba_client import load_endpoint
+    from app.services.warehouse import StatsWarehouse
+    from benchmarks.fake_upstream import synthetic_response
+
+    warehouse = StatsWarehouse(directory)
+    for player in pools.players:
+        contents = json.dumps(
+            synthetic_response("playercareerstats", {"PlayerID": str(player["id"])})
+        )
+        career_stats = load_endpoint(
+            playercareerstats.PlayerCareerStats, contents, player_id=player["id"]
+        )
+        warehouse.ingest(player["id"], career_stats)
+    warehouse.save()
+
+
+def _wait_until_up(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"{url} exited with status {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start in {timeout}s")
+
+
+@contextlib.contextmanager
+def running_servers(args, pools):
+    """
+    Start the fake upstream and the API, and yield the base URL of the API.
+    """
+    if args.target:
+        yield args.target.rstrip("/")
+        return
+
+    upstream_port, api_port = _free_port(), _free_port()
+    processes = []
+    with tempfile.TemporaryDirectory() as warehouse_dir:
+        build_warehouse(warehouse_dir, pools)
+        try:
+            processes.append(
+                subprocess.Popen(
+                    [
+                        sys.executable,
+                        "-m",
+                        "benchmarks.fake_upstream",
+                        "--port",
+                        str(upstream_port),
+                        "--latency",
+                        str(args.latency),
+                        "--jitter",
+                        str(args.jitter),
+                        "--error-rate",
+                        str(args.error_rate),
+                    ],
+                    cwd=ROOT,
+                )
+            )
+            _wait_until_up(
+                f"http://127.0.0.1:{upstream_port}/stats/unknown", processes[-1]
+            )
+
+            env = {
+                **os.environ,
+                **API_ENV,
+                "NBA_STATS_BASE_URL": f"http://127.0.0.1:{upstream_port}/stats",
+                "SCRAPER_BASE_URL": f"http://127.0.0.1:{upstream_port}",
+                "WAREHOUSE_DIR": warehouse_dir,
+            }
+            processes.append(
+                subprocess.Popen(
+                    [
+                        sys.executable,
+                        "-m",
+                        "uvicorn",
+                        "app.main:app",
+                        "--port",
+                        str(api_port),
+                        "--workers",
+                        str(args.workers),
+                        "--log-level",
+                        "warning",
+                    ],
+                    cwd=ROOT,
+                    env=env,
+                )
+            )
+            _wait_until_up(f"http://127.0.0.1:{api_port}/ready", processes[-1])
+            yield f"http://127.0.0.1:{api_port}"
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                process.wait(timeout=30)
+
+
+async def _wait_for_articles(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = await client.get("/v1/articles")
+        if response.status_code == 200 and response.json():
+            return
+        await asyncio.sleep(0.2)
+
+
+async def run_scenario(client, name, pools, concurrency, duration, warmup):
+    method, make_request = SCENARIOS[name]
+    latencies = []
+    statuses = {}
+    started_at = time.monotonic()
+    measured_from = started_at + warmup
+    ends_at = measured_from + duration
+
+    async def worker():
+        while True:
+            path, params, body = make_request(pools)
+            sent_at = time.monotonic()
+            if sent_at >= ends_at:
+                return
+            try:
+                response = await client.request(method, path, params=params, json=body)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            if sent_at >= measured_from:
+                latencies.append(time.monotonic() - sent_at)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    latencies = np.array(latencies) * 1000
+    errors = sum(
+        count
+        for status, count in statuses.items()
+        if not isinstance(status, int) or status >= 400
+    )
+    p50, p95, p99 = (
+        np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0, 0, 0)
+    )
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / duration, 1),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "errors": errors,
+        "statuses": {
+            str(status): count for status, count in sorted(statuses.items(), key=str)
+        },
+    }
+
+
+async def run(args, pools, base_url):
+    limits = httpx.Limits(
+        max_connections=args.concurrency, max_keepalive_connections=args.concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=120
+    ) as client:
+        await _wait_for_articles(client)
+        results = {}
+        for name in args.scenarios:
+            results[name] = await run_scenario(
+                client, name, pools, args.concurrency, args.duration, args.warmup
+            )
+            result = results[name]
+            print(
+                f"{name:<22} {result['requests_per_second']:>9.1f} req/s"
+                f"  p50 {result['p50_ms']:>8.2f} ms  p95 {result['p95_ms']:>8.2f} ms"
+                f"  p99 {result['p99_ms']:>8.2f} ms  errors {result['errors']}",
+                flush=True,
+            )
+        return results
+
+
+def regressions(results, baseline, max_regression):
+    """
+    Return the descriptions of the scenarios slower than in the baseline.
+    """
+    found = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result["requests_per_second"] < previous["requests_per_second"] * (
+            1 - max_regression
+        ):
+            found.append(
+                f"{name}: {result['requests_per_second']} req/s, was {previous['requests_per_second']}"
+            )
+        if result["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            found.append(f"{name}: p95 {result['p95_ms']} ms, was {previous['p95_ms']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scenarios", default=",".join(SCENARIOS), help="comma separated names"
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--duration", type=float, default=10, help="measured seconds per scenario"
+    )
+    parser.add_argument(
+        "--warmup", type=float, default=2, help="unmeasured seconds per scenario"
+    )
+    parser.add_argument(
+        "--players", type=int, default=200, help="number of distinct players requested"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="uvicorn workers of the API"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="mean delay of the fake upstream"
+    )
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--target", help="base URL of an API already running")
+    parser.add_argument("--output", help="file the results are written to, as JSON")
+    parser.add_argument("--baseline", help="results of a previous run to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.1)
+    args = parser.parse_args()
+
+    args.scenarios = [name for name in args.scenarios.split(",") if name]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    pools = Pools(args.players)
+    with running_servers(args, pools) as base_url:
+        results = asyncio.run(run(args, pools, base_url))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            found = regressions(results, json.load(file), args.max_regression)
+        for regression in found:
+            print(f"REGRESSION {regression}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Record the responses replayed by the fake upstream from the real upstreams.
+
+Downloads the pages of ``WEBSITES`` and one response of each stats.nba.com
+endpoint (for the given player and team) into ``benchmarks/data``. The fake
+upstream replays a recorded stats response for every set of parameters of its
+endpoint, and synthesizes the responses of the endpoints left unrecorded.
+
+Usage:
+    python -m benchmarks.record_fixtures [--pages] [--stats] [--player-id 2544]
+        [--team-id 1610612747]
+"""
+
+import argparse
+import os
+from urllib.parse import urlsplit
+
+import httpx
+from nba_api.stats.endpoints import (
+    commonplayerinfo,
+    commonteamroster,
+    playerawards,
+    playercareerstats,
+    playerdashboardbyyearoveryear,
+)
+from nba_api.stats.library.parameters import Season
+
+from app.config.nba_api_config import configure_nba_api
+from app.services.scrapper import HEADERS, WEBSITES
+from benchmarks.fake_upstream import page_fixture_path, stats_fixture_path
+
+
+def _save(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(content)
+    print(f"recorded {path} ({len(content)} bytes)")
+
+
+def record_pages():
+    for address in dict.fromkeys(website["address"] for website in WEBSITES):
+        response = httpx.get(address, headers=HEADERS, timeout=30, follow_redirects=True)
+        response.raise_for_status()
+        parts = urlsplit(address)
+        _save(page_fixture_path(parts.netloc, parts.path), response.content)
+
+
+def record_stats(player_id, team_id):
+    configure_nba_api()
+    endpoints = (
+        playercareerstats.PlayerCareerStats(player_id=player_id, timeout=70),
+        commonplayerinfo.CommonPlayerInfo(player_id=player_id, timeout=70),
+        playerawards.PlayerAwards(player_id=player_id, timeout=70),
+        playerdashboardbyyearoveryear.PlayerDashboardByYearOverYear(
+            player_id=player_id, season=Season.current_season, timeout=70
+        ),
+        commonteamroster.CommonTeamRoster(team_id=team_id, timeout=70),
+    )
+    for endpoint in endpoints:
+        _save(
+            stats_fixture_path(endpoint.endpoint),
+            endpoint.nba_response.get_response().encode(),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", action="store_true", help="record the news pages")
+    parser.add_argument(
+        "--stats", action="store_true", help="record the stats responses"
+    )
+    parser.add_argument("--player-id", type=int, default=2544)
+    parser.add_argument("--team-id", type=int, default=1610612747)
+    args = parser.parse_args()
+
+    if args.pages or not args.stats:
+        record_pages()
+    if args.stats or not args.pages:
+        record_stats(args.player_id, args.team_id)
+
+
+if __name__ == "__main__":
+    main()
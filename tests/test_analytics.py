@@ -0,0 +1,36 @@
+import numpy as np
+
+from app.services.analytics import compute_metrics
+from app.services.warehouse import STAT_COLUMNS, SeasonTable
+
+
+def _table(team_ids, teams):
+    stats = np.full((len(team_ids), len(STAT_COLUMNS)), 10.0)
+    team_stats = np.full((len(teams), len(STAT_COLUMNS)), 100.0)
+    return SeasonTable(
+        season="2023-24",
+        season_type="Regular Season",
+        player_ids=np.arange(1, len(team_ids) + 1),
+        team_ids=np.array(team_ids, dtype=np.int64),
+        stats=stats,
+        teams=np.array(teams, dtype=np.int64),
+        team_stats=team_stats,
+        version=1,
+    )
+
+
+def test_players_without_team_totals_get_no_team_metrics():
+    # 5 sorts between the teams, 99 after the last one: neither has totals
+    metrics = compute_metrics(_table([10, 5, 99], [10, 20]))
+
+    assert np.isfinite(metrics["USG_PCT"][0])
+    assert np.isnan(metrics["USG_PCT"][1:]).all()
+    assert np.isnan(metrics["PTS_PER_100"][1:]).all()
+    assert (metrics["PTS_PER_GAME"] == 1.0).all()
+
+
+def test_season_without_team_rows():
+    metrics = compute_metrics(_table([10, 0], []))
+
+    assert np.isnan(metrics["PER"]).all()
+    assert (metrics["PTS_PER_GAME"] == 1.0).all()
@@ -0,0 +1,43 @@
+from app.services.articles_index import ArticlesIndex
+from app.services.articles_ingestion import ArticlesSnapshot
+
+
+def _snapshot(articles, version):
+    return ArticlesSnapshot(by_source={"espn": articles}, version=version)
+
+
+def _article(title, url="https://www.espn.com/story/1"):
+    return {"title": title, "url": url, "source": "espn", "image": None}
+
+
+def test_search_matches_added_articles():
+    index = ArticlesIndex()
+    index.sync(_snapshot([_article("LeBron scores 40")], 1))
+
+    assert [a["title"] for a in index.search(["lebron"])] == ["LeBron scores 40"]
+    assert index.search(["curry"]) == []
+
+
+def test_sync_reindexes_an_article_whose_content_changed():
+    index = ArticlesIndex()
+    index.sync(_snapshot([_article("LeBron scores 40")], 1))
+    index.sync(_snapshot([_article("Curry hits 10 threes")], 2))
+
+    assert index.search(["lebron"]) == []
+    assert [a["title"] for a in index.search(["curry"])] == ["Curry hits 10 threes"]
+
+
+def test_sync_drops_removed_articles():
+    index = ArticlesIndex()
+    index.sync(
+        _snapshot(
+            [
+                _article("LeBron scores 40"),
+                _article("LeBron rests", url="https://www.espn.com/story/2"),
+            ],
+            1,
+        )
+    )
+    index.sync(_snapshot([_article("LeBron rests", url="https://www.espn.com/story/2")], 2))
+
+    assert [a["title"] for a in index.search(["lebron"])] == ["LeBron rests"]
@@ -0,0 +1,44 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import articles_ingestion
+from app.services.articles_ingestion import ArticlesSnapshot, publish
+
+ORIGIN = {"Origin": "https://backcourt.example"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(articles_ingestion, "_snapshot", ArticlesSnapshot())
+    return TestClient(app)
+
+
+def test_articles_are_not_stored_before_the_first_ingestion(client):
+    response = client.get("/v1/articles", headers=ORIGIN)
+
+    assert response.status_code == 200
+    assert response.json() == []
+    assert response.headers["cache-control"] == "no-store"
+    assert "etag" not in response.headers
+
+
+def test_not_modified_responses_have_the_cors_headers(client):
+    publish(
+        {
+            "espn": [
+                {
+                    "title": "LeBron scores 40",
+                    "url": "https://www.espn.com/story/1",
+                    "source": "espn",
+                    "image": None,
+                }
+            ]
+        }
+    )
+    etag = client.get("/v1/articles", headers=ORIGIN).headers["etag"]
+
+    response = client.get("/v1/articles", headers={**ORIGIN, "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["access-control-allow-origin"] == ORIGIN["Origin"]
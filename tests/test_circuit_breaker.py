@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def _breaker(**kwargs):
+    options = dict(
+        failure_threshold=0.5,
+        min_calls=4,
+        window=60,
+        slow_call_seconds=1,
+        open_seconds=0.05,
+        half_open_calls=2,
+    )
+    return CircuitBreaker("test", **{**options, **kwargs})
+
+
+def _call(breaker, failed=False, duration=0.01):
+    breaker.before_call()
+    breaker.record(duration, failed)
+
+
+def test_opens_once_the_failure_ratio_reaches_the_threshold():
+    breaker = _breaker()
+    for failed in (False, True, False):
+        _call(breaker, failed)
+    assert breaker.state == "closed"
+
+    _call(breaker, failed=True)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_slow_calls_count_as_failures():
+    breaker = _breaker()
+    for _ in range(4):
+        _call(breaker, duration=2)
+
+    assert breaker.state == "open"
+
+
+def test_half_open_trials_close_the_breaker():
+    breaker = _breaker()
+    for _ in range(4):
+        _call(breaker, failed=True)
+    time.sleep(0.06)
+
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    # Only half_open_calls trials at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record(0.01)
+    breaker.record(0.01)
+    assert breaker.state == "closed"
+    assert breaker.stats()["calls"] == 0
+
+
+def test_failed_half_open_trial_opens_the_breaker_again():
+    breaker = _breaker()
+    for _ in range(4):
+        _call(breaker, failed=True)
+    time.sleep(0.06)
+
+    _call(breaker, failed=True)
+
+    assert breaker.state == "open"
+    assert breaker.stats()["trips"] == 2
@@ -0,0 +1,68 @@
+import importlib
+import sys
+
+from nba_api.stats.library.parameters import Season
+
+from app.config.settings import DISK_CACHE_CURRENT_TTL
+from app.services.nba_api.nba_client_service import _season_ttl
+from app.utils.disk_cache import DiskCache
+
+
+def test_payloads_round_trip_and_survive_a_reopen(tmp_path):
+    cache = DiskCache(tmp_path / "cache")
+    cache.set("final", '{"PTS": 2000}')
+    cache.set("current", '{"PTS": 500}', ttl=60)
+    cache.close()
+
+    cache = DiskCache(tmp_path / "cache")
+    assert cache.get("final") == '{"PTS": 2000}'
+    assert cache.get("current") == '{"PTS": 500}'
+    assert cache.get("missing") is None
+    assert cache.stats() == {"entries": 2, "final_entries": 1, "hits": 2, "misses": 1}
+
+
+def test_expired_payloads_are_only_served_stale(tmp_path):
+    cache = DiskCache(tmp_path)
+    cache.set("key", "old", ttl=-1)
+
+    assert cache.get("key") is None
+    payload, stored_at = cache.get_stale("key")
+    assert payload == "old"
+    assert stored_at > 0
+
+    assert cache.purge_expired() == 1
+    assert cache.get_stale("key") is None
+
+
+def test_set_replaces_the_payload_and_its_expiry(tmp_path):
+    cache = DiskCache(tmp_path)
+    cache.set("key", "current", ttl=-1)
+    cache.set("key", "final")
+
+    assert cache.get("key") == "final"
+    assert cache.purge_expired() == 0
+
+
+def test_completed_seasons_are_final():
+    current = Season.current_season
+    previous = f"{int(current[:4]) - 1}-{current[2:4]}"
+
+    assert _season_ttl({"season": previous}) is None
+    assert _season_ttl({"season": "1996-97"}) is None
+    assert _season_ttl({"season": current}) == DISK_CACHE_CURRENT_TTL
+    assert _season_ttl({}) == DISK_CACHE_CURRENT_TTL
+
+
+def test_importing_the_upstream_module_does_not_open_the_disk_cache(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setenv("DISK_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delitem(sys.modules, "app.config.settings")
+    monkeypatch.delitem(sys.modules, "app.services.nba_api.upstream")
+    upstream = importlib.import_module("app.services.nba_api.upstream")
+
+    assert not (tmp_path / "cache").exists()
+    assert upstream.get_upstream_stats()["disk_cache"] is None
+
+    assert upstream.get_disk_cache() is upstream.get_disk_cache()
+    assert (tmp_path / "cache").is_dir()
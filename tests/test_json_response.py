@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.utils.clean_json import clean_nan
+from app.utils.json_response import FastJSONResponse
+
+
+def _baseline(content):
+    return JSONResponse(content=jsonable_encoder(clean_nan(content))).body
+
+
+def _frame():
+    return pd.DataFrame(
+        {
+            "season_id": ["2022-23", "2023-24", "2024-25"],
+            "gp": [55, 71, 70],
+            "min": [1954.0, 2504.1, 2444.7],
+            "pts": [664.1, 1822.0, 1708.3],
+            "fg_pct": [0.5, 0.54, np.nan],
+            "ratio": [1 / 3, np.inf, -np.inf],
+            "team": ["LAL", "LAL", "Doncic ć"],
+        }
+    )
+
+
+def test_frames_serialize_like_the_standard_encoder():
+    df = _frame()
+
+    assert FastJSONResponse(content=df).body == _baseline(df.to_dict(orient="records"))
+
+
+def test_nested_frames_serialize_like_the_standard_encoder():
+    df = _frame()
+    content = {"player_id": 2544, "season": "All", "stats": df}
+    expected = {**content, "stats": df.to_dict(orient="records")}
+
+    assert FastJSONResponse(content=content).body == _baseline(expected)
+
+
+def test_frames_of_every_dtype_serialize_like_the_standard_encoder():
+    df = pd.DataFrame(
+        {
+            "int": np.array([1, -2], dtype=np.int32),
+            "uint": np.array([3, 4], dtype=np.uint64),
+            "bool": [True, False],
+            "float": [0.1 + 0.2, np.nan],
+            "mixed": [1.5, "x"],
+            "none": [None, "y"],
+        }
+    )
+
+    assert FastJSONResponse(content=df).body == _baseline(df.to_dict(orient="records"))
+
+
+def test_empty_frames_and_duplicated_columns():
+    df = pd.DataFrame([[1, 2]], columns=["pts", "pts"])
+
+    assert FastJSONResponse(content=df).body == b'[{"pts":2}]'
+    assert FastJSONResponse(content=df.iloc[:0]).body == b"[]"
@@ -0,0 +1,34 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_career_stats_reject_an_invalid_player_id():
+    response = client.get("/v1/players/stats/career/abc")
+
+    assert response.status_code == 400
+
+
+def test_players_pages_follow_the_next_cursor():
+    ids, cursor = [], None
+    while True:
+        params = {"page_size": 400, "limit": 450, "is_active": True}
+        params.update({"cursor": cursor} if cursor else {"page": 1})
+        response = client.get("/v1/players", params=params)
+        assert response.status_code == 200
+        ids += [player["id"] for player in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    total = int(response.headers["x-total-count"])
+    assert len(ids) == len(set(ids)) == total
+    assert total == 450
+
+
+def test_players_reject_an_invalid_cursor():
+    response = client.get("/v1/players", params={"page_size": 10, "cursor": "bad"})
+
+    assert response.status_code == 400
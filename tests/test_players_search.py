@@ -0,0 +1,103 @@
+import json
+import logging
+
+import pytest
+
+from app.services import players_search
+from app.services.players_search import (
+    PlayersSearchIndex,
+    count_lookup,
+    get_players_index,
+    load_popularity,
+    most_popular_players,
+    save_popularity,
+)
+
+PLAYERS = [
+    {"id": 2544, "full_name": "LeBron James", "is_active": True},
+    {"id": 203507, "full_name": "Giannis Antetokounmpo", "is_active": True},
+    {"id": 201142, "full_name": "Kevin Durant", "is_active": True},
+    {"id": 201939, "full_name": "Stephen Curry", "is_active": True},
+    {"id": 893, "full_name": "Michael Jordan", "is_active": False},
+]
+
+
+@pytest.fixture
+def index():
+    return PlayersSearchIndex(PLAYERS)
+
+
+def _names(players):
+    return [player["full_name"] for player in players]
+
+
+def test_search_ranks_prefix_matches_first(index):
+    assert _names(index.search("leb")) == ["LeBron James"]
+    assert _names(index.search("curry")) == ["Stephen Curry"]
+
+
+def test_search_filters_by_activity(index):
+    assert _names(index.search("jordan", is_active=True)) == []
+    assert _names(index.search("jordan", is_active=False)) == ["Michael Jordan"]
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("lebrn", "LeBron James"),
+        ("gianis", "Giannis Antetokounmpo"),
+        ("durnt", "Kevin Durant"),
+        ("antetokounpo", "Giannis Antetokounmpo"),
+        ("stephen cury", "Stephen Curry"),
+    ],
+)
+def test_search_tolerates_a_typo_in_one_word(index, query, expected):
+    assert _names(index.search(query))[:1] == [expected]
+
+
+@pytest.mark.parametrize("query", ["lebrn", "gianis", "durnt"])
+def test_search_tolerates_typos_in_the_full_players_list(query):
+    assert get_players_index().search(query)
+
+
+@pytest.fixture
+def popularity(monkeypatch):
+    monkeypatch.setattr(players_search, "player_counter", players_search.Counter())
+    monkeypatch.setattr(players_search, "_popularity_save_failed", False)
+    return players_search.player_counter
+
+
+def test_most_popular_players_are_ranked_by_lookups_of_their_id(popularity):
+    for player_id in [2544, 201939, "201939", 201939]:
+        count_lookup(player_id)
+
+    assert [player["id"] for player in most_popular_players(5)] == [201939, 2544]
+
+
+def test_popularity_survives_a_save(popularity, tmp_path):
+    path = str(tmp_path / "popularity.json")
+    count_lookup(2544)
+    save_popularity(path)
+    popularity.clear()
+
+    assert load_popularity(path)
+    assert popularity == {2544: 1}
+
+
+def test_popularity_of_older_saves_keyed_by_name_is_dropped(popularity, tmp_path):
+    path = tmp_path / "popularity.json"
+    path.write_text(json.dumps({"lebron james": 3, "2544": 2}))
+
+    assert load_popularity(str(path))
+    assert popularity == {2544: 2}
+
+
+def test_unwritable_popularity_path_warns_once(popularity, tmp_path, caplog):
+    (tmp_path / "file").write_text("")
+    path = str(tmp_path / "file" / "popularity.json")
+
+    with caplog.at_level(logging.DEBUG, logger=players_search.__name__):
+        save_popularity(path)
+        save_popularity(path)
+
+    assert [record.levelno for record in caplog.records] == [logging.WARNING, logging.DEBUG]
@@ -0,0 +1,115 @@
+import pandas as pd
+import pytest
+
+from app.utils.query import Query, decode_cursor, encode_cursor
+
+ROWS = [{"id": i, "team": "LAL" if i % 2 else "BOS"} for i in range(10)]
+
+
+def _walk(make_query, page_size):
+    # The first page is requested by number, the next ones by cursor
+    pages, cursor = [], None
+    while True:
+        page = make_query().page(1, page_size, cursor).execute()
+        pages.append(page)
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def _ids(items):
+    return [row["id"] for row in items]
+
+
+def test_every_row_without_a_page():
+    page = Query(ROWS).page(page_size=4).execute()
+
+    assert _ids(page.items) == list(range(10))
+    assert page.next_cursor is None
+
+
+def test_page_numbers():
+    page = Query(ROWS).page(page=2, page_size=4).execute()
+
+    assert _ids(page.items) == [4, 5, 6, 7]
+    assert page.total == 10
+    assert page.headers()["X-Total-Count"] == "10"
+
+
+def test_cursors_walk_every_row_once():
+    pages = _walk(lambda: Query(ROWS), page_size=4)
+
+    assert [_ids(page.items) for page in pages] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert all(page.total == 10 for page in pages)
+    assert "X-Next-Cursor" not in pages[-1].headers()
+
+
+def test_cursors_follow_the_ordering():
+    pages = _walk(lambda: Query(ROWS).order_by(lambda row: row["team"]), page_size=3)
+
+    assert [row["id"] for page in pages for row in page.items] == [
+        0, 2, 4, 6, 8, 1, 3, 5, 7, 9,
+    ]
+
+
+def test_cursor_without_ordering_resumes_at_its_position():
+    first = Query(ROWS).page(1, 4).execute()
+    remaining = [row for row in ROWS if row["id"] != 1]
+
+    page = Query(remaining).page(page_size=4, cursor=first.next_cursor).execute()
+
+    # Without an ordering key the cursor only holds the position of its row
+    assert _ids(page.items) == [5, 6, 7, 8]
+
+
+def test_limit_applies_across_the_cursor_pages():
+    pages = _walk(lambda: Query(ROWS).limit(7), page_size=3)
+
+    assert [_ids(page.items) for page in pages] == [[0, 1, 2], [3, 4, 5], [6]]
+    assert all(page.total == 7 for page in pages)
+
+
+def test_filtered_and_limited_total():
+    page = (
+        Query(ROWS)
+        .filter(lambda row: row["team"] == "LAL")
+        .limit(3)
+        .page(1, 2)
+        .execute()
+    )
+
+    assert _ids(page.items) == [1, 3]
+    assert page.total == 3
+    assert page.next_cursor is not None
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", encode_cursor(["a", "b"])])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        Query(ROWS).page(page_size=2, cursor=cursor)
+
+
+def test_cursor_of_another_ordering_is_rejected():
+    cursor = Query(ROWS).page(1, 2).execute().next_cursor
+    query = Query(ROWS).order_by(lambda row: row["team"]).page(page_size=2, cursor=cursor)
+
+    with pytest.raises(ValueError):
+        query.execute()
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor([["LAL", 3], 7])) == (("LAL", 3), 7)
+
+
+def test_frames_are_paged_and_transformed_after_paging():
+    frame = pd.DataFrame(ROWS)
+    seen = []
+
+    def transform(rows):
+        seen.append(len(rows))
+        return rows.to_dict(orient="records")
+
+    pages = _walk(lambda: Query.from_frame(frame).transform(transform), page_size=4)
+
+    assert [_ids(page.items) for page in pages] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert seen == [4, 4, 2]
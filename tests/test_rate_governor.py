@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+from app.utils.rate_governor import RateGovernor
+
+
+def _governor(**kwargs):
+    options = dict(
+        rate=1000, burst=1000, min_concurrency=1, max_concurrency=1, latency_target=10
+    )
+    return RateGovernor(**{**options, **kwargs})
+
+
+def test_waiters_are_granted_by_priority_then_arrival_order():
+    governor = _governor()
+    granted = []
+
+    async def call(name, priority):
+        started_at = await governor.acquire_async(priority)
+        granted.append(name)
+        governor.release(started_at, 200)
+
+    async def main():
+        started_at = await governor.acquire_async(0)
+        waiters = [
+            asyncio.create_task(call(name, priority))
+            for name, priority in [("low", 2), ("high", 0), ("medium", 1), ("high 2", 0)]
+        ]
+        await asyncio.sleep(0.01)
+        assert governor.stats()["queue_depth"] == 4
+
+        governor.release(started_at, 200)
+        await asyncio.gather(*waiters)
+
+    asyncio.run(main())
+    assert granted == ["high", "high 2", "medium", "low"]
+
+
+def test_queue_depth_and_wait_metrics():
+    governor = _governor()
+
+    async def call():
+        governor.release(await governor.acquire_async(0), 200)
+
+    async def main():
+        started_at = await governor.acquire_async(0)
+        waiters = [asyncio.create_task(call()) for _ in range(3)]
+        await asyncio.sleep(0.02)
+        governor.release(started_at, 200)
+        await asyncio.gather(*waiters)
+
+    asyncio.run(main())
+    stats = governor.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] == 3
+    assert stats["granted"] == 4
+    assert stats["in_flight"] == 0
+    assert stats["wait_seconds_max"] >= 0.02
+
+
+def test_cancelled_waiters_leave_the_queue():
+    governor = _governor()
+
+    async def main():
+        started_at = await governor.acquire_async(0)
+        waiter = asyncio.create_task(governor.acquire_async(0))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert governor.stats()["queue_depth"] == 0
+        governor.release(started_at, 200)
+
+    asyncio.run(main())
+    assert governor.stats()["in_flight"] == 0
+
+
+def test_concurrency_backs_off_on_throttling_and_grows_back_on_success():
+    governor = _governor(max_concurrency=8)
+    assert governor.stats()["concurrency_limit"] == 4
+
+    governor.release(governor.acquire(0), 429)
+    stats = governor.stats()
+    assert stats["concurrency_limit"] == 2
+    assert stats["throttled"] == 1
+    assert stats["tokens"] < 1
+
+    # Additive increase: 1 / limit per successful call, about a slot per window
+    for _ in range(2):
+        governor.release(governor.acquire(0), 200)
+    assert governor.stats()["concurrency_limit"] == 2.9
+
+    for _ in range(100):
+        governor.release(governor.acquire(0), 200)
+    assert governor.stats()["concurrency_limit"] == 8
+
+
+def test_failures_and_slow_calls_back_off_once_per_window():
+    governor = _governor(max_concurrency=16, latency_target=0.01)
+    first, second = governor.acquire(0), governor.acquire(0)
+
+    governor.release(first, 503)
+    # Started before the decrease, so it already saw the halved limit
+    governor.release(second, 503)
+    assert governor.stats()["concurrency_limit"] == 4
+
+    started_at = governor.acquire(0)
+    time.sleep(0.02)
+    governor.release(started_at, 200)
+    assert governor.stats()["concurrency_limit"] == 2
+    assert governor.stats()["congested"] == 3
+
+
+def test_token_bucket_limits_the_rate():
+    governor = _governor(rate=50, burst=2, max_concurrency=10)
+    started = time.monotonic()
+    for _ in range(4):
+        governor.release(governor.acquire(0), 200)
+
+    # 2 calls from the burst, then one every 20 ms
+    assert time.monotonic() - started >= 0.035
@@ -0,0 +1,32 @@
+from app.services import scrapper
+from app.services.scrapper import WEBSITES, get_articles
+
+PAGE = """
+<section class="list-item__title"><a href="/ca/nba/news/1">Raptors win</a></section>
+<section class="list-item__title"><a href="/ca/nba/news/2">Raptors lose</a></section>
+"""
+
+
+def test_each_address_is_downloaded_once_and_articles_keep_the_websites_order(
+    monkeypatch,
+):
+    downloads = []
+
+    async def get_page_html_async(address):
+        downloads.append(address)
+        return PAGE if "sportingnews" in address else None
+
+    monkeypatch.setattr(scrapper, "get_page_html_async", get_page_html_async)
+
+    articles = get_articles()
+
+    assert sorted(downloads) == sorted({website["address"] for website in WEBSITES})
+    assert articles == [
+        {
+            "title": title,
+            "url": f"https://www.sportingnews.com/ca/nba/news/{i}",
+            "source": "nba_canada",
+            "image": None,
+        }
+        for i, title in enumerate(["Raptors win", "Raptors lose"], start=1)
+    ]
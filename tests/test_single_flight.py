@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.utils.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_of_a_key_share_one_execution():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(flights.do, "key", fetch)
+        started.wait(5)
+        followers = [executor.submit(flights.do, "key", fetch) for _ in range(3)]
+        while flights.stats()["coalesced"] < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert results == ["value"] * 4
+    assert calls == [1]
+    assert flights.stats() == {"in_flight": 0, "executions": 1, "coalesced": 3}
+
+
+def test_errors_are_shared_and_not_kept():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flights.do, "key", fail)
+        started.wait(5)
+        follower = executor.submit(flights.do, "key", fail)
+        while flights.stats()["coalesced"] < 1:
+            time.sleep(0.001)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+
+    assert flights.do("key", lambda: "value") == "value"
+
+
+def test_async_concurrent_calls_of_a_key_share_one_execution():
+    flights = AsyncSingleFlight()
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def main():
+        return await asyncio.gather(*(flights.do("key", fetch, "value") for _ in range(4)))
+
+    assert asyncio.run(main()) == ["value"] * 4
+    assert calls == ["value"]
+    assert flights.stats() == {"in_flight": 0, "executions": 1, "coalesced": 3}
+
+
+def test_async_errors_are_shared():
+    flights = AsyncSingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(
+            flights.do("key", fail), flights.do("key", fail), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert [type(result) for result in results] == [ValueError, ValueError]
+
+
+def test_cancelling_the_first_caller_does_not_cancel_the_others():
+    flights = AsyncSingleFlight()
+
+    async def main():
+        released = asyncio.Event()
+
+        async def fetch():
+            await released.wait()
+            return "value"
+
+        leader = asyncio.create_task(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("key", fetch))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        released.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "value"
+
+
+def test_call_is_cancelled_once_nobody_waits_for_it():
+    flights = AsyncSingleFlight()
+    cancelled = []
+
+    async def fetch():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        callers = [asyncio.create_task(flights.do("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert cancelled == [True]
+    assert flights.stats()["in_flight"] == 0
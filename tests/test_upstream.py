@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from nba_api.stats.endpoints import playercareerstats
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.config.settings import CIRCUIT_MIN_CALLS
+from app.middlewares.request_context import RequestContextMiddleware
+from app.services.http_client import get_http_client
+from app.services.nba_api import upstream
+from app.services.nba_api.async_nba_client import fetch_endpoint
+from app.services.nba_api.upstream import (
+    cached_upstream,
+    get_circuit_breaker,
+    make_key,
+    raise_for_client_error,
+)
+
+
+def test_client_errors_never_open_the_circuit():
+    @cached_upstream("test_client_errors")
+    def fetch(player_id):
+        raise_for_client_error(400)
+
+    breaker = get_circuit_breaker("test_client_errors")
+    for player_id in range(3 * CIRCUIT_MIN_CALLS):
+        with pytest.raises(HTTPException) as error:
+            fetch(player_id)
+        assert error.value.status_code == 400
+
+    assert breaker.stats()["state"] == "closed"
+    assert breaker.stats()["failures"] == 0
+
+
+def test_upstream_failures_open_the_circuit():
+    @cached_upstream("test_upstream_failures")
+    def fetch(player_id):
+        raise_for_client_error(429)
+        raise ConnectionError("upstream down")
+
+    for player_id in range(CIRCUIT_MIN_CALLS):
+        with pytest.raises(ConnectionError):
+            fetch(player_id)
+
+    assert get_circuit_breaker("test_upstream_failures").stats()["state"] == "open"
+
+
+@pytest.mark.parametrize("status_code, expected", [(400, 400), (404, 404)])
+def test_fetch_endpoint_raises_on_client_errors(status_code, expected):
+    async def fetch():
+        client = get_http_client()
+        client._client = httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(status_code, text="Invalid PlayerID")
+            )
+        )
+        try:
+            await fetch_endpoint(playercareerstats.PlayerCareerStats, player_id="abc")
+        finally:
+            await client.aclose()
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(fetch())
+    assert error.value.status_code == expected
+
+
+class Upstream:
+    """
+    Upstream stand-in whose calls fail while ``down`` is set.
+    """
+
+    def __init__(self):
+        self.down = False
+        self.calls = 0
+
+    def __call__(self, player_id):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("upstream down")
+        return {"player_id": player_id}
+
+
+def _cached(monkeypatch, endpoint, upstream_stub):
+    monkeypatch.setitem(upstream.CACHE_TTL, endpoint, 60)
+    breaker = get_circuit_breaker(endpoint)
+    monkeypatch.setattr(breaker, "open_seconds", 0.05)
+    return cached_upstream(endpoint)(upstream_stub), breaker
+
+
+def _expire(endpoint, *args):
+    upstream.response_cache.peek(make_key(endpoint, args, {})).expires_at = 0
+
+
+def test_stale_value_is_served_with_a_warning_when_upstream_fails(monkeypatch):
+    stub = Upstream()
+    fetch, _ = _cached(monkeypatch, "test_stale", stub)
+
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/players/{player_id}")
+    def get_player(player_id: int):
+        return fetch(player_id)
+
+    client = TestClient(app)
+    assert "warning" not in client.get("/players/1").headers
+
+    _expire("test_stale", 1)
+    stub.down = True
+    response = client.get("/players/1")
+
+    assert response.json() == {"player_id": 1}
+    assert response.headers["warning"] == '110 - "Response is Stale"'
+    assert int(response.headers["x-data-age"]) >= 0
+    assert stub.calls == 2
+
+
+def test_open_circuit_fails_fast_then_half_open_probe_closes_it(monkeypatch):
+    stub = Upstream()
+    fetch, breaker = _cached(monkeypatch, "test_half_open", stub)
+
+    stub.down = True
+    for player_id in range(CIRCUIT_MIN_CALLS):
+        with pytest.raises(ConnectionError):
+            fetch(player_id)
+    assert breaker.state == "open"
+
+    # Without a stale value, an open circuit answers 503 without calling upstream
+    calls = stub.calls
+    with pytest.raises(HTTPException) as error:
+        fetch(-1)
+    assert error.value.status_code == 503
+    assert "Retry-After" in error.value.headers
+    assert stub.calls == calls
+
+    time.sleep(0.06)
+    stub.down = False
+    for player_id in range(breaker.half_open_calls):
+        assert fetch(100 + player_id) == {"player_id": 100 + player_id}
+    assert breaker.state == "closed"
@@ -0,0 +1,61 @@
+from nba_api.stats.endpoints import playercareerstats
+
+from app.services.nba_api import upstream
+from app.services.nba_api.async_nba_client import load_endpoint
+from app.services.nba_api.upstream import cached_upstream, make_key
+from app.services.warehouse import StatsWarehouse
+from app.utils.ttl_cache import MISSING
+from benchmarks.fake_upstream import stats_body
+
+PLAYERS = [
+    {"id": 2544, "full_name": "LeBron James", "is_active": True},
+    {"id": 893, "full_name": "Michael Jordan", "is_active": False},
+]
+
+
+def _career_stats(player_id):
+    body = stats_body("playercareerstats", (("PlayerID", str(player_id)),)).decode()
+    return load_endpoint(playercareerstats.PlayerCareerStats, body, player_id=player_id)
+
+
+class FakeWarehouse(StatsWarehouse):
+    def __init__(self):
+        super().__init__()
+        self.versions_seen = []
+
+    def _ingest_player(self, player):
+        self.ingest(player["id"], _career_stats(player["id"]))
+        self.versions_seen.append(self.snapshot().version)
+        return True
+
+
+def test_snapshot_is_rebuilt_at_the_checkpoints_of_a_refresh():
+    warehouse = FakeWarehouse()
+
+    assert warehouse.refresh(PLAYERS, max_workers=1, checkpoint_every=2) == 2
+
+    # Not rebuilt while ingesting, then published by the checkpoint
+    assert warehouse.versions_seen == [0, 0]
+    assert warehouse.snapshot().version == 1
+    assert warehouse.snapshot().player_count == 2
+
+
+def test_snapshot_is_rebuilt_after_an_ingestion_outside_a_refresh():
+    warehouse = StatsWarehouse()
+    warehouse.ingest(2544, _career_stats(2544))
+
+    assert warehouse.snapshot().version == 1
+    assert warehouse.snapshot().version == 1
+
+
+def test_uncached_calls_bypass_the_in_memory_cache():
+    calls = []
+
+    @cached_upstream("test_uncached")
+    def fetch(player_id):
+        calls.append(player_id)
+        return {"player_id": player_id}
+
+    assert fetch.uncached(1) == {"player_id": 1}
+    assert calls == [1]
+    assert upstream.response_cache.get(make_key("test_uncached", (1,), {})) is MISSING